@@ -16,10 +16,28 @@ from livekit.agents import (
     WorkerOptions,
     cli,
     metrics,
-    tokenize,
 )
 # Plugins imported in functions to avoid threading issues with plugin registration
 
+try:
+    from .pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from .structured_logging import setup_job_logging
+except ImportError:
+    from pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from structured_logging import setup_job_logging
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
@@ -52,44 +70,43 @@ class StarterAgent(Agent):
         logger.info(f"User said: {message}")
 
 
+PIPELINE = PipelineConfig()
+
+
 def prewarm(proc: JobProcess, silero_module):
     """Prewarm models for Day 1 agent."""
     # silero_module is passed from agent.py where plugins are registered on main thread
-    proc.userdata["vad"] = silero_module.VAD.load()
+    load_vad(proc, silero_module)
+    # Provider clients and the turn detector, reused by every job in this process
+    prewarm_pipeline(proc, PIPELINE)
+
+
+def new_userdata(proc: JobProcess) -> Userdata:
+    """Build fresh per-job state on top of the process's shared assets."""
+    return Userdata()
 
 
 async def entrypoint(ctx: JobContext):
     """Entry point for Day 1 starter agent."""
     # Plugins are already imported and registered in agent.py
     # Import them here to use (they're already registered, so this is safe)
-    from livekit.plugins import murf, google, deepgram, noise_cancellation
-    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+    from livekit.plugins import noise_cancellation
     
     # Logging setup
-    ctx.log_context_fields = {
-        "room": ctx.room.name,
-    }
+    setup_job_logging(ctx, "starter")
 
     # Initialize userdata
-    userdata = Userdata()
+    userdata = new_userdata(ctx.proc)
 
     # Set up a voice AI pipeline
+    pipeline = get_pipeline(ctx.proc, PIPELINE)
     session = AgentSession[Userdata](
         userdata=userdata,
-        # Speech-to-text (STT)
-        stt=deepgram.STT(model="nova-3"),
-        # Large Language Model (LLM)
-        llm=google.LLM(model="gemini-2.5-flash"),
-        # Text-to-speech (TTS)
-        tts=murf.TTS(
-            voice="en-US-matthew",
-            style="Conversation",
-            tokenizer=tokenize.basic.WordTokenizer(),
-            text_pacing=False
-        ),
-        # VAD and turn detection
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
+        stt=pipeline.stt,
+        llm=pipeline.llm,
+        tts=pipeline.tts,
+        turn_detection=pipeline.turn_detection,
+        vad=pipeline.vad,
         preemptive_generation=True,
     )
 
@@ -122,6 +139,7 @@ async def entrypoint(ctx: JobContext):
 
     # Start the session
     agent = StarterAgent(userdata=userdata)
+    await instrument_session(ctx, session, agent, "starter")
     
     await session.start(
         agent=agent,
@@ -1,11 +1,10 @@
 """Day 2 Barista Agent - Coffee shop order-taking agent."""
 
-import json
+import asyncio
 import logging
 import os
 from dataclasses import dataclass
-from datetime import datetime
-from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -14,21 +13,56 @@ from livekit.agents import (
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
     RunContext,
     ToolError,
     WorkerOptions,
     cli,
     function_tool,
+    llm,
     metrics,
-    tokenize,
 )
 # Plugins imported in functions to avoid threading issues with plugin registration
 
 try:
+    from .context_window import ContextWindow, context_window
+    from .instructions import InstructionBuilder
+    from .menu_catalog import MenuCatalog, MenuItem
+    from .order_ledger import OrderLedger
+    from .order_queue import OrderQueue, build_default_order_queue
+    from .order_slots import extract_slots
     from .order_state import CoffeeOrder
+    from .persistence import AsyncPersistence
+    from .pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from .response_cache import CachePolicy, cached_llm, load_response_cache
+    from .structured_logging import setup_job_logging
+    from .tts_cache import cached_tts, load_tts_cache
 except ImportError:
+    from context_window import ContextWindow, context_window
+    from instructions import InstructionBuilder
+    from menu_catalog import MenuCatalog, MenuItem
+    from order_ledger import OrderLedger
+    from order_queue import OrderQueue, build_default_order_queue
+    from order_slots import extract_slots
     from order_state import CoffeeOrder
+    from persistence import AsyncPersistence
+    from pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from response_cache import CachePolicy, cached_llm, load_response_cache
+    from structured_logging import setup_job_logging
+    from tts_cache import cached_tts, load_tts_cache
 
 logger = logging.getLogger("agent")
 
@@ -39,16 +73,20 @@ load_dotenv(".env.local")
 class Userdata:
     """User data containing the coffee order state."""
     order: CoffeeOrder
+    menu: MenuCatalog
+    ledger: OrderLedger
+    order_queue: OrderQueue
+    persistence: AsyncPersistence
 
 
 class BaristaAgent(Agent):
-    def __init__(self, *, userdata: Userdata) -> None:
+    def __init__(
+        self, *, userdata: Userdata, context_window: Optional[ContextWindow] = None
+    ) -> None:
         instructions = """You are a friendly and enthusiastic barista at Zepto Cafe. 
         Your goal is to take the customer's coffee order by gathering the following information:
-        - Drink type (e.g., latte, cappuccino, americano, espresso, mocha, etc.)
-        - Size (small, medium, large, or tall, grande, venti)
-        - Milk preference (whole milk, skim milk, oat milk, almond milk, soy milk, coconut milk, etc.)
-        - Extras (optional additions like whipped cream, vanilla syrup, caramel, chocolate, etc.)
+        - Drink type, size and milk preference, from the MENU at the end of these instructions
+        - Extras (optional, also from the MENU)
         - Customer's name (for the order)
 
         Be warm, welcoming, and conversational. Ask one question at a time and wait for the customer's response.
@@ -68,20 +106,45 @@ class BaristaAgent(Agent):
         2. When you first detect user speech (like "hi", "hello", or any greeting), IMMEDIATELY respond with: "Hi! Welcome to Zepto Cafe! I'm here to help you order your favorite coffee. What would you like to have today?"
         3. Use the function tools (update_drink_type, update_size, update_milk, update_name, add_extra) to update the order as the customer provides information.
         4. After each update, check what information is still missing using check_order_status, then ask for the next missing piece of information.
-        5. After getting the customer's name (when all required fields are filled), you MUST ask: "Would you like any extras like whipped cream, vanilla syrup, caramel, or chocolate?" BEFORE calling complete_order.
-        6. Wait for the customer's response about extras. If they mention extras, use add_extra for each one. If they say no or nothing, proceed to complete the order.
-        7. Only call complete_order AFTER you have asked about extras and received a response (even if they don't want any).
-        8. If you don't understand something, politely ask for clarification.
-        9. Be proactive and friendly throughout the conversation.
-        10. Keep responses short and conversational - don't give long explanations.
-        11. IMPORTANT: You MUST generate a response for every user input. Never return empty responses."""
+        5. Follow the IMPORTANT ORDER FLOW above: ask about extras, and only then call complete_order.
+        6. If you don't understand something, politely ask for clarification.
+        7. Be proactive and friendly throughout the conversation.
+        8. Keep responses short and conversational - don't give long explanations.
+        9. IMPORTANT: You MUST generate a response for every user input. Never return empty responses."""
 
         # Don't pass tools explicitly - the @function_tool decorator will auto-register them
         # Passing them explicitly causes duplicate registration errors
         super().__init__(
-            instructions=instructions,
+            instructions=InstructionBuilder("barista", instructions)
+            .add("Menu", userdata.menu.menu_text())
+            .build(),
         )
+        self.context_window = context_window
+
+    def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool],
+        model_settings: ModelSettings,
+    ):
+        # Recent turns verbatim, older ones summarized, see context_window.py
+        if self.context_window is not None:
+            chat_ctx = self.context_window.apply(chat_ctx)
+        return Agent.default.llm_node(self, chat_ctx, tools, model_settings)
     
+    async def on_user_turn_completed(
+        self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage
+    ) -> None:
+        """Fill the order fields the customer stated plainly, without a tool round trip."""
+        userdata = self.session.userdata
+        order = userdata.order
+        slots = extract_slots(new_message.text_content or "", userdata.menu)
+        filled = slots.apply(order)
+        if filled:
+            logger.info(f"Recorded from transcript: {filled}")
+            # Only for this reply; the order state itself carries over
+            turn_ctx.add_message(role="system", content=slots.note(order))
+
     async def on_agent_speech_committed(self, ctx: RunContext[Userdata], message: str) -> None:
         """Called when the agent's speech is committed (sent to TTS)."""
         logger.info(f"Agent said: {message}")
@@ -99,9 +162,10 @@ class BaristaAgent(Agent):
         """Update the drink type in the order.
         
         Args:
-            drink_type: The type of coffee drink (e.g., latte, cappuccino, americano, espresso, mocha, macchiato, etc.)
+            drink_type: A drink from the menu (e.g., latte, cappuccino, mocha)
         """
-        ctx.userdata.order.drinkType = drink_type.lower()
+        drink_type = _menu_item(ctx.userdata.menu, "drinks", drink_type).name
+        ctx.userdata.order.drinkType = drink_type
         logger.info(f"Updated drink type: {drink_type}")
         return f"Got it! {drink_type}. What size would you like?"
 
@@ -114,9 +178,10 @@ class BaristaAgent(Agent):
         """Update the size in the order.
         
         Args:
-            size: The size of the drink (e.g., small, medium, large, tall, grande, venti)
+            size: The size of the drink (small, medium or large; tall, grande and venti are accepted)
         """
-        ctx.userdata.order.size = size.lower()
+        size = _menu_item(ctx.userdata.menu, "sizes", size).name
+        ctx.userdata.order.size = size
         logger.info(f"Updated size: {size}")
         missing = ctx.userdata.order.get_missing_fields()
         if "milk" in missing:
@@ -135,9 +200,10 @@ class BaristaAgent(Agent):
         """Update the milk preference in the order.
         
         Args:
-            milk: The type of milk (e.g., whole milk, skim milk, oat milk, almond milk, soy milk, coconut milk, etc.)
+            milk: A milk from the menu (e.g., whole milk, oat milk, no milk)
         """
-        ctx.userdata.order.milk = milk.lower()
+        milk = _menu_item(ctx.userdata.menu, "milks", milk).name
+        ctx.userdata.order.milk = milk
         logger.info(f"Updated milk: {milk}")
         missing = ctx.userdata.order.get_missing_fields()
         if "name" in missing:
@@ -154,8 +220,9 @@ class BaristaAgent(Agent):
         """Add an extra to the order (can be called multiple times for multiple extras).
         
         Args:
-            extra: An extra addition (e.g., whipped cream, vanilla syrup, caramel, chocolate, cinnamon, etc.)
+            extra: An extra from the menu (e.g., whipped cream, vanilla syrup, caramel)
         """
+        extra = _menu_item(ctx.userdata.menu, "extras", extra).name
         if extra.lower() not in [e.lower() for e in ctx.userdata.order.extras]:
             ctx.userdata.order.extras.append(extra)
             logger.info(f"Added extra: {extra}")
@@ -196,7 +263,8 @@ class BaristaAgent(Agent):
             return (
                 f"Order is complete! Here's what we have: "
                 f"{order.size} {order.drinkType} with {order.milk}, "
-                f"extras: {extras_str}, for {order.name}."
+                f"extras: {extras_str}, for {order.name}. "
+                f"Total: {ctx.userdata.menu.price_text(ctx.userdata.menu.total(order))}."
             )
         else:
             missing = order.get_missing_fields()
@@ -221,7 +289,7 @@ class BaristaAgent(Agent):
         self,
         ctx: RunContext[Userdata],
     ) -> str:
-        """Complete and save the order to a JSON file. Only call this when all required fields are filled.
+        """Complete and save the order to the order ledger. Only call this when all required fields are filled.
         This will save the order and confirm it with the customer."""
         order = ctx.userdata.order
         
@@ -232,68 +300,113 @@ class BaristaAgent(Agent):
                 "Please gather all required information first."
             )
 
-        # Create orders directory if it doesn't exist
-        orders_dir = Path("orders")
-        orders_dir.mkdir(exist_ok=True)
-
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = orders_dir / f"order_{timestamp}_{order.name.replace(' ', '_')}.json"
-
-        # Save order to JSON file
-        order_dict = order.to_dict()
-        with open(filename, "w") as f:
-            json.dump(order_dict, f, indent=2)
-
-        logger.info(f"Order saved to {filename}")
+        # Assign a unique order ID now, append to the ledger in the background
+        # Priced locally from the menu catalog
+        total = ctx.userdata.menu.total(order)
+        record = ctx.userdata.ledger.new_record({**order.to_dict(), "total": total})
+        await ctx.userdata.persistence.submit(ctx.userdata.ledger.append, record)
+        logger.info(f"Order {record['order_id']} queued for the order ledger")
+        # Hand the order to the bar, ticket printer and analytics without waiting on them
+        await ctx.userdata.order_queue.publish(record)
 
         extras_str = ", ".join(order.extras) if order.extras else "no extras"
         confirmation = (
             f"Perfect! I've saved your order: "
             f"{order.size} {order.drinkType} with {order.milk}, "
-            f"{extras_str}. "
+            f"{extras_str}. That's {ctx.userdata.menu.price_text(total)}. "
             f"Thanks {order.name}, your order will be ready soon!"
         )
 
         return confirmation
 
 
+def _menu_item(menu: MenuCatalog, category: str, value: str) -> MenuItem:
+    """Resolve a tool argument to a menu item, or tell the LLM what's on offer."""
+    item = menu.lookup(category, value)
+    if item is None:
+        raise ToolError(f"'{value}' isn't on the menu. The {category} are: {', '.join(menu.names(category))}.")
+    return item
+
+
+PIPELINE = PipelineConfig()
+# Orders repeat across callers, so repeated turns are answered from the
+# response cache; exact matches only, since "a latte" vs "a large latte" matters
+RESPONSE_CACHE = CachePolicy(enabled=True)
+# Lines the instructions make the barista say word for word
+TTS_PHRASES = [
+    "Hi! Welcome to Zepto Cafe! I'm here to help you order your favorite coffee. "
+    "What would you like to have today?",
+    "Would you like any extras like whipped cream, vanilla syrup, caramel, or chocolate?",
+]
+
+
 def prewarm(proc: JobProcess, silero_module):
-    """Prewarm models for Day 2 barista agent."""
+    """Prewarm models for Day 2 barista agent.
+
+    Only shared, job-independent assets belong here - per-job state such as
+    the CoffeeOrder is created by new_userdata so a warm process can serve
+    many jobs without them touching each other's orders.
+    """
     # silero_module is passed from agent.py where plugins are registered on main thread
-    proc.userdata["vad"] = silero_module.VAD.load()
-    # Initialize order state in userdata
-    proc.userdata["order"] = CoffeeOrder()
+    load_vad(proc, silero_module)
+    # Provider clients and the turn detector, reused by every job in this process
+    prewarm_pipeline(proc, PIPELINE)
+    # Menu indexes, order ledger and order queue are shared by every job in this process
+    proc.userdata["menu_catalog"] = MenuCatalog.from_env()
+    proc.userdata["order_ledger"] = OrderLedger()
+    proc.userdata["order_queue"] = build_default_order_queue()
+    load_response_cache(proc)
+    load_tts_cache(proc, PIPELINE.tts_voice, PIPELINE.tts_style, TTS_PHRASES)
+
+
+def new_userdata(proc: JobProcess, persistence: AsyncPersistence) -> Userdata:
+    """Build fresh per-job state on top of the process's shared assets."""
+    return Userdata(
+        order=CoffeeOrder(),
+        menu=proc.userdata.get("menu_catalog") or MenuCatalog.from_env(),
+        ledger=proc.userdata.get("order_ledger") or OrderLedger(),
+        order_queue=proc.userdata.get("order_queue") or build_default_order_queue(),
+        persistence=persistence,
+    )
 
 
 async def entrypoint(ctx: JobContext):
     """Entry point for Day 2 barista agent."""
     # Plugins are already imported and registered in agent.py
     # Import them here to use (they're already registered, so this is safe)
-    from livekit.plugins import murf, google, deepgram, noise_cancellation
-    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+    from livekit.plugins import noise_cancellation
     
     # Logging setup
-    ctx.log_context_fields = {
-        "room": ctx.room.name,
-    }
+    setup_job_logging(ctx, "barista")
+
+    # Initialize a fresh order for this job and a background writer for saves
+    persistence = AsyncPersistence(name="orders")
+    userdata = new_userdata(ctx.proc, persistence)
+    ledger = userdata.ledger
+    order_queue = userdata.order_queue
 
-    # Initialize userdata with order state
-    userdata = Userdata(order=ctx.proc.userdata.get("order", CoffeeOrder()))
+    async def flush_orders():
+        # Drain queued orders, then group-commit them before the job exits,
+        # then let the consumers finish what was published
+        await persistence.aclose()
+        await asyncio.to_thread(ledger.flush)
+        await order_queue.aclose()
+
+    ctx.add_shutdown_callback(flush_orders)
 
     # Set up a voice AI pipeline
+    pipeline = get_pipeline(ctx.proc, PIPELINE)
     session = AgentSession[Userdata](
         userdata=userdata,
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=murf.TTS(
-            voice="en-US-matthew",
-            style="Conversation",
-            tokenizer=tokenize.basic.WordTokenizer(),
-            text_pacing=False
+        stt=pipeline.stt,
+        llm=cached_llm(
+            ctx, pipeline.llm, RESPONSE_CACHE, "barista", state=userdata.order.to_dict
+        ),
+        tts=cached_tts(
+            ctx, pipeline.tts, "barista", PIPELINE.tts_voice, PIPELINE.tts_style, TTS_PHRASES
         ),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
+        turn_detection=pipeline.turn_detection,
+        vad=pipeline.vad,
         preemptive_generation=True,
     )
 
@@ -308,19 +421,19 @@ async def entrypoint(ctx: JobContext):
     # Event handlers for debugging
     @session.on("user_speech_committed")
     def _on_user_speech(ev):
-        logger.info(f"✅✅✅ User speech detected: {ev.text}")
+        logger.info(f"✅✅✅ User speech detected: {ev.text}", extra={"event": "user_speech"})
     
     @session.on("agent_speech_committed")
     def _on_agent_speech(ev):
-        logger.info(f"✅✅✅ Agent speech: {ev.text}")
+        logger.info(f"✅✅✅ Agent speech: {ev.text}", extra={"event": "agent_speech"})
     
     @session.on("user_speech_started")
     def _on_user_speech_started(ev):
-        logger.info("🔊 User started speaking")
+        logger.info("🔊 User started speaking", extra={"event": "user_speech_started"})
     
     @session.on("agent_speech_started")
     def _on_agent_speech_started(ev):
-        logger.info("🔊 Agent started speaking")
+        logger.info("🔊 Agent started speaking", extra={"event": "agent_speech_started"})
     
     @session.on("llm_stream")
     def _on_llm_stream(ev):
@@ -329,11 +442,18 @@ async def entrypoint(ctx: JobContext):
     
     @session.on("llm_response")
     def _on_llm_response(ev):
-        logger.info(f"🤖 LLM response received (full response ready)")
+        logger.info(f"🤖 LLM response received (full response ready)", extra={"event": "llm_response"})
     
-    @session.on("user_speech_partial")
-    def _on_user_speech_partial(ev):
-        logger.info(f"📝 User speech partial: {ev.text[:50]}...")
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev):
+        if ev.is_final:
+            logger.info(f"📝 User transcript: {ev.transcript}", extra={"event": "user_speech"})
+        else:
+            # Interim transcripts are sampled, see structured_logging.py
+            logger.info(
+                f"📝 User speech partial: {ev.transcript[:50]}...",
+                extra={"event": "user_input_transcribed"},
+            )
     
     @session.on("error")
     def _on_error(ev):
@@ -355,11 +475,15 @@ async def entrypoint(ctx: JobContext):
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        logger.info(f"Order queue: {order_queue.stats()}")
 
     ctx.add_shutdown_callback(log_usage)
 
     # Start the session
-    agent = BaristaAgent(userdata=userdata)
+    # Bound the chat context sent to the LLM as the conversation grows
+    window = context_window(ctx, "barista", pipeline.summary_llm, state=userdata.order.to_dict)
+    agent = BaristaAgent(userdata=userdata, context_window=window)
+    await instrument_session(ctx, session, agent, "barista")
     
     await session.start(
         agent=agent,
@@ -375,7 +499,6 @@ async def entrypoint(ctx: JobContext):
     logger.info(f"Room name: {ctx.room.name}, Room SID: {ctx.room.sid}")
     logger.info(f"Agent participant: {ctx.room.local_participant.identity}")
     
-    import asyncio
     await asyncio.sleep(1)
     
     participants = list(ctx.room.remote_participants.values())
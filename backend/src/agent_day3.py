@@ -1,9 +1,11 @@
 """Day 3 Wellness Agent - Health & wellness companion for daily check-ins."""
 
+import copy
 import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -12,21 +14,46 @@ from livekit.agents import (
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
     RunContext,
     ToolError,
     WorkerOptions,
     cli,
     function_tool,
+    llm,
     metrics,
-    tokenize,
 )
 # Plugins imported in functions to avoid threading issues with plugin registration
 
 try:
-    from .wellness_state import WellnessCheckIn, WellnessLog
+    from .context_window import ContextWindow, context_window
+    from .instructions import InstructionBuilder
+    from .persistence import AsyncPersistence
+    from .pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from .structured_logging import setup_job_logging
+    from .tts_cache import cached_tts, load_tts_cache
+    from .wellness_state import WellnessCheckIn, WellnessContextCache, WellnessLog
 except ImportError:
-    from wellness_state import WellnessCheckIn, WellnessLog
+    from context_window import ContextWindow, context_window
+    from instructions import InstructionBuilder
+    from persistence import AsyncPersistence
+    from pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from structured_logging import setup_job_logging
+    from tts_cache import cached_tts, load_tts_cache
+    from wellness_state import WellnessCheckIn, WellnessContextCache, WellnessLog
 
 logger = logging.getLogger("agent")
 
@@ -38,14 +65,21 @@ class Userdata:
     """User data containing the wellness check-in state."""
     check_in: WellnessCheckIn
     wellness_log: WellnessLog
+    persistence: AsyncPersistence
 
 
 class WellnessAgent(Agent):
-    def __init__(self, *, userdata: Userdata) -> None:
-        # Get context from previous check-ins
-        previous_context = userdata.wellness_log.format_context_for_agent()
+    def __init__(
+        self, *, userdata: Userdata, context_window: Optional[ContextWindow] = None
+    ) -> None:
+        # Get context from this caller's previous check-ins
+        previous_context = userdata.wellness_log.format_context_for_agent(
+            userdata.check_in.user_id
+        )
         
-        instructions = f"""You are a supportive, grounded health and wellness companion from Apollo Pharmacy. Your role is to conduct daily check-ins that help users reflect on their mood, energy, and daily goals as part of Apollo Pharmacy's commitment to everyday wellness.
+        # Static text first so every caller's prompt shares a cacheable
+        # prefix; their previous check-ins go in CALLER CONTEXT at the end
+        instructions = """You are a supportive, grounded health and wellness companion from Apollo Pharmacy. Your role is to conduct daily check-ins that help users reflect on their mood, energy, and daily goals as part of Apollo Pharmacy's commitment to everyday wellness.
 
 BRAND IDENTITY:
 - You represent Apollo Pharmacy, a trusted health and wellness partner
@@ -65,7 +99,7 @@ IMPORTANT GUIDELINES:
 - You can mention that Apollo Pharmacy offers wellness products and services, but only when naturally relevant and never pushy
 
 CONVERSATION FLOW:
-1. Start with a warm greeting from Apollo Pharmacy. {previous_context if previous_context else "Since this is your first check-in, introduce yourself as from Apollo Pharmacy and explain you're here to help with their daily wellness check-in."} IMPORTANT: If there are previous check-ins, you MUST reference them naturally in your greeting. For example, if the context says "Last time we talked, you mentioned being low on energy. How does today compare?", incorporate this into your greeting naturally.
+1. Start with a warm greeting from Apollo Pharmacy, based on the CALLER CONTEXT at the end of these instructions. IMPORTANT: If there are previous check-ins, you MUST reference them naturally in your greeting. For example, if the context says "Last time we talked, you mentioned being low on energy. How does today compare?", incorporate this into your greeting naturally.
 2. Ask about mood and energy (use capture_mood and capture_energy_level tools)
 3. Ask about 1-3 daily objectives or intentions (use add_objective tool - can be called multiple times)
 4. Offer simple, realistic advice based on what they shared (conversational, no tool needed)
@@ -96,9 +130,27 @@ CRITICAL INSTRUCTIONS:
 
 Remember: You are a supportive wellness companion from Apollo Pharmacy, not a clinician. Keep things grounded, realistic, and helpful. Apollo Pharmacy is about everyday wellness and supporting healthy lifestyles."""
 
+        builder = InstructionBuilder("wellness", instructions).add(
+            "Caller context",
+            previous_context
+            or "This is the caller's first check-in. Introduce yourself as from Apollo Pharmacy "
+            "and explain you're here to help with their daily wellness check-in.",
+        )
         super().__init__(
-            instructions=instructions,
+            instructions=builder.build(),
         )
+        self.context_window = context_window
+
+    def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool],
+        model_settings: ModelSettings,
+    ):
+        # Recent turns verbatim, older ones summarized, see context_window.py
+        if self.context_window is not None:
+            chat_ctx = self.context_window.apply(chat_ctx)
+        return Agent.default.llm_node(self, chat_ctx, tools, model_settings)
     
     async def on_agent_speech_committed(self, ctx: RunContext[Userdata], message: str) -> None:
         """Called when the agent's speech is committed (sent to TTS)."""
@@ -216,7 +268,9 @@ Remember: You are a supportive wellness companion from Apollo Pharmacy, not a cl
         Returns:
             Formatted summary of recent check-ins
         """
-        recent = ctx.userdata.wellness_log.get_recent_entries(days=days)
+        recent = ctx.userdata.wellness_log.get_recent_entries(
+            days=days, user_id=ctx.userdata.check_in.user_id
+        )
         if not recent:
             return "No previous check-ins found."
         
@@ -281,7 +335,7 @@ Remember: You are a supportive wellness companion from Apollo Pharmacy, not a cl
         self,
         ctx: RunContext[Userdata],
     ) -> str:
-        """Save the completed check-in to the wellness log JSON file.
+        """Save the completed check-in to the caller's own wellness log.
         Only call this when all required fields are filled and summary is generated.
         This will save the check-in and provide a recap."""
         check_in = ctx.userdata.check_in
@@ -299,9 +353,11 @@ Remember: You are a supportive wellness companion from Apollo Pharmacy, not a cl
                 "Please generate a summary first using generate_summary."
             )
         
-        # Save to JSON file
-        ctx.userdata.wellness_log.save_check_in(check_in)
-        logger.info(f"Check-in saved to wellness log")
+        # Save a snapshot in the background so the write never stalls audio
+        await ctx.userdata.persistence.submit(
+            ctx.userdata.wellness_log.save_check_in, copy.deepcopy(check_in)
+        )
+        logger.info(f"Check-in queued for the wellness log")
         
         # Create recap
         objectives_str = ", ".join(check_in.objectives)
@@ -315,47 +371,91 @@ Remember: You are a supportive wellness companion from Apollo Pharmacy, not a cl
         return recap
 
 
+PIPELINE = PipelineConfig()
+# No LLM response cache here: callers share moods and health details, and a
+# reply written for one caller must never be replayed to another
+# The greeting the instructions prescribe for first-time callers
+TTS_PHRASES = [
+    "Hello! Welcome to Apollo Pharmacy's wellness check-in. I'm here to help you "
+    "with your daily wellness reflection. How are you feeling today?",
+]
+
+
 def prewarm(proc: JobProcess, silero_module):
-    """Prewarm models for Day 3 wellness agent."""
+    """Prewarm models for Day 3 wellness agent.
+
+    Only shared, job-independent assets belong here - the per-job
+    WellnessCheckIn is created by new_userdata.
+    """
     # silero_module is passed from agent.py where plugins are registered on main thread
-    proc.userdata["vad"] = silero_module.VAD.load()
-    # Initialize wellness log
-    wellness_log = WellnessLog()
-    proc.userdata["wellness_log"] = wellness_log
+    load_vad(proc, silero_module)
+    # Provider clients and the turn detector, reused by every job in this process
+    prewarm_pipeline(proc, PIPELINE)
+    # Initialize wellness log with a per-process cache of returning callers' context
+    context_cache = WellnessContextCache(
+        maxsize=int(os.getenv("WELLNESS_CONTEXT_CACHE_SIZE", "1024"))
+    )
+    proc.userdata["wellness_context_cache"] = context_cache
+    proc.userdata["wellness_log"] = WellnessLog(context_cache=context_cache)
+    load_tts_cache(proc, PIPELINE.tts_voice, PIPELINE.tts_style, TTS_PHRASES)
+
+
+def new_userdata(
+    proc: JobProcess,
+    user_id: str,
+    session_id: str,
+    persistence: AsyncPersistence,
+) -> Userdata:
+    """Build fresh per-job state on top of the process's shared assets."""
+    return Userdata(
+        check_in=WellnessCheckIn(session_id=session_id, user_id=user_id),
+        wellness_log=proc.userdata.get("wellness_log") or WellnessLog(),
+        persistence=persistence,
+    )
 
 
 async def entrypoint(ctx: JobContext):
     """Entry point for Day 3 wellness agent."""
     # Plugins are already imported and registered in agent.py
     # Import them here to use (they're already registered, so this is safe)
-    from livekit.plugins import murf, google, deepgram, noise_cancellation
-    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+    from livekit.plugins import noise_cancellation
     
     # Logging setup
-    ctx.log_context_fields = {
-        "room": ctx.room.name,
-    }
+    setup_job_logging(ctx, "wellness")
 
-    # Initialize wellness log and check-in
-    wellness_log = ctx.proc.userdata.get("wellness_log", WellnessLog())
-    check_in = WellnessCheckIn()
-    
-    # Initialize userdata
-    userdata = Userdata(check_in=check_in, wellness_log=wellness_log)
+    # Join the room first so the caller's identity is known before the agent
+    # is built - the wellness log is partitioned by participant identity
+    await ctx.connect()
+    participant = await ctx.wait_for_participant()
+
+    # Background writer for saves, drained before the job exits
+    persistence = AsyncPersistence(name="wellness")
+    ctx.add_shutdown_callback(persistence.aclose)
+
+    # Initialize a fresh check-in for this job
+    userdata = new_userdata(ctx.proc, participant.identity, ctx.room.name, persistence)
+    wellness_log = userdata.wellness_log
+
+    def check_in_state() -> dict:
+        # What the caller has shared so far, without per-session ids and times
+        check_in = userdata.check_in
+        return {
+            "mood": check_in.mood,
+            "energy_level": check_in.energy_level,
+            "objectives": check_in.objectives,
+        }
 
     # Set up a voice AI pipeline
+    pipeline = get_pipeline(ctx.proc, PIPELINE)
     session = AgentSession[Userdata](
         userdata=userdata,
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=murf.TTS(
-            voice="en-US-matthew",
-            style="Conversation",
-            tokenizer=tokenize.basic.WordTokenizer(),
-            text_pacing=False
+        stt=pipeline.stt,
+        llm=pipeline.llm,
+        tts=cached_tts(
+            ctx, pipeline.tts, "wellness", PIPELINE.tts_voice, PIPELINE.tts_style, TTS_PHRASES
         ),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
+        turn_detection=pipeline.turn_detection,
+        vad=pipeline.vad,
         preemptive_generation=True,
     )
 
@@ -370,31 +470,38 @@ async def entrypoint(ctx: JobContext):
     # Event handlers for debugging
     @session.on("user_speech_committed")
     def _on_user_speech(ev):
-        logger.info(f"✅✅✅ User speech detected: {ev.text}")
+        logger.info(f"✅✅✅ User speech detected: {ev.text}", extra={"event": "user_speech"})
     
     @session.on("agent_speech_committed")
     def _on_agent_speech(ev):
-        logger.info(f"✅✅✅ Agent speech: {ev.text}")
+        logger.info(f"✅✅✅ Agent speech: {ev.text}", extra={"event": "agent_speech"})
     
     @session.on("user_speech_started")
     def _on_user_speech_started(ev):
-        logger.info("🔊 User started speaking")
+        logger.info("🔊 User started speaking", extra={"event": "user_speech_started"})
     
     @session.on("agent_speech_started")
     def _on_agent_speech_started(ev):
-        logger.info("🔊 Agent started speaking")
+        logger.info("🔊 Agent started speaking", extra={"event": "agent_speech_started"})
     
     @session.on("llm_stream")
     def _on_llm_stream(ev):
-        logger.info(f"🤖 LLM stream: {ev.text[:100]}...")
+        logger.info(f"🤖 LLM stream: {ev.text[:100]}...", extra={"event": "llm_stream"})
     
     @session.on("llm_response")
     def _on_llm_response(ev):
-        logger.info(f"🤖 LLM response received")
+        logger.info(f"🤖 LLM response received", extra={"event": "llm_response"})
     
-    @session.on("user_speech_partial")
-    def _on_user_speech_partial(ev):
-        logger.info(f"📝 User speech partial: {ev.text[:50]}...")
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev):
+        if ev.is_final:
+            logger.info(f"📝 User transcript: {ev.transcript}", extra={"event": "user_speech"})
+        else:
+            # Interim transcripts are sampled, see structured_logging.py
+            logger.info(
+                f"📝 User speech partial: {ev.transcript[:50]}...",
+                extra={"event": "user_input_transcribed"},
+            )
     
     @session.on("error")
     def _on_error(ev):
@@ -410,22 +517,26 @@ async def entrypoint(ctx: JobContext):
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        if wellness_log.context_cache is not None:
+            logger.info(f"Wellness context cache: {wellness_log.context_cache.stats()}")
 
     ctx.add_shutdown_callback(log_usage)
 
     # Start the session
-    agent = WellnessAgent(userdata=userdata)
+    # Bound the chat context sent to the LLM as the conversation grows
+    window = context_window(ctx, "wellness", pipeline.summary_llm, state=check_in_state)
+    agent = WellnessAgent(userdata=userdata, context_window=window)
+    await instrument_session(ctx, session, agent, "wellness")
     
     await session.start(
         agent=agent,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             noise_cancellation=noise_cancellation.BVC(),
+            participant_identity=participant.identity,
         ),
     )
 
-    # Join the room and connect to the user
-    await ctx.connect()
     logger.info("Day 3 Apollo Pharmacy Wellness Agent connected to room, session is active and listening")
     logger.info(f"Room name: {ctx.room.name}, Room SID: {ctx.room.sid}")
     logger.info(f"Agent participant: {ctx.room.local_participant.identity}")
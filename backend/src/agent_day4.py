@@ -3,7 +3,7 @@
 import json
 import logging
 import os
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -14,16 +14,60 @@ from livekit.agents import (
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
     RoomInputOptions,
     RunContext,
     ToolError,
     WorkerOptions,
     cli,
     function_tool,
+    llm,
     metrics,
-    tokenize,
 )
 
+try:
+    from .context_window import ContextWindow, context_window
+    from .instructions import InstructionBuilder
+    from .knowledge_base import KnowledgeBase, search_tool
+    from .pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        get_tts,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from .response_cache import CachePolicy, cached_llm, load_response_cache
+    from .structured_logging import setup_job_logging
+    from .tts_cache import (
+        CachingTTS,
+        Voice,
+        cached_tts,
+        load_tts_cache,
+        warm_in_background,
+    )
+except ImportError:
+    from context_window import ContextWindow, context_window
+    from instructions import InstructionBuilder
+    from knowledge_base import KnowledgeBase, search_tool
+    from pipeline import (
+        PipelineConfig,
+        get_pipeline,
+        get_tts,
+        instrument_session,
+        load_vad,
+        prewarm_pipeline,
+    )
+    from response_cache import CachePolicy, cached_llm, load_response_cache
+    from structured_logging import setup_job_logging
+    from tts_cache import (
+        CachingTTS,
+        Voice,
+        cached_tts,
+        load_tts_cache,
+        warm_in_background,
+    )
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
@@ -105,12 +149,15 @@ class TutorContentLibrary:
         concepts = [TutorConcept(**item) for item in raw]
         return cls(concepts)
 
-    @classmethod
-    def from_env(cls) -> "TutorContentLibrary":
+    @staticmethod
+    def path_from_env() -> Path:
         default_path = Path(__file__).resolve().parents[2] / "shared-data" / "day4_tutor_content.json"
         configured = os.getenv("DAY4_TUTOR_CONTENT_PATH")
-        path = Path(configured) if configured else default_path
-        return cls.from_path(path)
+        return Path(configured) if configured else default_path
+
+    @classmethod
+    def from_env(cls) -> "TutorContentLibrary":
+        return cls.from_path(cls.path_from_env())
 
     def list_concepts(self) -> List[TutorConcept]:
         return [self._concepts[cid] for cid in self._order]
@@ -137,19 +184,25 @@ class Userdata:
 
     state: TutorSessionState
     content: TutorContentLibrary
+    knowledge: KnowledgeBase
+    # One warm TTS instance per learning mode, see VOICE_PERSONAS
+    voices: Dict[str, Voice] = field(default_factory=dict)
 
 
 class TeachTheTutorAgent(Agent):
     """Active recall coach with mode-specific personas."""
 
-    def __init__(self, *, userdata: Userdata) -> None:
-        instructions = f"""You are Teach-the-Tutor, an active recall coach that helps users master core coding concepts.
+    def __init__(
+        self, *, userdata: Userdata, context_window: Optional[ContextWindow] = None
+    ) -> None:
+        instructions = """You are Teach-the-Tutor, an active recall coach that helps users master core coding concepts.
 Key behaviors:
 - Greet the learner, mention Murf Falcon voices, and immediately ask which learning mode they prefer (learn, quiz, teach_back). Do not dive into content until a mode is selected via the set_learning_mode tool.
 - Whenever the learner asks to switch, call set_learning_mode again and acknowledge the new Murf Falcon voice (Matthew for learn, Alicia for quiz, Ken for teach_back).
 - Focus on one concept at a time. Offer the list of concepts using list_concepts when needed, then lock in the user's choice with set_focus_concept before explaining or quizzing.
 - Use describe_current_concept for summaries in learn mode, get_quiz_prompt for quiz mode, and get_teach_back_prompt before you ask the learner to explain the idea back.
 - Track mastery every time you finish a mode-specific interaction by calling record_mastery_event with the appropriate mode and an optional score (0–100). Provide encouraging qualitative feedback referencing the stored summary or sample question.
+- When the learner asks about a topic rather than picking a concept, call search_content and answer from what it returns.
 - Allow learners to ask for progress or their weakest concept. Use get_mastery_snapshot to summarize what the agent knows so far.
 - Keep responses concise, use plain conversational language, and explain any jargon.
 - Never stay silent—respond to every user utterance promptly.
@@ -162,7 +215,29 @@ Mode-specific guidance:
 
 You have access to function tools for managing modes, content, and mastery. Use them frequently so every response is grounded in the JSON content."""
 
-        super().__init__(instructions=instructions)
+        super().__init__(
+            instructions=InstructionBuilder("tutor", instructions).build(),
+            tools=[
+                search_tool(
+                    userdata.knowledge,
+                    "search_content",
+                    "Search the course content (concept summaries, quiz questions and "
+                    "teach-back prompts) for the learner's question.",
+                )
+            ],
+        )
+        self.context_window = context_window
+
+    def llm_node(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool],
+        model_settings: ModelSettings,
+    ):
+        # Recent turns verbatim, older ones summarized, see context_window.py
+        if self.context_window is not None:
+            chat_ctx = self.context_window.apply(chat_ctx)
+        return Agent.default.llm_node(self, chat_ctx, tools, model_settings)
 
     async def on_agent_speech_committed(self, ctx: RunContext[Userdata], message: str) -> None:
         logger.info(f"Agent said: {message}")
@@ -184,6 +259,13 @@ You have access to function tools for managing modes, content, and mastery. Use
             logger.warning("Cannot switch voices: session has no TTS engine configured.")
             return
 
+        voice = ctx.userdata.voices.get(mode)
+        if voice is not None and isinstance(tts_engine, CachingTTS):
+            # The persona's TTS is already connected: no cold start in the new voice
+            tts_engine.switch(voice)
+            logger.info("Switched Murf voice to %s for %s mode.", persona["display"], mode)
+            return
+
         update_cb = getattr(tts_engine, "update_options", None)
         if not callable(update_cb):
             logger.warning(
@@ -314,37 +396,74 @@ You have access to function tools for managing modes, content, and mastery. Use
         return f"Advanced to {concept.title}. Let the learner know the new focus."
 
 
+PERSONA_PIPELINES = {
+    mode: PipelineConfig(tts_voice=persona["voice"], tts_style=persona["style"])
+    for mode, persona in VOICE_PERSONAS.items()
+}
+PIPELINE = PERSONA_PIPELINES["learn"]
+# Concept explanations and quiz prompts repeat across learners at the same
+# point in a session (same mode, concept and mastery)
+RESPONSE_CACHE = CachePolicy(enabled=True)
+
+
 def prewarm(proc: JobProcess, silero_module):
-    """Prewarm models and load tutor content."""
-    proc.userdata["vad"] = silero_module.VAD.load()
+    """Prewarm models and load tutor content.
+
+    The content library is read-only and shared by every job; the mutable
+    TutorSessionState is created per job by new_userdata.
+    """
+    load_vad(proc, silero_module)
+    # Provider clients and the turn detector, reused by every job in this process,
+    # with a TTS client per persona voice
+    for config in PERSONA_PIPELINES.values():
+        prewarm_pipeline(proc, config)
     proc.userdata["tutor_content"] = TutorContentLibrary.from_env()
+    # Searchable index of the same content, for the search_content tool
+    proc.userdata["tutor_knowledge"] = KnowledgeBase.from_files(
+        [TutorContentLibrary.path_from_env()]
+    )
+    load_response_cache(proc)
+    load_tts_cache(proc, PIPELINE.tts_voice, PIPELINE.tts_style)
+
+
+def new_userdata(proc: JobProcess) -> Userdata:
+    """Build fresh per-job state on top of the process's shared assets."""
+    content = proc.userdata.get("tutor_content") or TutorContentLibrary.from_env()
+    state = TutorSessionState(current_concept_id=content.list_concepts()[0].id)
+    knowledge = proc.userdata.get("tutor_knowledge") or KnowledgeBase.from_files(
+        [TutorContentLibrary.path_from_env()]
+    )
+    return Userdata(state=state, content=content, knowledge=knowledge)
 
 
 async def entrypoint(ctx: JobContext):
     """Entry point for Day 4 active recall coach."""
-    from livekit.plugins import murf, google, deepgram, noise_cancellation
-    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+    from livekit.plugins import noise_cancellation
 
-    ctx.log_context_fields = {
-        "room": ctx.room.name,
-    }
+    setup_job_logging(ctx, "tutor")
 
-    content = ctx.proc.userdata.get("tutor_content", TutorContentLibrary.from_env())
-    state = TutorSessionState(current_concept_id=content.list_concepts()[0].id)
-    userdata = Userdata(state=state, content=content)
+    userdata = new_userdata(ctx.proc)
 
+    # Own TTS instance: without the TTS cache, switching learning modes
+    # changes its voice mid-session
+    pipeline = get_pipeline(ctx.proc, PIPELINE, exclusive_tts=True)
+    userdata.voices = {
+        mode: Voice(
+            pipeline.tts if config == PIPELINE else get_tts(ctx.proc, config),
+            config.tts_voice,
+            config.tts_style,
+        )
+        for mode, config in PERSONA_PIPELINES.items()
+    }
     session = AgentSession[Userdata](
         userdata=userdata,
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=murf.TTS(
-            voice=VOICE_PERSONAS["learn"]["voice"],
-            style=VOICE_PERSONAS["learn"]["style"],
-            tokenizer=tokenize.basic.WordTokenizer(),
-            text_pacing=False,
+        stt=pipeline.stt,
+        llm=cached_llm(
+            ctx, pipeline.llm, RESPONSE_CACHE, "tutor", state=lambda: asdict(userdata.state)
         ),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad"],
+        tts=cached_tts(ctx, pipeline.tts, "tutor", PIPELINE.tts_voice, PIPELINE.tts_style),
+        turn_detection=pipeline.turn_detection,
+        vad=pipeline.vad,
         preemptive_generation=True,
     )
 
@@ -373,7 +492,10 @@ async def entrypoint(ctx: JobContext):
 
     ctx.add_shutdown_callback(log_usage)
 
-    agent = TeachTheTutorAgent(userdata=userdata)
+    # Bound the chat context sent to the LLM as the conversation grows
+    window = context_window(ctx, "tutor", pipeline.summary_llm, state=lambda: asdict(userdata.state))
+    agent = TeachTheTutorAgent(userdata=userdata, context_window=window)
+    await instrument_session(ctx, session, agent, "tutor")
 
     await session.start(
         agent=agent,
@@ -386,6 +508,18 @@ async def entrypoint(ctx: JobContext):
     await ctx.connect()
     logger.info("Day 4 Teach-the-Tutor agent is live and listening.")
 
+    # Open the other personas' connections and synthesize what they'll read
+    # out, so the first line after a mode switch isn't a cold start
+    for voice in userdata.voices.values():
+        voice.tts.prewarm()
+    concepts = userdata.content.list_concepts()
+    warm_in_background(
+        ctx, session.tts, [c.sample_question for c in concepts], userdata.voices["quiz"]
+    )
+    warm_in_background(
+        ctx, session.tts, [c.teach_back_prompt for c in concepts], userdata.voices["teach_back"]
+    )
+
 
 if __name__ == "__main__":
     cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
@@ -0,0 +1,132 @@
+"""Registry of day agents hosted by the unified worker in agent.py."""
+
+import importlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Optional
+
+from livekit.agents import JobContext, JobProcess
+
+logger = logging.getLogger("agent")
+
+DEFAULT_APP = "barista"
+
+
+@dataclass(frozen=True)
+class AgentApp:
+    """One day agent: the module providing its prewarm/entrypoint and its aliases."""
+
+    name: str
+    module: str
+    aliases: tuple[str, ...]
+    description: str
+
+
+AGENT_APPS: tuple[AgentApp, ...] = (
+    AgentApp("starter", "agent_day1", ("1", "day1"), "Day 1 starter assistant"),
+    AgentApp("barista", "agent_day2", ("2", "day2"), "Day 2 Zepto Cafe barista"),
+    AgentApp("wellness", "agent_day3", ("3", "day3"), "Day 3 Apollo Pharmacy wellness companion"),
+    AgentApp("tutor", "agent_day4", ("4", "day4"), "Day 4 Teach-the-Tutor coach"),
+)
+
+_modules: dict[str, ModuleType] = {}
+
+
+def resolve_app(name: str) -> AgentApp:
+    """Look up an app by name or alias (e.g. "barista", "2", "day2").
+
+    Raises:
+        KeyError: If no app matches
+    """
+    key = name.strip().lower()
+    for app in AGENT_APPS:
+        if key == app.name or key in app.aliases:
+            return app
+    raise KeyError(f"Unknown agent app: {name!r}")
+
+
+def selected_apps() -> list[AgentApp]:
+    """Apps this worker hosts, from AGENT_APPS (comma-separated) or AGENT_DAY.
+
+    The first app is the default for jobs that don't name one.
+    """
+    configured = os.getenv("AGENT_APPS") or os.getenv("AGENT_DAY") or DEFAULT_APP
+    apps = []
+    for name in configured.split(","):
+        if not name.strip():
+            continue
+        try:
+            app = resolve_app(name)
+        except KeyError:
+            logger.warning(f"Ignoring unknown agent app {name!r}")
+            continue
+        if app not in apps:
+            apps.append(app)
+    return apps or [resolve_app(DEFAULT_APP)]
+
+
+def load_module(app: AgentApp) -> ModuleType:
+    """Import an app's module on first use."""
+    module = _modules.get(app.name)
+    if module is None:
+        try:
+            module = importlib.import_module(f".{app.module}", __package__)
+        except (ImportError, TypeError):
+            module = importlib.import_module(app.module)
+        _modules[app.name] = module
+    return module
+
+
+def prewarm(proc: JobProcess, silero_module) -> None:
+    """Import and prewarm only the apps this worker hosts."""
+    apps = selected_apps()
+    proc.userdata["agent_apps"] = [app.name for app in apps]
+    for app in apps:
+        logger.info(f"Prewarming {app.description} ({app.name})")
+        load_module(app).prewarm(proc, silero_module)
+
+
+def requested_app_name(ctx: JobContext) -> Optional[str]:
+    """App named by the job's dispatch metadata or the room metadata, if any.
+
+    Metadata may be a bare name ("wellness") or JSON with an "agent" key.
+    """
+    for metadata in (ctx.job.metadata, ctx.job.room.metadata):
+        if not metadata:
+            continue
+        try:
+            parsed = json.loads(metadata)
+        except json.JSONDecodeError:
+            return metadata.strip()
+        if isinstance(parsed, dict) and parsed.get("agent"):
+            return str(parsed["agent"])
+        if isinstance(parsed, (str, int)):
+            return str(parsed)
+    return None
+
+
+async def entrypoint(ctx: JobContext) -> None:
+    """Dispatch a job to the app its metadata names, or the worker's default app."""
+    hosted = [resolve_app(name) for name in ctx.proc.userdata.get("agent_apps", [])]
+    hosted = hosted or selected_apps()
+    app = hosted[0]
+
+    requested = requested_app_name(ctx)
+    if requested:
+        try:
+            candidate = resolve_app(requested)
+        except KeyError:
+            candidate = None
+        if candidate in hosted:
+            app = candidate
+        else:
+            logger.warning(
+                f"Job requested agent {requested!r}, which this worker doesn't host; "
+                f"using {app.name}"
+            )
+
+    logger.info(f"Dispatching room {ctx.room.name} to {app.description}")
+    await load_module(app).entrypoint(ctx)
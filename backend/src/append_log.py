@@ -0,0 +1,137 @@
+"""Append-only JSON-lines log with batched fsync, shared by the persistence layers."""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("agent")
+
+
+class AppendOnlyLog:
+    """A JSON-lines file that only ever grows.
+
+    Every record is written as a single ``os.write`` on a file opened with
+    ``O_APPEND``, so concurrent writers (threads or worker processes) never
+    clobber each other's lines. Appends cost O(1) regardless of how much
+    history the file holds. Durability is batched: the file is fsynced after
+    ``fsync_every`` appends or ``fsync_interval`` seconds, whichever comes
+    first, and always on ``flush()``/``close()``.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = 16,
+        fsync_interval: float = 1.0,
+    ):
+        """Initialize the log.
+
+        Args:
+            path: Location of the JSON-lines file (created on first append)
+            fsync_every: Number of appends between fsyncs (1 = fsync every write)
+            fsync_interval: Maximum seconds an append may stay un-synced
+        """
+        self.path = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._fd: Optional[int] = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, record: dict) -> None:
+        """Append one record to the end of the log.
+
+        Args:
+            record: JSON-serializable dictionary
+        """
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        data = line.encode("utf-8")
+        with self._lock:
+            fd = self._ensure_open()
+            os.write(fd, data)
+            self._pending += 1
+            if (
+                self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            ):
+                self._sync_locked()
+
+    def read_from(self, offset: int = 0) -> tuple[list[dict], int]:
+        """Read complete records starting at a byte offset.
+
+        A trailing line without a newline (a write still in flight, or a
+        torn write after a crash) is left unread so a later call can pick it
+        up once it is complete.
+
+        Args:
+            offset: Byte offset to start reading from
+
+        Returns:
+            Tuple of (records, offset just past the last complete line)
+        """
+        if not self.path.exists():
+            return [], offset
+
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                offset += len(raw)
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    records.append(json.loads(raw))
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping corrupt line in {self.path}: {e}")
+        return records, offset
+
+    def read_all(self) -> list[dict]:
+        """Read every complete record in the log.
+
+        Returns:
+            List of records in append order
+        """
+        records, _ = self.read_from(0)
+        return records
+
+    def size(self) -> int:
+        """Current size of the log file in bytes (0 if it doesn't exist)."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def flush(self) -> None:
+        """Fsync any appends that haven't been synced yet."""
+        with self._lock:
+            self._sync_locked()
+
+    def close(self) -> None:
+        """Flush pending appends and release the file descriptor."""
+        with self._lock:
+            self._sync_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _ensure_open(self) -> int:
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+        return self._fd
+
+    def _sync_locked(self) -> None:
+        if self._fd is not None and self._pending:
+            os.fsync(self._fd)
+        self._pending = 0
+        self._last_sync = time.monotonic()
@@ -0,0 +1,487 @@
+"""Offline benchmark of the day agents against local stub providers.
+
+Usage (from backend/):
+    uv run python src/benchmark.py --sessions 5 --output bench.json
+    uv run python src/benchmark.py --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from livekit.agents import AgentSession, APIConnectOptions, llm
+from livekit.agents.voice.agent_session import SessionConnectOptions
+
+try:
+    from .stub_providers import StubLLM, StubReply, StubSTT, StubTTS, silence
+    from .tool_profiler import ToolProfiler
+    from .turn_tracer import percentile
+except ImportError:
+    from stub_providers import StubLLM, StubReply, StubSTT, StubTTS, silence
+    from tool_profiler import ToolProfiler
+    from turn_tracer import percentile
+
+logger = logging.getLogger("agent")
+
+
+@dataclass
+class ScriptedTurn:
+    """One user turn: what the user says, the tools the LLM calls, and its reply."""
+
+    user: str
+    reply: str
+    tool_calls: list[tuple[str, dict]] = field(default_factory=list)
+
+
+@dataclass
+class Scenario:
+    """A scripted conversation with one day agent."""
+
+    agent: str
+    turns: list[ScriptedTurn]
+    # Builds (agent, userdata, cleanup) with all state under the given directory
+    build: Callable[[Path], Awaitable[tuple[Any, Any, Callable[[], Awaitable[None]]]]]
+
+
+@dataclass
+class ProviderConfig:
+    """Stub provider timings and failure rates."""
+
+    stt_latency: float = 0.2
+    llm_ttft: float = 0.3
+    llm_chunk_chars: int = 24
+    llm_chunk_interval: float = 0.02
+    tts_ttfb: float = 0.25
+    tts_chunk_ms: int = 100
+    failure_rate: float = 0.0
+
+
+async def _noop() -> None:
+    return None
+
+
+async def _build_starter(_: Path):
+    import agent_day1
+
+    userdata = agent_day1.new_userdata(SimpleNamespace(userdata={}))
+    return agent_day1.StarterAgent(userdata=userdata), userdata, _noop
+
+
+async def _build_barista(root: Path):
+    import agent_day2
+    from order_ledger import OrderLedger
+    from order_queue import OrderAnalytics, OrderQueue, TicketPrinter
+    from persistence import AsyncPersistence
+
+    # No simulated bar: its sleeps would dominate the session's shutdown
+    order_queue = OrderQueue()
+    order_queue.subscribe(TicketPrinter())
+    order_queue.subscribe(OrderAnalytics())
+    proc = SimpleNamespace(
+        userdata={"order_ledger": OrderLedger(str(root / "orders")), "order_queue": order_queue}
+    )
+    persistence = AsyncPersistence(name="orders")
+    userdata = agent_day2.new_userdata(proc, persistence)
+
+    async def cleanup():
+        await persistence.aclose()
+        await order_queue.aclose()
+        userdata.ledger.close()
+
+    return agent_day2.BaristaAgent(userdata=userdata), userdata, cleanup
+
+
+async def _build_wellness(root: Path):
+    import agent_day3
+    from persistence import AsyncPersistence
+    from wellness_state import WellnessLog
+    from wellness_storage import ShardedWellnessStore
+
+    store = ShardedWellnessStore(root / "wellness")
+    proc = SimpleNamespace(userdata={"wellness_log": WellnessLog(store=store)})
+    persistence = AsyncPersistence(name="wellness")
+    userdata = agent_day3.new_userdata(proc, "benchmark-user", root.name, persistence)
+
+    async def cleanup():
+        await persistence.aclose()
+        store.close()
+
+    return agent_day3.WellnessAgent(userdata=userdata), userdata, cleanup
+
+
+async def _build_tutor(_: Path):
+    import agent_day4
+
+    userdata = agent_day4.new_userdata(SimpleNamespace(userdata={}))
+    return agent_day4.TeachTheTutorAgent(userdata=userdata), userdata, _noop
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "starter": Scenario(
+        "starter",
+        [
+            ScriptedTurn("Hi there!", "Hi! What can I help you with today?"),
+            ScriptedTurn("Tell me a fun fact.", "Honey never spoils, even after thousands of years."),
+            ScriptedTurn("Thanks, bye!", "You're welcome, have a great day!"),
+        ],
+        _build_starter,
+    ),
+    "barista": Scenario(
+        "barista",
+        [
+            ScriptedTurn(
+                "Hi, can I get a latte?",
+                "A latte, great choice! What size would you like?",
+                [("update_drink_type", {"drink_type": "latte"})],
+            ),
+            ScriptedTurn(
+                "Medium please, with oat milk.",
+                "Medium with oat milk. What's your name for the order?",
+                [("update_size", {"size": "medium"}), ("update_milk", {"milk": "oat milk"})],
+            ),
+            ScriptedTurn(
+                "It's Sam.",
+                "Thanks Sam! Would you like any extras?",
+                [("update_name", {"name": "Sam"})],
+            ),
+            ScriptedTurn(
+                "Vanilla syrup, and that's all.",
+                "Perfect! Your order is in, it'll be ready shortly.",
+                [("add_extra", {"extra": "vanilla syrup"}), ("complete_order", {})],
+            ),
+        ],
+        _build_barista,
+    ),
+    "wellness": Scenario(
+        "wellness",
+        [
+            ScriptedTurn(
+                "Hi, I'm feeling pretty calm today.",
+                "Glad to hear you're calm. How's your energy?",
+                [("get_previous_check_ins", {"days": 7}), ("capture_mood", {"mood": "calm"})],
+            ),
+            ScriptedTurn(
+                "Medium energy I'd say.",
+                "Got it. What would you like to get done today?",
+                [("capture_energy_level", {"energy": "medium"})],
+            ),
+            ScriptedTurn(
+                "I want to go for a walk.",
+                "A walk sounds lovely. Shall I save today's check-in?",
+                [("add_objective", {"objective": "go for a walk"})],
+            ),
+            ScriptedTurn(
+                "Yes please.",
+                "Saved! Take care and enjoy your walk.",
+                [("generate_summary", {}), ("save_check_in", {})],
+            ),
+        ],
+        _build_wellness,
+    ),
+    "tutor": Scenario(
+        "tutor",
+        [
+            ScriptedTurn(
+                "What can I study?",
+                "Here are the concepts we can cover. Which would you like?",
+                [("list_concepts", {})],
+            ),
+            ScriptedTurn(
+                "Quiz me please.",
+                "Quiz mode it is. Here's your first question.",
+                [("set_learning_mode", {"mode": "quiz"}), ("get_quiz_prompt", {})],
+            ),
+            ScriptedTurn(
+                "Let's move on to the next one.",
+                "Moving on to the next concept.",
+                [("advance_to_next_concept", {})],
+            ),
+        ],
+        _build_tutor,
+    ),
+}
+
+
+def scripted_replies(turns: list[ScriptedTurn]) -> Callable[[llm.ChatContext], StubReply]:
+    """LLM script that calls each turn's tools, then gives its reply once they've run."""
+    by_user = {turn.user: turn for turn in turns}
+
+    def script(chat_ctx: llm.ChatContext) -> StubReply:
+        tools_ran = False
+        for item in reversed(chat_ctx.items):
+            if item.type == "function_call_output":
+                tools_ran = True
+            elif item.type == "message" and item.role == "user":
+                turn = by_user.get(item.text_content)
+                if turn is None:
+                    return StubReply(text="Sorry, could you repeat that?")
+                if turn.tool_calls and not tools_ran:
+                    return StubReply(tool_calls=turn.tool_calls)
+                return StubReply(text=turn.reply)
+        return StubReply(text="Hello!")
+
+    return script
+
+
+async def run_session(
+    scenario: Scenario,
+    config: ProviderConfig,
+    root: Path,
+    think_time: float = 0.0,
+    on_turn: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Play one scripted conversation and time every turn.
+
+    Each turn runs the user's (silent) audio through the stub STT, the
+    transcript through the agent session (LLM, tools and agent code), and
+    the reply through the stub TTS up to its first audio frame.
+
+    Args:
+        scenario: Conversation to play
+        config: Stub provider timings
+        root: Directory for the agent's files
+        think_time: Seconds of user speech to wait before each turn
+        on_turn: Called with each turn's timings as soon as it finishes
+    """
+    stt = StubSTT(latency=config.stt_latency, failure_rate=config.failure_rate)
+    tts = StubTTS(
+        ttfb=config.tts_ttfb, chunk_ms=config.tts_chunk_ms, failure_rate=config.failure_rate
+    )
+    stub_llm = StubLLM(
+        script=scripted_replies(scenario.turns),
+        ttft=config.llm_ttft,
+        chunk_chars=config.llm_chunk_chars,
+        chunk_interval=config.llm_chunk_interval,
+        failure_rate=config.failure_rate,
+    )
+    # Retry quickly so injected failures measure recovery, not backoff
+    retries = APIConnectOptions(max_retry=2, retry_interval=0.05)
+    agent, userdata, cleanup = await scenario.build(root)
+    profiler = ToolProfiler(scenario.agent)
+    await profiler.instrument(agent)
+
+    turns, errors = [], 0
+    cpu_start = time.process_time()
+    # The session gets no STT: there's no audio input, turns are fed as text
+    session = AgentSession(
+        llm=stub_llm,
+        tts=tts,
+        userdata=userdata,
+        conn_options=SessionConnectOptions(
+            stt_conn_options=retries, llm_conn_options=retries, tts_conn_options=retries
+        ),
+    )
+    try:
+        await session.start(agent)
+        for turn in scenario.turns:
+            if think_time:
+                await asyncio.sleep(think_time)
+            try:
+                start = time.perf_counter()
+                stt.queue_transcript(turn.user)
+                event = await stt.recognize(silence(1.0), conn_options=retries)
+                transcript = event.alternatives[0].text
+                stt_done = time.perf_counter()
+
+                result = await session.run(user_input=transcript)
+                agent_done = time.perf_counter()
+
+                reply = " ".join(
+                    ev.item.text_content or ""
+                    for ev in result.events
+                    if ev.type == "message" and ev.item.role == "assistant"
+                )
+                stream = tts.synthesize(reply or turn.reply, conn_options=retries)
+                async for _ in stream:
+                    break
+                first_audio = time.perf_counter()
+                await stream.aclose()
+            except Exception as e:
+                errors += 1
+                logger.warning(f"{scenario.agent} turn failed: {e}")
+                continue
+            timings = {
+                "stt": stt_done - start,
+                "agent": agent_done - stt_done,
+                "tts_first_audio": first_audio - agent_done,
+                "total": first_audio - start,
+            }
+            turns.append(timings)
+            if on_turn is not None:
+                on_turn(timings)
+    finally:
+        await session.aclose()
+        await cleanup()
+        await stub_llm.aclose()
+
+    return {
+        "turns": turns,
+        "errors": errors,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "tools": profiler,
+    }
+
+
+def _ms(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {f"p{p}": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+
+
+async def benchmark_agent(
+    scenario: Scenario, config: ProviderConfig, sessions: int, seconds_per_turn: float
+) -> dict:
+    """Run several sessions of one scenario and summarize them."""
+    turns, errors, cpu = [], 0, 0.0
+    tool_rows: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix=f"bench-{scenario.agent}-") as tmp:
+        for i in range(sessions):
+            run = await run_session(scenario, config, Path(tmp) / f"s{i}")
+            turns.extend(run["turns"])
+            errors += run["errors"]
+            cpu += run["cpu_seconds"]
+            for name, row in run["tools"].report().items():
+                tool_rows.setdefault(name, []).append(row)
+
+        # One more session under tracemalloc, kept apart so its overhead
+        # doesn't skew the timings above
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        await run_session(scenario, config, Path(tmp) / "memory")
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    cpu_per_session = cpu / sessions
+    session_seconds = seconds_per_turn * len(scenario.turns)
+    return {
+        "sessions": sessions,
+        "turns": len(turns),
+        "errors": errors,
+        "turn_latency_ms": {
+            stage: _ms([t[stage] for t in turns])
+            for stage in ("total", "stt", "agent", "tts_first_audio")
+        },
+        "tools": {
+            name: {
+                "calls": sum(r["calls"] for r in rows),
+                "wall_p95_ms": max(r["wall_p95_ms"] for r in rows),
+                "blocking_avg_ms": round(sum(r["blocking_avg_ms"] for r in rows) / len(rows), 3),
+                "longest_block_ms": max(r["longest_block_ms"] for r in rows),
+            }
+            for name, rows in tool_rows.items()
+        },
+        "memory_kb_per_session": {"peak": peak // 1024, "retained": retained // 1024},
+        "cpu_ms_per_session": round(cpu_per_session * 1000, 1),
+        # How many sessions one core could keep up with if each turn takes
+        # seconds_per_turn of real conversation time
+        "sessions_per_core": round(session_seconds / cpu_per_session, 1) if cpu_per_session else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmarks(
+    agents: list[str], config: ProviderConfig, sessions: int, seconds_per_turn: float
+) -> dict:
+    """Benchmark the given agents and return a machine-readable report."""
+    results = {}
+    for name in agents:
+        logger.warning(f"Benchmarking {name} ({sessions} sessions)")
+        results[name] = await benchmark_agent(SCENARIOS[name], config, sessions, seconds_per_turn)
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {**asdict(config), "sessions": sessions, "seconds_per_turn": seconds_per_turn},
+        "agents": results,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Regressions of p95 turn latency or CPU per session beyond the allowed ratio."""
+    problems = []
+    for name, current in report["agents"].items():
+        previous = baseline.get("agents", {}).get(name)
+        if not previous:
+            continue
+        checks = {
+            "p95 turn latency": (
+                current["turn_latency_ms"]["total"].get("p95"),
+                previous["turn_latency_ms"]["total"].get("p95"),
+            ),
+            "cpu per session": (current["cpu_ms_per_session"], previous["cpu_ms_per_session"]),
+        }
+        for label, (now, before) in checks.items():
+            if now and before and now > before * (1 + max_regression):
+                problems.append(f"{name}: {label} {before} -> {now} ms")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", default=",".join(SCENARIOS), help="comma-separated agents")
+    parser.add_argument("--sessions", type=int, default=5, help="sessions per agent")
+    parser.add_argument("--seconds-per-turn", type=float, default=5.0,
+                        help="real conversation time per turn, for sessions_per_core")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="probability each provider request fails")
+    parser.add_argument("--llm-ttft", type=float, default=ProviderConfig.llm_ttft)
+    parser.add_argument("--stt-latency", type=float, default=ProviderConfig.stt_latency)
+    parser.add_argument("--tts-ttfb", type=float, default=ProviderConfig.tts_ttfb)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="show agent logs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    config = ProviderConfig(
+        stt_latency=args.stt_latency,
+        llm_ttft=args.llm_ttft,
+        tts_ttfb=args.tts_ttfb,
+        failure_rate=args.failure_rate,
+    )
+    agents = [name.strip() for name in args.agents.split(",") if name.strip()]
+    report = asyncio.run(run_benchmarks(agents, config, args.sessions, args.seconds_per_turn))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        problems = compare(report, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Bounded chat context: recent turns verbatim, older turns as a rolling summary.
+
+Every LLM request carries the whole conversation, so without a bound a
+long session (e.g. a tutor cycling through concepts) sends more prompt
+tokens every turn and its turn latency grows with it. ``ContextWindow``
+sends the last few user turns verbatim and replaces everything before them
+with a summary. Summaries are written by a separate, cheaper LLM in the
+background: until one is ready, older turns are still sent verbatim, so
+no turn waits on summarization and nothing is dropped.
+
+Tool state (the order so far, mastery counters) is sent as a compact JSON
+state message on every turn, so the agent doesn't depend on finding it in
+the history.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+
+from livekit.agents import llm, utils
+
+logger = logging.getLogger("agent")
+
+KEEP_TURNS_ENV = "CHAT_CONTEXT_TURNS"
+DEFAULT_KEEP_TURNS = 6
+
+SUMMARY_PROMPT = """You maintain a running summary of a voice conversation between an agent and a user.
+Update the summary with the new part of the conversation. Keep every fact the agent may need later:
+names, choices, answers, scores, preferences and open questions. Drop greetings and small talk.
+Write at most 120 words of plain text."""
+
+
+def _render(item: Any) -> Optional[str]:
+    if item.type == "message":
+        text = item.text_content
+        return f"{item.role}: {text}" if text else None
+    if item.type == "function_call":
+        return f"(agent called {item.name} {item.arguments})"
+    if item.type == "function_call_output":
+        return f"({item.name} returned: {item.output})"
+    return None
+
+
+def split_turns(items: list) -> list[list]:
+    """Group chat items into turns, each starting at a user message.
+
+    Tool calls and their outputs stay in the turn they belong to.
+    """
+    turns: list[list] = []
+    for item in items:
+        if not turns or (item.type == "message" and item.role == "user"):
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+
+class ContextWindow:
+    """Trims the chat context sent to the LLM (used from an agent's llm_node)."""
+
+    def __init__(
+        self,
+        agent: str,
+        summarizer: llm.LLM,
+        keep_turns: Optional[int] = None,
+        state: Optional[Callable[[], Any]] = None,
+    ):
+        """Initialize the window.
+
+        Args:
+            agent: Agent name for logs
+            summarizer: LLM that writes the summaries (not the session's
+                LLM, whose metrics are reported as the user's turns)
+            keep_turns: User turns sent verbatim (default: CHAT_CONTEXT_TURNS, else 6)
+            state: Returns the session's tool state (JSON-serializable)
+        """
+        if keep_turns is None:
+            keep_turns = int(os.getenv(KEEP_TURNS_ENV, DEFAULT_KEEP_TURNS))
+        self.agent = agent
+        self.summarizer = summarizer
+        self.keep_turns = max(1, keep_turns)
+        self.state = state
+        self.summary = ""
+        self.summaries = 0
+        self._folded: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def apply(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """The chat context to send for this turn.
+
+        Leading system messages (the instructions) are kept as they are and
+        followed by the summary and the tool state. Starts summarizing the
+        turns that fell out of the window if nothing is summarizing yet.
+        """
+        items = list(chat_ctx.items)
+        head = 0
+        while head < len(items) and items[head].type == "message" and items[head].role in (
+            "system",
+            "developer",
+        ):
+            head += 1
+        instructions, body = items[:head], [i for i in items[head:] if i.id not in self._folded]
+
+        turns = split_turns(body)
+        if len(turns) > self.keep_turns and self._task is None:
+            old = [item for turn in turns[: -self.keep_turns] for item in turn]
+            self._task = asyncio.create_task(self._summarize(old))
+
+        context = []
+        if self.summary:
+            context.append(
+                llm.ChatMessage(
+                    role="system", content=[f"SUMMARY OF THE EARLIER CONVERSATION:\n{self.summary}"]
+                )
+            )
+        if self.state is not None:
+            state = json.dumps(self.state(), separators=(",", ":"), default=str)
+            context.append(
+                llm.ChatMessage(
+                    role="system",
+                    content=[f"CURRENT STATE (from your tools; trust it over the conversation):\n{state}"],
+                )
+            )
+        return llm.ChatContext(instructions + context + body)
+
+    async def _summarize(self, items: list) -> None:
+        transcript = "\n".join(line for item in items if (line := _render(item)))
+        prompt = llm.ChatContext()
+        prompt.add_message(role="system", content=SUMMARY_PROMPT)
+        prompt.add_message(
+            role="user",
+            content=f"Summary so far:\n{self.summary or '(none)'}\n\nNew conversation:\n{transcript}",
+        )
+        try:
+            chunks = []
+            async with self.summarizer.chat(chat_ctx=prompt) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        chunks.append(chunk.delta.content)
+            summary = "".join(chunks).strip()
+            if summary:
+                self.summary = summary
+                self._folded.update(item.id for item in items)
+                self.summaries += 1
+                logger.debug(f"Folded {len(items)} chat items into the summary ({self.agent})")
+        except Exception as e:
+            # The turns stay verbatim; the next turn tries again
+            logger.warning(f"Couldn't summarize the chat context ({self.agent}): {e}")
+        finally:
+            self._task = None
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            await utils.aio.cancel_and_wait(self._task)
+
+    def stats(self) -> dict:
+        return {"summaries": self.summaries, "folded_items": len(self._folded)}
+
+
+def context_window(
+    ctx: Any,
+    agent: str,
+    summarizer: llm.LLM,
+    state: Optional[Callable[[], Any]] = None,
+) -> ContextWindow:
+    """Create a job's context window; CHAT_CONTEXT_TURNS sets the turns kept verbatim.
+
+    Args:
+        ctx: Job context (used to register the shutdown callback)
+        agent: Agent name for logs
+        summarizer: LLM that writes the summaries
+        state: Returns the session's tool state, see ContextWindow
+    """
+    window = ContextWindow(agent, summarizer, state=state)
+
+    async def close_window():
+        await window.aclose()
+        if window.summaries:
+            logger.info(f"Chat context ({agent}): {window.stats()}")
+
+    ctx.add_shutdown_callback(close_window)
+    return window
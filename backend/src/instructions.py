@@ -0,0 +1,84 @@
+"""Assembles agent instructions as a static prefix plus per-session context.
+
+The instructions are sent as the system prompt with every LLM request.
+Gemini 2.5 caches repeated request prefixes implicitly, and the cached
+tokens are cheaper and faster to process, but only once the prompt reaches
+a minimum size (1024 tokens on Flash). A prefix can only be shared between
+callers if it is byte-identical, so per-caller details (e.g. the last
+wellness check-in) must come after all static text, not in the middle of
+it. Agents whose static prefix is below the minimum (the barista's is about
+600 tokens) get no implicit caching; ``build`` logs when that's the case.
+Cached prompt tokens show up in the
+``voice_agent_llm_tokens_total{kind="cached"}`` metric.
+"""
+
+import inspect
+import logging
+
+logger = logging.getLogger("agent")
+
+# Rough tokens per character for English prompts (Gemini averages ~4 chars/token)
+CHARS_PER_TOKEN = 4
+# Smallest prompt Gemini 2.5 Flash caches implicitly
+IMPLICIT_CACHE_MIN_TOKENS = 1024
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count, without a round trip to the provider."""
+    return round(len(text) / CHARS_PER_TOKEN)
+
+
+def compact(text: str) -> str:
+    """Strip the indentation and trailing spaces of a triple-quoted prompt.
+
+    Source indentation is sent (and billed) as prompt tokens on every turn.
+    """
+    lines = [line.rstrip() for line in inspect.cleandoc(text).splitlines()]
+    return "\n".join(lines)
+
+
+class InstructionBuilder:
+    """An agent's static instructions followed by named per-session sections."""
+
+    def __init__(self, agent: str, static: str):
+        """Initialize the builder.
+
+        Args:
+            agent: Agent name for the size report
+            static: Instructions shared by every session, sent first
+        """
+        self.agent = agent
+        self.static = compact(static)
+        self.sections: list[tuple[str, str]] = []
+
+    def add(self, name: str, text: str) -> "InstructionBuilder":
+        """Append per-session context after the static prefix (empty text is skipped).
+
+        Args:
+            name: Section heading, which the static instructions can refer to
+            text: Section content
+        """
+        if text:
+            self.sections.append((name.upper(), compact(text)))
+        return self
+
+    def build(self) -> str:
+        """Assemble the instructions and log their size per component."""
+        parts = [self.static] + [f"{name}:\n{text}" for name, text in self.sections]
+        instructions = "\n\n".join(parts)
+        counts = self.token_counts()
+        logger.info(f"Instructions ({self.agent}): ~{counts} tokens")
+        if counts["static"] < IMPLICIT_CACHE_MIN_TOKENS:
+            logger.info(
+                f"Instructions ({self.agent}): static prefix is below the "
+                f"{IMPLICIT_CACHE_MIN_TOKENS}-token minimum for implicit prompt caching"
+            )
+        return instructions
+
+    def token_counts(self) -> dict[str, int]:
+        """Estimated tokens of the static prefix, each section and the total."""
+        counts = {"static": estimate_tokens(self.static)}
+        for name, text in self.sections:
+            counts[name.lower()] = estimate_tokens(text)
+        counts["total"] = sum(counts.values())
+        return counts
@@ -0,0 +1,239 @@
+"""Local search over shared-data content, exposed to agents as a function tool.
+
+Pasting a whole FAQ or course into the instructions makes every LLM
+request longer. ``KnowledgeBase`` indexes the content once at prewarm
+instead, and an agent's ``search`` tool returns only the few entries a
+question is about. Any ``shared-data/*.json`` file can be indexed: each
+object in it becomes a document made of its string fields.
+
+Two indexes are built:
+
+- an inverted index with BM25 scoring, for keyword questions
+- a matrix of hashed character-trigram vectors (NumPy, optional), searched by
+  cosine similarity when no keyword matches, e.g. a misheard "condishunal"
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from livekit.agents import function_tool, llm
+
+try:
+    import numpy as np
+except ImportError:  # vector search is skipped without NumPy
+    np = None
+
+logger = logging.getLogger("agent")
+
+# BM25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+VECTOR_DIM = 1024
+# Below this cosine similarity a vector match is noise
+MIN_SIMILARITY = 0.25
+MAX_RESULT_CHARS = 600
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "that", "the", "this",
+    "to", "was", "what", "when", "where", "which", "who", "why", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words without stopwords, with plural 's' stripped."""
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+@dataclass(frozen=True)
+class Document:
+    """One searchable entry, e.g. a concept or an FAQ answer."""
+
+    id: str
+    title: str
+    text: str
+    source: str
+
+
+def _strings(value: Any) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        strings = []
+        for key, v in value.items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                strings.append(f"{key} {v}")
+            else:
+                strings.extend(_strings(v))
+        return strings
+    if isinstance(value, list):
+        return [s for v in value for s in _strings(v)]
+    return []
+
+
+def documents_from_json(path: Path) -> list[Document]:
+    """Turn a JSON content file into documents.
+
+    A top-level list gives one document per entry. A top-level object gives
+    one per entry of each of its lists (e.g. the menu's drinks and milks).
+    Titles come from ``title``, ``question`` or ``name`` when present.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    if isinstance(raw, list):
+        entries = raw
+    elif isinstance(raw, dict):
+        entries = [entry for value in raw.values() if isinstance(value, list) for entry in value]
+    else:
+        entries = []
+
+    documents = []
+    for n, entry in enumerate(entries):
+        if isinstance(entry, dict):
+            doc_id = str(entry.get("id") or entry.get("name") or f"{path.stem}-{n}")
+            title = str(entry.get("title") or entry.get("question") or entry.get("name") or doc_id)
+            body = {k: v for k, v in entry.items() if k not in ("id", "title", "question", "name")}
+        else:
+            doc_id = title = f"{path.stem}-{n}"
+            body = entry
+        text = " ".join(_strings(body))
+        if text:
+            documents.append(Document(doc_id, title, text, path.stem))
+    return documents
+
+
+def _vector(text: str) -> Any:
+    vec = np.zeros(VECTOR_DIM, dtype=np.float32)
+    padded = f"  {' '.join(tokenize(text))}  "
+    for i in range(len(padded) - 2):
+        digest = hashlib.blake2b(padded[i : i + 3].encode(), digest_size=4).digest()
+        vec[int.from_bytes(digest, "little") % VECTOR_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class KnowledgeBase:
+    """BM25 and vector indexes over a fixed set of documents (read-only after build)."""
+
+    def __init__(self, documents: list[Document]):
+        """Build the indexes.
+
+        Args:
+            documents: Content to search
+        """
+        start = time.perf_counter()
+        self.documents = documents
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+        for i, doc in enumerate(documents):
+            terms = tokenize(f"{doc.title} {doc.text}")
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, []).append((i, count))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if documents else 0.0
+        n = len(documents)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._matrix = None
+        if np is not None and documents:
+            self._matrix = np.stack([_vector(f"{d.title} {d.text}") for d in documents])
+        logger.info(
+            f"Indexed {n} documents, {len(self._postings)} terms "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    @classmethod
+    def from_files(cls, paths: list[Path]) -> "KnowledgeBase":
+        return cls([doc for path in paths for doc in documents_from_json(path)])
+
+    @classmethod
+    def from_env(cls, pattern: str = "*.json") -> "KnowledgeBase":
+        """Index every matching file in shared-data (or KNOWLEDGE_BASE_DIR)."""
+        default_dir = Path(__file__).resolve().parents[2] / "shared-data"
+        configured = os.getenv("KNOWLEDGE_BASE_DIR")
+        directory = Path(configured) if configured else default_dir
+        return cls.from_files(sorted(directory.glob(pattern)))
+
+    def search(self, query: str, k: int = 3) -> list[tuple[Document, float]]:
+        """Top documents for a query by BM25 score (keyword matches only)."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = K1 * (1 - B + B * self._lengths[i] / self._avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[i], score) for i, score in top]
+
+    def similar(self, query: str, k: int = 3) -> list[tuple[Document, float]]:
+        """Top documents by cosine similarity of trigram vectors (empty without NumPy)."""
+        if self._matrix is None:
+            return []
+        scores = self._matrix @ _vector(query)
+        k = min(k, len(self.documents))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self.documents[i], float(scores[i])) for i in top if scores[i] >= MIN_SIMILARITY
+        ]
+
+    def lookup(self, query: str, k: int = 3) -> list[Document]:
+        """Keyword results, or the closest vectors when no keyword matches."""
+        results = self.search(query, k) or self.similar(query, k)
+        return [doc for doc, _ in results]
+
+
+def search_tool(
+    kb: KnowledgeBase,
+    name: str = "search_knowledge",
+    description: Optional[str] = None,
+    max_results: int = 3,
+) -> llm.FunctionTool:
+    """A function tool that answers from the knowledge base.
+
+    Args:
+        kb: Content to search
+        name: Tool name the instructions refer to
+        description: What the content is, for the LLM (a generic one by default)
+        max_results: Entries returned per call
+    """
+
+    async def search(query: str) -> str:
+        """Search the reference content.
+
+        Args:
+            query: The question or keywords to look up
+        """
+        documents = kb.lookup(query, max_results)
+        if not documents:
+            return "Nothing in the content matches that. Say so rather than guessing."
+        return "\n\n".join(f"{doc.title}: {doc.text[:MAX_RESULT_CHARS]}" for doc in documents)
+
+    # Profiling and logs refer to tools by function name
+    search.__name__ = search.__qualname__ = name
+    return function_tool(
+        search,
+        name=name,
+        description=description
+        or "Search the reference content and answer from what it returns.",
+    )
@@ -0,0 +1,419 @@
+"""Load and soak test: many simulated rooms sharing one worker's event loop.
+
+Every room replays a benchmark scenario against the stub providers, over
+and over, with the user "speaking" for --think-time seconds before each
+turn. All rooms share one process and event loop, so the results are a
+bound on what a single worker process can host before audio stutters.
+
+Usage (from backend/):
+    uv run python src/load_test.py --ramp 1,2,4,8,16,32 --stage-seconds 60
+    uv run python src/load_test.py --soak-minutes 120 --rooms 8 --tracemalloc
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import psutil
+from livekit.agents import AgentSession
+
+try:
+    from .benchmark import SCENARIOS, ProviderConfig, run_session
+    from .loop_watchdog import LoopWatchdog, Stall
+    from .turn_tracer import percentile
+except ImportError:
+    from benchmark import SCENARIOS, ProviderConfig, run_session
+    from loop_watchdog import LoopWatchdog, Stall
+    from turn_tracer import percentile
+
+logger = logging.getLogger("agent")
+
+LAG_PROBE_INTERVAL = 0.05
+
+
+def _ms(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    summary = {f"p{p}": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+    summary["max"] = round(values[-1] * 1000, 1)
+    return summary
+
+
+class LoopLagProbe:
+    """Measures event-loop lag: how late a short sleep wakes up."""
+
+    def __init__(self, interval: float = LAG_PROBE_INTERVAL):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def drain(self) -> list[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class LoadTest:
+    """A pool of simulated rooms that can be grown while it runs."""
+
+    def __init__(
+        self,
+        agents: list[str],
+        config: ProviderConfig,
+        root: Path,
+        think_time: float,
+        lag_budget_ms: float = 20.0,
+        seed: int = 0,
+    ):
+        """Initialize the pool.
+
+        Args:
+            agents: Scenarios to spread the rooms over, round-robin
+            config: Stub provider timings
+            root: Scratch directory for the agents' files
+            think_time: Seconds the user speaks before each turn
+            lag_budget_ms: Loop stalls longer than this are attributed to code
+            seed: Seed for staggering room start times
+        """
+        self.agents = agents
+        self.config = config
+        self.root = root
+        self.think_time = think_time
+        self.probe = LoopLagProbe()
+        self.watchdog = LoopWatchdog("load_test", budget_ms=lag_budget_ms)
+        self.watchdog.add_listener(self._on_stall)
+        self._stalls: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._rooms: list[asyncio.Task] = []
+        self._turns: list[dict] = []
+        self._errors = 0
+        self._sessions = 0
+        self._process = psutil.Process()
+
+    @property
+    def rooms(self) -> int:
+        return len(self._rooms)
+
+    def rss_mb(self) -> float:
+        return self._process.memory_info().rss / (1024 * 1024)
+
+    def _on_turn(self, timings: dict) -> None:
+        self._turns.append(timings)
+
+    def _on_stall(self, stall: Stall) -> None:
+        self._stalls[stall.culprit] += 1
+
+    async def _room(self, index: int) -> None:
+        scenario = SCENARIOS[self.agents[index % len(self.agents)]]
+        # Stagger starts so rooms don't take turns in lockstep
+        await asyncio.sleep(self._rng.uniform(0, max(self.think_time, 0.1)))
+        for n in itertools.count():
+            path = self.root / f"room{index}" / f"s{n}"
+            try:
+                run = await run_session(scenario, self.config, path, self.think_time, self._on_turn)
+                self._errors += run["errors"]
+                self._sessions += 1
+            except Exception as e:
+                self._errors += 1
+                logger.warning(f"room {index} ({scenario.agent}) session failed: {e}")
+            # Don't let the soak test's disk usage grow with its length
+            await asyncio.to_thread(shutil.rmtree, path, True)
+
+    def scale_to(self, rooms: int) -> None:
+        """Start rooms until ``rooms`` are running (the pool never shrinks)."""
+        self.probe.start()
+        self.watchdog.start()
+        while len(self._rooms) < rooms:
+            self._rooms.append(asyncio.create_task(self._room(len(self._rooms))))
+
+    async def measure(self, seconds: float) -> dict:
+        """Run for ``seconds`` and summarize what happened in that window."""
+        # Let any probe sleep that straddles the window start finish first
+        await asyncio.sleep(self.probe.interval * 2)
+        self.probe.drain()
+        self._turns, self._errors, self._sessions = [], 0, 0
+        self._stalls = Counter()
+        rss_start = self.rss_mb()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+        await asyncio.sleep(seconds)
+
+        wall = time.perf_counter() - wall_start
+        cpu_percent = (time.process_time() - cpu_start) / wall * 100
+        turns = self._turns
+        return {
+            "rooms": self.rooms,
+            "seconds": round(wall, 1),
+            "sessions": self._sessions,
+            "turns": len(turns),
+            "errors": self._errors,
+            "turn_latency_ms": {
+                stage: _ms([t[stage] for t in turns])
+                for stage in ("total", "agent", "tts_first_audio")
+            },
+            "loop_lag_ms": _ms(self.probe.drain()),
+            # What held the loop past the lag budget, by handler or tool
+            "stalls": dict(self._stalls.most_common(10)),
+            "cpu_percent": round(cpu_percent, 1),
+            "cpu_percent_per_room": round(cpu_percent / self.rooms, 2) if self.rooms else None,
+            "rss_mb": round(self.rss_mb(), 1),
+            "rss_growth_mb": round(self.rss_mb() - rss_start, 1),
+        }
+
+    async def aclose(self) -> None:
+        for task in self._rooms:
+            task.cancel()
+        await asyncio.gather(*self._rooms, return_exceptions=True)
+        self._rooms = []
+        await self.probe.aclose()
+        await self.watchdog.aclose()
+
+
+def find_knee(stages: list[dict], latency_factor: float, lag_budget_ms: float) -> dict:
+    """The largest room count before latency or loop lag degrades.
+
+    A stage is degraded when its p95 turn latency exceeds the first stage's
+    by ``latency_factor``, or its p99 loop lag exceeds ``lag_budget_ms``
+    (past which audio frames are delivered late and playback stutters).
+    """
+    measured = [s for s in stages if s["turn_latency_ms"]["total"]]
+    if not measured:
+        return {"rooms": None, "limited_by": None}
+    baseline = measured[0]["turn_latency_ms"]["total"]["p95"]
+    last_good = None
+    for stage in measured:
+        reasons = []
+        if stage["turn_latency_ms"]["total"]["p95"] > baseline * latency_factor:
+            reasons.append("turn latency")
+        if stage["loop_lag_ms"].get("p99", 0.0) > lag_budget_ms:
+            reasons.append("loop lag")
+        if reasons:
+            return {"rooms": last_good, "limited_by": " and ".join(reasons)}
+        last_good = stage["rooms"]
+    # Never degraded: the real knee is beyond the largest stage
+    return {"rooms": last_good, "limited_by": None}
+
+
+async def run_ramp(
+    agents: list[str],
+    config: ProviderConfig,
+    ramp: list[int],
+    stage_seconds: float,
+    think_time: float,
+    warmup: float = 5.0,
+    latency_factor: float = 1.5,
+    lag_budget_ms: float = 20.0,
+) -> dict:
+    """Step the number of concurrent rooms up through ``ramp`` and find the knee."""
+    stages = []
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        load = LoadTest(agents, config, Path(tmp), think_time, lag_budget_ms)
+        try:
+            for rooms in ramp:
+                load.scale_to(rooms)
+                # Discard the new rooms' start-up burst
+                await asyncio.sleep(warmup)
+                stage = await load.measure(stage_seconds)
+                logger.warning(
+                    f"{rooms} rooms: p95 turn {stage['turn_latency_ms']['total'].get('p95')} ms, "
+                    f"p99 loop lag {stage['loop_lag_ms'].get('p99')} ms, "
+                    f"cpu {stage['cpu_percent']}%, rss {stage['rss_mb']} MB"
+                )
+                stages.append(stage)
+        finally:
+            await load.aclose()
+    return {
+        "mode": "ramp",
+        "agents": agents,
+        "think_time": think_time,
+        "stages": stages,
+        "knee": find_knee(stages, latency_factor, lag_budget_ms),
+    }
+
+
+def _slope_per_hour(points: list[tuple[float, float]]) -> Optional[float]:
+    """Least-squares slope of (seconds, value) points, per hour."""
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if not var:
+        return None
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var * 3600
+
+
+def _live_sessions() -> int:
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, AgentSession))
+
+
+async def run_soak(
+    agents: list[str],
+    config: ProviderConfig,
+    rooms: int,
+    minutes: float,
+    sample_seconds: float,
+    think_time: float,
+    trace_memory: bool = False,
+    warmup: float = 30.0,
+) -> dict:
+    """Hold ``rooms`` rooms for ``minutes`` and watch memory for leaks.
+
+    Besides RSS, every sample counts the AgentSession objects still alive.
+    Finished sessions linger until their pending timers fire, so the count
+    levels off a few times above the room count; a steady climb means
+    something (an event handler, a per-process cache) keeps them reachable.
+    Trends are fitted to the second half of the samples, after allocator
+    and cache warm-up.
+    """
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="soak-") as tmp:
+        load = LoadTest(agents, config, Path(tmp), think_time)
+        try:
+            load.scale_to(rooms)
+            await asyncio.sleep(warmup)
+            if trace_memory:
+                tracemalloc.start()
+                before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+            while time.perf_counter() - start < minutes * 60:
+                sample = await load.measure(sample_seconds)
+                gc.collect()
+                sample["elapsed_s"] = round(time.perf_counter() - start, 1)
+                sample["live_sessions"] = _live_sessions()
+                logger.warning(
+                    f"{sample['elapsed_s']:.0f}s: rss {sample['rss_mb']} MB, "
+                    f"{sample['live_sessions']} live sessions, "
+                    f"p99 loop lag {sample['loop_lag_ms'].get('p99')} ms"
+                )
+                samples.append(sample)
+            if trace_memory:
+                after = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+        finally:
+            await load.aclose()
+
+    steady = samples[len(samples) // 2 :]
+    report = {
+        "mode": "soak",
+        "agents": agents,
+        "rooms": rooms,
+        "think_time": think_time,
+        "samples": samples,
+        "rss_mb_per_hour": _slope_per_hour([(s["elapsed_s"], s["rss_mb"]) for s in steady]),
+        "live_sessions_per_hour": _slope_per_hour(
+            [(s["elapsed_s"], s["live_sessions"]) for s in steady]
+        ),
+    }
+    if trace_memory:
+        report["top_growth"] = [
+            {"where": str(stat.traceback[0]), "kb": stat.size_diff // 1024, "count": stat.count_diff}
+            for stat in after.compare_to(before, "lineno")[:15]
+        ]
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", default=",".join(SCENARIOS), help="comma-separated agents")
+    parser.add_argument("--ramp", default="1,2,4,8,16,32",
+                        help="concurrent rooms at each stage of the ramp")
+    parser.add_argument("--stage-seconds", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="seconds to let new rooms settle before measuring")
+    parser.add_argument("--think-time", type=float, default=3.0,
+                        help="seconds the user speaks before each turn")
+    parser.add_argument("--latency-factor", type=float, default=1.5,
+                        help="p95 slowdown vs the first stage that counts as the knee")
+    parser.add_argument("--lag-budget-ms", type=float, default=20.0,
+                        help="p99 event-loop lag that counts as the knee")
+    parser.add_argument("--soak-minutes", type=float,
+                        help="run a soak test of this length instead of a ramp")
+    parser.add_argument("--rooms", type=int, default=8, help="concurrent rooms for the soak test")
+    parser.add_argument("--sample-seconds", type=float, default=60.0,
+                        help="soak test sampling interval")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="report the allocation sites that grew during the soak test")
+    parser.add_argument("--max-rss-growth", type=float, default=50.0,
+                        help="soak RSS growth (MB/hour) that fails the run")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="probability each provider request fails")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="show agent logs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    config = ProviderConfig(failure_rate=args.failure_rate)
+    agents = [name.strip() for name in args.agents.split(",") if name.strip()]
+    if args.soak_minutes:
+        report = asyncio.run(
+            run_soak(
+                agents,
+                config,
+                args.rooms,
+                args.soak_minutes,
+                args.sample_seconds,
+                args.think_time,
+                trace_memory=args.tracemalloc,
+                warmup=args.warmup,
+            )
+        )
+    else:
+        ramp = [int(n) for n in args.ramp.split(",") if n.strip()]
+        report = asyncio.run(
+            run_ramp(
+                agents,
+                config,
+                ramp,
+                args.stage_seconds,
+                args.think_time,
+                warmup=args.warmup,
+                latency_factor=args.latency_factor,
+                lag_budget_ms=args.lag_budget_ms,
+            )
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    growth = report.get("rss_mb_per_hour")
+    if growth is not None and growth > args.max_rss_growth:
+        print(f"LEAK? RSS grew {growth:.1f} MB/hour", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
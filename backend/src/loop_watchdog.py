@@ -0,0 +1,224 @@
+"""Event-loop lag monitor with a watchdog that samples the code stalling the loop.
+
+Audio frames, STT/TTS streams and every session event handler share one
+event loop per job, so anything that holds it (a synchronous file write, a
+chatty log handler, a slow tool) makes TTS playback stutter. A heartbeat
+task measures how late the loop wakes it up; a watchdog thread samples the
+loop thread's stack while the heartbeat is overdue, so each stall can be
+attributed to the handler or tool that caused it.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Optional
+
+try:
+    from .worker_metrics import get_metrics
+except ImportError:
+    from worker_metrics import get_metrics
+
+logger = logging.getLogger("agent")
+
+LAG_BUDGET_ENV = "LOOP_LAG_BUDGET_MS"
+DEFAULT_LAG_BUDGET_MS = 20.0
+HEARTBEAT_INTERVAL = 0.01
+STACK_DEPTH = 8
+LOG_INTERVAL = 10.0
+
+SRC_DIR = str(Path(__file__).resolve().parent)
+# Wrappers and harnesses that sit between the loop and the code worth blaming
+_PASS_THROUGH = {"loop_watchdog", "tool_profiler", "benchmark", "load_test"}
+# Where the event loop calls into callbacks and tasks; frames beyond it are
+# the loop itself and whatever started it
+_LOOP_ENTRY = asyncio.events.Handle._run.__code__
+
+
+@dataclass
+class Stall:
+    """One period the loop was held longer than the budget."""
+
+    culprit: str
+    duration: float
+    samples: int = 0
+    stack: list[str] = field(default_factory=list)
+
+
+def _code_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).stem}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def attribute(frame: FrameType) -> Optional[str]:
+    """Name the handler or tool responsible for a stack.
+
+    That's the outermost frame from this package (e.g. a session event
+    handler or a function tool), since it's what the loop was running;
+    library frames below it are how it got slow, not who to blame. Stacks
+    that never enter our code are named after their innermost frame.
+    Returns None if the loop isn't running a callback (e.g. it's waiting
+    in ``select``, so a late heartbeat wasn't caused by Python code).
+    """
+    culprit = None
+    current: Optional[FrameType] = frame
+    while current is not None:
+        if current.f_code is _LOOP_ENTRY:
+            return _code_name(culprit or frame)
+        filename = current.f_code.co_filename
+        if filename.startswith(SRC_DIR) and Path(filename).stem not in _PASS_THROUGH:
+            culprit = current
+        current = current.f_back
+    return None
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and reports the code behind stalls."""
+
+    def __init__(
+        self,
+        agent: str,
+        budget_ms: Optional[float] = None,
+        interval: float = HEARTBEAT_INTERVAL,
+    ):
+        """Initialize the watchdog.
+
+        Args:
+            agent: Agent name for logs and the ``agent`` metric label
+            budget_ms: Lag that counts as a stall (default: LOOP_LAG_BUDGET_MS,
+                else 20 ms)
+            interval: Seconds between heartbeats
+        """
+        if budget_ms is None:
+            budget_ms = float(os.getenv(LAG_BUDGET_ENV, DEFAULT_LAG_BUDGET_MS))
+        self.agent = agent
+        self.budget = budget_ms / 1000
+        self.interval = interval
+        self.stalls: Counter = Counter()
+        self._listeners: list[Callable[[Stall], None]] = []
+        self._last_beat = time.perf_counter()
+        self._samples: Counter = Counter()
+        self._stacks: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_logged: dict[str, float] = {}
+
+    def add_listener(self, callback: Callable[[Stall], None]) -> None:
+        """Call ``callback`` with every stall, on the event loop."""
+        self._listeners.append(callback)
+
+    def start(self) -> None:
+        """Start watching the running event loop."""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def aclose(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+
+    async def _heartbeat(self) -> None:
+        metrics = get_metrics()
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            lag = max(0.0, now - start - self.interval)
+            metrics.loop_lag.labels(self.agent).observe(lag)
+            if lag >= self.budget:
+                self._report(lag)
+            elif self._samples:
+                # Sampled as the stall ended, but it stayed under budget
+                with self._lock:
+                    self._samples.clear()
+                    self._stacks.clear()
+
+    def _watch(self) -> None:
+        # Sample a few times per budget so even a stall just over it is caught
+        period = self.budget / 4
+        while not self._stop.wait(period):
+            overdue = time.perf_counter() - self._last_beat - self.interval
+            if overdue < self.budget:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            culprit = attribute(frame)
+            if culprit is None:
+                continue
+            with self._lock:
+                self._samples[culprit] += 1
+                if culprit not in self._stacks:
+                    self._stacks[culprit] = traceback.format_stack(frame, limit=STACK_DEPTH)
+            del frame
+
+    def _report(self, lag: float) -> None:
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+            stacks, self._stacks = self._stacks, {}
+        if samples:
+            culprit, count = samples.most_common(1)[0]
+        else:
+            # Over before the watchdog looked, or not caused by a callback
+            # (GC, another thread holding the GIL)
+            culprit, count = "unknown", 0
+        stall = Stall(culprit=culprit, duration=lag, samples=count, stack=stacks.get(culprit, []))
+        self.stalls[culprit] += 1
+
+        metrics = get_metrics()
+        metrics.loop_stalls.labels(self.agent, culprit).inc()
+        metrics.loop_stall_duration.labels(self.agent, culprit).observe(lag)
+        for callback in self._listeners:
+            callback(stall)
+
+        # Throttled per culprit: logging is itself synchronous work on the loop
+        now = time.monotonic()
+        if now - self._last_logged.get(culprit, 0.0) < LOG_INTERVAL:
+            return
+        self._last_logged[culprit] = now
+        logger.warning(
+            f"⚠️ Event loop stalled {lag * 1000:.0f} ms in {culprit} "
+            f"(budget {self.budget * 1000:.0f} ms, {self.stalls[culprit]} stalls so far)"
+            + ("\n" + "".join(stall.stack).rstrip() if stall.stack else "")
+        )
+
+
+def watch_loop(ctx: Any, agent: str) -> Optional[LoopWatchdog]:
+    """Watch the job's event loop until the job ends; LOOP_LAG_BUDGET_MS=0 disables it.
+
+    Args:
+        ctx: Job context (used to register the shutdown callback)
+        agent: Agent name for logs and metrics
+    """
+    budget_ms = float(os.getenv(LAG_BUDGET_ENV, DEFAULT_LAG_BUDGET_MS))
+    if budget_ms <= 0:
+        return None
+    watchdog = LoopWatchdog(agent, budget_ms=budget_ms)
+    watchdog.start()
+
+    async def report_stalls():
+        await watchdog.aclose()
+        if watchdog.stalls:
+            logger.info(f"Event loop stalls ({agent}): {dict(watchdog.stalls.most_common())}")
+
+    ctx.add_shutdown_callback(report_stalls)
+    return watchdog
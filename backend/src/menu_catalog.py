@@ -0,0 +1,180 @@
+"""Day 2 menu: drinks, sizes, milks and extras with aliases and prices.
+
+The menu lives in ``shared-data/day2_menu.json``. It is loaded once per
+worker process at prewarm and indexed two ways:
+
+- a hash index per category, mapping every name and alias to its item, so
+  the order tools validate a value in O(1) (with a fuzzy fallback for
+  transcription slips such as "oaty")
+- a word trie over all categories, so the slot extractor finds the longest
+  menu phrase at each position of a transcript ("hot chocolate" over
+  "chocolate")
+
+Generic words such as "whole", "big" or "black" are listed as
+``lookup_aliases``: the tools accept them as values, but the trie doesn't
+contain them, so "the whole thing" or "a big thank you" in a transcript
+fills nothing. The trie has phrases with the noun instead ("big cup").
+"""
+
+import difflib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .order_state import CoffeeOrder
+except ImportError:
+    from order_state import CoffeeOrder
+
+CATEGORIES = ("drinks", "sizes", "milks", "extras")
+# Similarity an unknown spelling needs to be matched to an alias
+FUZZY_CUTOFF = 0.8
+
+
+def normalize(text: str) -> str:
+    """Lowercase and reduce to words, as names and aliases are indexed."""
+    return " ".join(re.findall(r"[a-z']+", text.lower()))
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    """One entry of the menu; a size or milk's price is its surcharge."""
+
+    category: str
+    name: str
+    price: int
+    aliases: tuple[str, ...] = ()
+    # Accepted by lookup() only, not matched in transcripts
+    lookup_aliases: tuple[str, ...] = ()
+
+
+@dataclass
+class _TrieNode:
+    children: dict[str, "_TrieNode"] = field(default_factory=dict)
+    item: Optional[MenuItem] = None
+
+
+class MenuCatalog:
+    """Indexed menu shared by every barista session in the process."""
+
+    def __init__(self, items: list[MenuItem], currency: str = "rupees"):
+        """Index the menu.
+
+        Args:
+            items: Every drink, size, milk and extra
+            currency: Currency name used when prices are spoken
+
+        Raises:
+            ValueError: If a spoken form belongs to two items
+        """
+        self.currency = currency
+        self.items: dict[str, list[MenuItem]] = {category: [] for category in CATEGORIES}
+        self._index: dict[str, dict[str, MenuItem]] = {category: {} for category in CATEGORIES}
+        self._trie = _TrieNode()
+        for item in items:
+            self.items[item.category].append(item)
+            for spoken in {normalize(item.name), *(normalize(a) for a in item.aliases)}:
+                self._add(spoken, item)
+            for spoken in {normalize(a) for a in item.lookup_aliases}:
+                self._add_lookup(spoken, item)
+
+    def _add(self, spoken: str, item: MenuItem) -> None:
+        node = self._trie
+        for word in spoken.split():
+            node = node.children.setdefault(word, _TrieNode())
+        if node.item is not None and node.item != item:
+            raise ValueError(f"'{spoken}' is both {node.item.name} and {item.name}")
+        node.item = item
+        self._add_lookup(spoken, item)
+
+    def _add_lookup(self, spoken: str, item: MenuItem) -> None:
+        known = self._index[item.category].get(spoken)
+        if known is not None and known != item:
+            raise ValueError(f"'{spoken}' is both {known.name} and {item.name}")
+        self._index[item.category][spoken] = item
+
+    @classmethod
+    def from_path(cls, menu_path: Path) -> "MenuCatalog":
+        if not menu_path.exists():
+            raise FileNotFoundError(f"Menu file not found: {menu_path}")
+        with open(menu_path, encoding="utf-8") as f:
+            raw = json.load(f)
+        items = [
+            MenuItem(
+                category,
+                entry["name"],
+                entry["price"],
+                tuple(entry.get("aliases", ())),
+                tuple(entry.get("lookup_aliases", ())),
+            )
+            for category in CATEGORIES
+            for entry in raw[category]
+        ]
+        return cls(items, currency=raw.get("currency", "rupees"))
+
+    @classmethod
+    def from_env(cls) -> "MenuCatalog":
+        default_path = Path(__file__).resolve().parents[2] / "shared-data" / "day2_menu.json"
+        configured = os.getenv("DAY2_MENU_PATH")
+        path = Path(configured) if configured else default_path
+        return cls.from_path(path)
+
+    def lookup(self, category: str, text: str) -> Optional[MenuItem]:
+        """Find the item a customer means, by name, alias or a close spelling.
+
+        Args:
+            category: One of CATEGORIES
+            text: What the customer (or the LLM) called it
+        """
+        index = self._index[category]
+        spoken = normalize(text)
+        item = index.get(spoken)
+        if item is None and spoken:
+            close = difflib.get_close_matches(spoken, index, n=1, cutoff=FUZZY_CUTOFF)
+            item = index[close[0]] if close else None
+        return item
+
+    def match(self, words: list[str], start: int) -> tuple[int, Optional[MenuItem]]:
+        """Longest menu phrase starting at ``words[start]``.
+
+        Returns:
+            The number of words matched and the item (0 and None if no match)
+        """
+        node, found = self._trie, (0, None)
+        for length, word in enumerate(words[start:], 1):
+            node = node.children.get(word)
+            if node is None:
+                break
+            if node.item is not None:
+                found = (length, node.item)
+        return found
+
+    def names(self, category: str) -> list[str]:
+        return [item.name for item in self.items[category]]
+
+    def total(self, order: CoffeeOrder) -> int:
+        """Price of an order: drink, size and milk surcharges, and extras."""
+        total = 0
+        for category, value in (("drinks", order.drinkType), ("sizes", order.size), ("milks", order.milk)):
+            item = self.lookup(category, value) if value else None
+            total += item.price if item else 0
+        for extra in order.extras:
+            item = self.lookup("extras", extra)
+            total += item.price if item else 0
+        return total
+
+    def price_text(self, amount: int) -> str:
+        return f"{amount} {self.currency}"
+
+    def menu_text(self) -> str:
+        """Compact menu for the instructions, one line per category."""
+        lines = [
+            "Drinks: " + ", ".join(f"{i.name} {i.price}" for i in self.items["drinks"]),
+            "Sizes: " + ", ".join(f"{i.name} +{i.price}" for i in self.items["sizes"]),
+            "Milks: " + ", ".join(f"{i.name} +{i.price}" for i in self.items["milks"]),
+            "Extras: " + ", ".join(f"{i.name} +{i.price}" for i in self.items["extras"]),
+        ]
+        return f"Prices in {self.currency}.\n" + "\n".join(lines)
@@ -0,0 +1,164 @@
+"""Append-only ledger of completed coffee orders."""
+
+import logging
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .append_log import AppendOnlyLog
+except ImportError:
+    from append_log import AppendOnlyLog
+
+logger = logging.getLogger("agent")
+
+SEGMENT_PREFIX = "ledger-"
+
+
+class OrderLedger:
+    """Completed orders stored in daily JSON-lines segments.
+
+    Every order is one appended line in ``ledger-YYYYMMDD.jsonl`` rather than
+    its own file, so a rush of orders doesn't churn inodes and reporting reads
+    a handful of segments instead of scanning a directory of tiny files.
+    Fsyncs are group-committed: the segment is synced once per
+    ``fsync_every`` orders (or per second), and on ``flush()``/``close()``.
+    Time-range queries only open the segments for the days in range.
+    """
+
+    def __init__(self, ledger_dir: str = "orders", fsync_every: int = 16):
+        """Initialize the ledger.
+
+        Args:
+            ledger_dir: Directory for ledger segments (relative to backend directory)
+            fsync_every: Number of orders per group commit
+        """
+        # Store ledger relative to backend directory, not the process CWD
+        backend_dir = Path(__file__).parent.parent
+        self.ledger_dir = backend_dir / ledger_dir
+        self.fsync_every = fsync_every
+        self._segment_day: Optional[date] = None
+        self._segment: Optional[AppendOnlyLog] = None
+        self._lock = threading.Lock()
+
+    def new_record(self, order: dict, placed_at: Optional[datetime] = None) -> dict:
+        """Build a ledger record with a unique, time-ordered order ID.
+
+        This is cheap and doesn't touch disk, so the ID can be handed back to
+        the customer before the record is written.
+
+        Args:
+            order: Order dictionary (e.g. ``CoffeeOrder.to_dict()``)
+            placed_at: When the order was placed (defaults to now)
+
+        Returns:
+            Ledger record ready to pass to ``append``
+        """
+        placed_at = placed_at or datetime.now()
+        return {
+            "order_id": f"{placed_at:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}",
+            "placed_at": placed_at.isoformat(),
+            "ts": placed_at.timestamp(),
+            **order,
+        }
+
+    def append(self, record: dict) -> None:
+        """Append a record to the segment for the day it was placed.
+
+        Args:
+            record: Record created by ``new_record``
+        """
+        day = datetime.fromtimestamp(record["ts"]).date()
+        with self._lock:
+            if day != self._segment_day:
+                if self._segment is not None:
+                    self._segment.close()
+                self._segment = AppendOnlyLog(
+                    self.segment_path(day), fsync_every=self.fsync_every
+                )
+                self._segment_day = day
+            self._segment.append(record)
+
+    def segment_path(self, day: date) -> Path:
+        """Path of the segment holding one day's orders."""
+        return self.ledger_dir / f"{SEGMENT_PREFIX}{day:%Y%m%d}.jsonl"
+
+    def query(
+        self,
+        customer: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        drink_type: Optional[str] = None,
+    ) -> list[dict]:
+        """Find orders matching every given filter.
+
+        Args:
+            customer: Customer name (case-insensitive exact match)
+            since: Only orders placed at or after this time
+            until: Only orders placed before this time
+            drink_type: Drink type (case-insensitive exact match)
+
+        Returns:
+            Matching records, oldest first
+        """
+        customer = customer.lower() if customer else None
+        drink_type = drink_type.lower() if drink_type else None
+        start_ts = since.timestamp() if since else float("-inf")
+        end_ts = until.timestamp() if until else float("inf")
+
+        matches = []
+        for path in self._segments_between(since, until):
+            for record in AppendOnlyLog(path).read_all():
+                if not start_ts <= record.get("ts", 0) < end_ts:
+                    continue
+                if customer and (record.get("name") or "").lower() != customer:
+                    continue
+                if drink_type and (record.get("drinkType") or "").lower() != drink_type:
+                    continue
+                matches.append(record)
+        matches.sort(key=lambda r: r["ts"])
+        return matches
+
+    def get(self, order_id: str) -> Optional[dict]:
+        """Look up one order by ID (the ID prefix names its segment)."""
+        try:
+            day = datetime.strptime(order_id[:8], "%Y%m%d").date()
+        except ValueError:
+            return None
+        path = self.segment_path(day)
+        if not path.exists():
+            return None
+        for record in AppendOnlyLog(path).read_all():
+            if record.get("order_id") == order_id:
+                return record
+        return None
+
+    def flush(self) -> None:
+        """Group-commit any orders not yet synced to disk."""
+        with self._lock:
+            if self._segment is not None:
+                self._segment.flush()
+
+    def close(self) -> None:
+        """Flush and close the open segment."""
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+                self._segment_day = None
+
+    def _segments_between(
+        self, since: Optional[datetime], until: Optional[datetime]
+    ) -> list[Path]:
+        if not self.ledger_dir.exists():
+            return []
+        paths = sorted(self.ledger_dir.glob(f"{SEGMENT_PREFIX}*.jsonl"))
+        first = f"{SEGMENT_PREFIX}{since:%Y%m%d}.jsonl" if since else None
+        last = f"{SEGMENT_PREFIX}{until:%Y%m%d}.jsonl" if until else None
+        return [
+            p
+            for p in paths
+            if (first is None or p.name >= first) and (last is None or p.name <= last)
+        ]
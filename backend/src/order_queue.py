@@ -0,0 +1,306 @@
+"""In-process order queue that fans completed orders out to async consumers."""
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict, deque
+from typing import Optional
+
+logger = logging.getLogger("agent")
+
+# Simulated bar time per drink size, relative to a small (menu sizes only;
+# the order tools normalize aliases such as "tall")
+SIZE_SECONDS = {"small": 1.0, "medium": 1.5, "large": 2.0}
+
+
+class OrderConsumer:
+    """Base class for anything that reacts to completed orders.
+
+    ``handle`` may be called more than once for the same order (delivery is
+    at-least-once), so implementations should be idempotent on ``order_id``.
+    """
+
+    name = "consumer"
+
+    async def handle(self, record: dict) -> None:
+        """Process one order ledger record."""
+        raise NotImplementedError
+
+
+class _RecentIds:
+    """Bounded set of recently seen order IDs, used to skip redeliveries."""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._ids
+
+    def add(self, order_id: str) -> None:
+        self._ids[order_id] = None
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+
+class _Subscription:
+    def __init__(self, consumer: OrderConsumer, maxsize: int, concurrency: int):
+        self.consumer = consumer
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: list[asyncio.Task] = []
+        self.delivered = 0
+        self.retries = 0
+        self.dead_letters: deque = deque(maxlen=1000)
+
+
+class OrderQueue:
+    """Publish/subscribe queue for completed orders.
+
+    ``publish`` drops the order on a bounded intake queue and returns, so the
+    voice session never waits on consumers. A dispatcher copies each order
+    into every subscriber's own bounded queue; a slow subscriber fills its
+    queue and holds back the dispatcher (backpressure) rather than growing
+    memory. Each subscriber retries a failing order up to ``max_attempts``
+    times before parking it in its dead-letter list. The order ledger remains
+    the durable record of every order.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        """Initialize the queue.
+
+        Args:
+            maxsize: Capacity of the intake queue
+            max_attempts: Delivery attempts per order per subscriber
+            retry_delay: Seconds to wait between attempts (doubled each retry)
+        """
+        self.maxsize = maxsize
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.published = 0
+        self._subscriptions: list[_Subscription] = []
+        self._intake: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(
+        self, consumer: OrderConsumer, maxsize: int = 100, concurrency: int = 1
+    ) -> None:
+        """Register a consumer before orders start flowing.
+
+        Args:
+            consumer: Consumer to deliver every order to
+            maxsize: Capacity of this consumer's queue
+            concurrency: Number of orders this consumer handles in parallel
+        """
+        self._subscriptions.append(_Subscription(consumer, maxsize, concurrency))
+
+    async def publish(self, record: dict) -> None:
+        """Queue an order for every subscriber.
+
+        Returns immediately unless the intake queue is full.
+
+        Args:
+            record: Order ledger record (see ``OrderLedger.new_record``)
+        """
+        self._ensure_started()
+        self.published += 1
+        try:
+            self._intake.put_nowait(record)
+        except asyncio.QueueFull:
+            logger.warning("Order queue intake full, waiting for consumers to catch up")
+            await self._intake.put(record)
+
+    async def join(self) -> None:
+        """Wait until every published order has been handled by every subscriber."""
+        if self._intake is None:
+            return
+        await self._intake.join()
+        for sub in self._subscriptions:
+            await sub.queue.join()
+
+    async def aclose(self) -> None:
+        """Deliver everything already published, then stop all tasks."""
+        await self.join()
+        tasks = self._stop_tasks()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._intake = None
+        self._dispatcher = None
+        self._loop = None
+
+    def _stop_tasks(self) -> list[asyncio.Task]:
+        tasks = [self._dispatcher] if self._dispatcher else []
+        for sub in self._subscriptions:
+            tasks.extend(sub.workers)
+            sub.workers = []
+        for task in tasks:
+            task.cancel()
+        return tasks
+
+    def stats(self) -> dict:
+        """Delivery counters per subscriber."""
+        return {
+            "published": self.published,
+            "pending": self._intake.qsize() if self._intake else 0,
+            "consumers": {
+                sub.consumer.name: {
+                    "delivered": sub.delivered,
+                    "retries": sub.retries,
+                    "dead_letters": len(sub.dead_letters),
+                    "backlog": sub.queue.qsize() if sub.queue else 0,
+                }
+                for sub in self._subscriptions
+            },
+        }
+
+    def _ensure_started(self) -> None:
+        # Queues and tasks are bound to the running loop, so they're created
+        # lazily on first publish rather than in prewarm
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            # Started on a loop that is gone without aclose(): its orders
+            # can't be delivered from this one
+            pending = (self._intake.qsize() if self._intake else 0) + sum(
+                sub.queue.qsize() for sub in self._subscriptions if sub.queue
+            )
+            if pending:
+                logger.warning(f"Dropping {pending} undelivered orders from a previous event loop")
+            if not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._stop_tasks)
+            else:
+                self._dispatcher = None
+                for sub in self._subscriptions:
+                    sub.workers = []
+        self._loop = loop
+        self._intake = asyncio.Queue(maxsize=self.maxsize)
+        for sub in self._subscriptions:
+            sub.queue = asyncio.Queue(maxsize=sub.maxsize)
+            sub.workers = [
+                asyncio.create_task(
+                    self._consume(sub), name=f"order-consumer-{sub.consumer.name}"
+                )
+                for _ in range(sub.concurrency)
+            ]
+        self._dispatcher = asyncio.create_task(self._dispatch(), name="order-dispatcher")
+
+    async def _dispatch(self) -> None:
+        while True:
+            record = await self._intake.get()
+            try:
+                for sub in self._subscriptions:
+                    await sub.queue.put(record)
+            finally:
+                self._intake.task_done()
+
+    async def _consume(self, sub: _Subscription) -> None:
+        while True:
+            record = await sub.queue.get()
+            try:
+                await self._deliver(sub, record)
+            finally:
+                sub.queue.task_done()
+
+    async def _deliver(self, sub: _Subscription, record: dict) -> None:
+        delay = self.retry_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await sub.consumer.handle(record)
+                sub.delivered += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(
+                        f"{sub.consumer.name} failed order {record.get('order_id')} "
+                        f"after {attempt} attempts: {e}"
+                    )
+                    sub.dead_letters.append(record)
+                    return
+                sub.retries += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+
+
+class BaristaStation(OrderConsumer):
+    """Simulated bar that "makes" each drink, taking longer for bigger sizes."""
+
+    name = "barista_station"
+
+    def __init__(self, base_seconds: float = 1.0):
+        self.base_seconds = base_seconds
+        self.completed = _RecentIds()
+
+    async def handle(self, record: dict) -> None:
+        if record["order_id"] in self.completed:
+            return
+        size = (record.get("size") or "").lower()
+        await asyncio.sleep(self.base_seconds * SIZE_SECONDS.get(size, SIZE_SECONDS["large"]))
+        self.completed.add(record["order_id"])
+        logger.info(f"☕ Order {record['order_id']} ready for {record.get('name')}")
+
+
+class TicketPrinter(OrderConsumer):
+    """Formats a kitchen ticket for each order and writes it to the log."""
+
+    name = "ticket_printer"
+
+    async def handle(self, record: dict) -> None:
+        logger.info(self.format_ticket(record))
+
+    @staticmethod
+    def format_ticket(record: dict) -> str:
+        extras = ", ".join(record.get("extras") or []) or "none"
+        ticket = (
+            f"🧾 #{record['order_id']} | {record.get('name')} | "
+            f"{record.get('size')} {record.get('drinkType')} with {record.get('milk')} | "
+            f"extras: {extras}"
+        )
+        if record.get("total") is not None:
+            ticket += f" | total: {record['total']}"
+        return ticket
+
+
+class OrderAnalytics(OrderConsumer):
+    """Running counts of what customers order."""
+
+    name = "analytics"
+
+    def __init__(self):
+        self.orders = 0
+        self.drinks: Counter = Counter()
+        self.sizes: Counter = Counter()
+        self.milks: Counter = Counter()
+        self.extras: Counter = Counter()
+        self._seen = _RecentIds()
+
+    async def handle(self, record: dict) -> None:
+        if record["order_id"] in self._seen:
+            return
+        self._seen.add(record["order_id"])
+        self.orders += 1
+        self.drinks[record.get("drinkType")] += 1
+        self.sizes[record.get("size")] += 1
+        self.milks[record.get("milk")] += 1
+        self.extras.update(e.lower() for e in record.get("extras") or [])
+
+    def summary(self) -> dict:
+        return {
+            "orders": self.orders,
+            "top_drinks": self.drinks.most_common(3),
+            "top_extras": self.extras.most_common(3),
+        }
+
+
+def build_default_order_queue() -> OrderQueue:
+    """Order queue wired to the simulated barista station, ticket printer and analytics."""
+    queue = OrderQueue()
+    queue.subscribe(BaristaStation(), maxsize=200, concurrency=4)
+    queue.subscribe(TicketPrinter())
+    queue.subscribe(OrderAnalytics(), maxsize=500)
+    return queue
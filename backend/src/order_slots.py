@@ -0,0 +1,169 @@
+"""Rule-based slot filling for barista orders, ahead of the LLM.
+
+Filling an order one field at a time through the LLM costs two round trips
+per field: one to call a tool such as ``update_size``, one to speak after
+it. Most order utterances ("a large oat latte for Sam") name their fields
+plainly, so ``extract_slots`` matches the final transcript against the
+names and aliases in the menu catalog and fills those fields directly.
+Anything it isn't sure about (questions, "small or medium", words off the
+menu) is left to the LLM.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+try:
+    from .menu_catalog import MenuCatalog
+    from .order_state import CoffeeOrder
+except ImportError:
+    from menu_catalog import MenuCatalog
+    from order_state import CoffeeOrder
+
+# Menu category -> CoffeeOrder field
+FIELDS = {"drinks": "drinkType", "sizes": "size", "milks": "milk", "extras": "extras"}
+
+NEGATIONS = {
+    "no", "not", "without", "dont", "don't", "didn't", "doesn't", "won't", "never",
+    "skip", "hold", "minus", "nope",
+}
+# Words before a menu item that a negation can reach across ("don't want the whip")
+NEGATION_WINDOW = 3
+QUESTION_WORDS = {
+    "what", "whats", "what's", "which", "do", "does", "is", "are", "how", "would",
+    "could", "can", "should", "will", "any", "anything",
+}
+# Openings that are requests even though they start like a question
+REQUESTS = (
+    "can i", "could i", "can we", "could we", "may i", "can you make", "could you make",
+    "would you make", "can you get", "could you get",
+)
+# "for here", "it's for two" and the like are not names
+NOT_NAMES = {
+    "here", "me", "now", "today", "tonight", "tomorrow", "takeaway", "takeout", "to", "my",
+    "the", "a", "an", "you", "us", "him", "her", "them", "later", "go", "sure", "please",
+    "yes", "no", "breakfast", "lunch", "dinner", "dessert", "work", "everyone", "both",
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+}
+# Names are taken from explicit phrases, or from a trailing "for Sam" when the
+# transcript capitalizes it ("a latte for two" has no name)
+NAME_PATTERN = re.compile(
+    r"\b(?:my name is|my name's|name is|name's|it's for|it is for)\s+([A-Za-z][A-Za-z'-]*)",
+    re.IGNORECASE,
+)
+TRAILING_NAME_PATTERN = re.compile(r"\b[Ff]or\s+([A-Z][A-Za-z'-]*)\s*[.!?]?\s*$")
+
+
+@dataclass
+class OrderSlots:
+    """Order fields stated in one utterance."""
+
+    drinkType: Optional[str] = None  # noqa: N815 - mirrors CoffeeOrder.drinkType
+    size: Optional[str] = None
+    milk: Optional[str] = None
+    extras: list[str] = field(default_factory=list)
+    name: Optional[str] = None
+    # Fields mentioned with more than one value ("small or medium")
+    ambiguous: list[str] = field(default_factory=list)
+
+    def filled(self) -> dict:
+        """The fields that were recognized, by CoffeeOrder field name."""
+        values = {
+            "drinkType": self.drinkType,
+            "size": self.size,
+            "milk": self.milk,
+            "extras": self.extras,
+            "name": self.name,
+        }
+        return {key: value for key, value in values.items() if value}
+
+    def apply(self, order: CoffeeOrder) -> dict:
+        """Write the recognized fields into an order and return them.
+
+        A stated field replaces the order's value ("actually, make it small");
+        extras are added to the ones already there.
+        """
+        filled = self.filled()
+        for key, value in filled.items():
+            if key == "extras":
+                known = {e.lower() for e in order.extras}
+                order.extras.extend(e for e in value if e.lower() not in known)
+            else:
+                setattr(order, key, value)
+        return filled
+
+    def note(self, order: CoffeeOrder) -> str:
+        """Tell the LLM which fields were recorded this turn and what's still missing."""
+        recorded = ", ".join(
+            f"{key}={', '.join(value) if isinstance(value, list) else value}"
+            for key, value in self.filled().items()
+        )
+        note = (
+            f"Recorded automatically from the customer's last message: {recorded}. "
+            "No tool call is needed to record these again, but if one isn't what the "
+            "customer meant, correct it with its tool. "
+            f"Still needed: {', '.join(order.get_missing_fields()) or 'nothing'}."
+        )
+        if self.ambiguous:
+            note += f" The customer gave more than one {' and '.join(self.ambiguous)}; ask which one."
+        return note
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[a-z']+", text.lower())
+
+
+def extract_slots(text: str, menu: MenuCatalog) -> OrderSlots:
+    """Recognize order fields in a final transcript.
+
+    Questions ("do you have oat milk?", "would a chai be nice?") fill
+    nothing, nor do negated items ("no whipped cream", "skip the whip",
+    "I don't want whipped cream"). A field mentioned with two different
+    values is left empty and listed in ``ambiguous``.
+
+    Args:
+        text: The user's utterance
+        menu: Catalog whose names and aliases are recognized
+    """
+    slots = OrderSlots()
+    words = _words(text)
+    joined = " ".join(words)
+    if (
+        not words
+        or (words[0] in QUESTION_WORDS and not joined.startswith(REQUESTS))
+        or "do you have" in joined
+    ):
+        return slots
+
+    found: dict[str, list[str]] = {key: [] for key in FIELDS.values()}
+    # A negation doesn't reach back past the previous menu item
+    # ("no whip, large latte")
+    scope = 0
+    i = 0
+    while i < len(words):
+        length, item = menu.match(words, i)
+        if item is None:
+            i += 1
+            continue
+        key = FIELDS[item.category]
+        window = words[max(scope, i - NEGATION_WINDOW) : i]
+        negated = any(word in NEGATIONS for word in window)
+        if not negated and item.name not in found[key]:
+            found[key].append(item.name)
+        i += length
+        scope = i
+
+    slots.extras = found.pop("extras")
+    for key, values in found.items():
+        if len(values) == 1:
+            setattr(slots, key, values[0])
+        elif values:
+            slots.ambiguous.append(key)
+
+    match = NAME_PATTERN.search(text) or TRAILING_NAME_PATTERN.search(text)
+    if match:
+        name = match.group(1)
+        lowered = name.lower()
+        if lowered not in NOT_NAMES and menu.match([lowered], 0)[1] is None:
+            slots.name = name[0].upper() + name[1:]
+    return slots
@@ -0,0 +1,85 @@
+"""Non-blocking persistence for function tools."""
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("agent")
+
+
+class AsyncPersistence:
+    """Runs blocking persistence calls on a background writer task.
+
+    Function tools run on the same event loop that streams STT/TTS audio, so
+    they must never do file I/O inline. ``submit`` enqueues the write and
+    returns immediately; a single writer task executes jobs in submission
+    order on a worker thread. The queue is bounded: if the disk falls that
+    far behind, ``submit`` waits for space instead of growing memory without
+    limit. ``aclose`` drains everything still queued, so register it with
+    ``ctx.add_shutdown_callback`` to avoid losing data when the job ends.
+    """
+
+    def __init__(self, maxsize: int = 256, name: str = "persistence"):
+        """Initialize the writer.
+
+        Args:
+            maxsize: Maximum number of queued writes before submit applies backpressure
+            name: Name used for the writer task and in log messages
+        """
+        self.name = name
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Number of writes queued but not yet finished."""
+        return self._queue.qsize()
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queue a blocking call to run off the event loop.
+
+        Args:
+            fn: Blocking function to call (e.g. a method that writes a file)
+            *args: Positional arguments for ``fn``
+            **kwargs: Keyword arguments for ``fn``
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} writer is closed")
+        self._ensure_started()
+        job = (fn, args, kwargs)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(f"{self.name} queue full, waiting for the writer to catch up")
+            await self._queue.put(job)
+
+    async def flush(self) -> None:
+        """Wait until every write submitted so far has finished."""
+        if self._task is not None:
+            await self._queue.join()
+
+    async def aclose(self) -> None:
+        """Drain queued writes and stop the writer task."""
+        self._closed = True
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-writer")
+
+    async def _run(self) -> None:
+        while True:
+            fn, args, kwargs = await self._queue.get()
+            try:
+                await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception:
+                logger.exception(f"{self.name} write failed: {getattr(fn, '__name__', fn)}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,264 @@
+"""Per-process factory for the STT/LLM/TTS voice pipeline shared by the day agents,
+and the per-job instrumentation every day agent attaches to its session."""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from livekit.agents import Agent, AgentSession, JobContext, JobProcess, tokenize, utils
+
+try:
+    from .loop_watchdog import watch_loop
+    from .tool_profiler import profile_tools
+    from .turn_tracer import trace_turns
+    from .worker_metrics import observe_session
+except ImportError:
+    from loop_watchdog import watch_loop
+    from tool_profiler import profile_tools
+    from turn_tracer import trace_turns
+    from worker_metrics import observe_session
+
+logger = logging.getLogger("agent")
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Provider settings for one voice pipeline."""
+
+    stt_model: str = "nova-3"
+    llm_model: str = "gemini-2.5-flash"
+    summary_model: str = "gemini-2.5-flash-lite"
+    tts_voice: str = "en-US-matthew"
+    tts_style: str = "Conversation"
+    tts_text_pacing: bool = False
+
+
+@dataclass
+class Pipeline:
+    """Ready-to-use components for an AgentSession."""
+
+    stt: Any
+    llm: Any
+    tts: Any
+    turn_detection: Any
+    vad: Any
+    # Separate client for background work (chat summaries), so its metrics
+    # aren't reported as the user's turns
+    summary_llm: Any = None
+
+
+def _job_http_session() -> Any:
+    # The job's shared aiohttp session, which the Deepgram and Murf clients bind
+    # to on first use; None outside a job (prewarm, tests)
+    try:
+        return utils.http_context.http_session()
+    except RuntimeError:
+        return None
+
+
+def _tts_key(config: PipelineConfig) -> tuple:
+    return (config.tts_voice, config.tts_style, config.tts_text_pacing)
+
+
+class PipelineFactory:
+    """Builds STT/LLM/TTS provider clients once per process.
+
+    Clients are constructed at prewarm time, so a job only looks them up
+    before ``session.start`` instead of building three clients (and their
+    tokenizers) on the connect path. The turn detector is the exception: it
+    binds to the running job's inference executor, so each job gets its own
+    lightweight handle onto the model the worker already loaded. Clients are
+    cached per config, and their connection pools are reused for as long as
+    the client lives. The HTTP-based clients bind to the aiohttp session of
+    the job that first uses them, which is closed when that job ends, so they
+    are rebuilt once a later job finds it closed. A job that mutates its TTS
+    (e.g. switching voices) asks for an ``exclusive_tts``, which hands over the
+    prebuilt instance and builds the next job's in a background thread.
+    """
+
+    def __init__(self, vad: Any):
+        """Initialize the factory.
+
+        Args:
+            vad: Prewarmed VAD shared by every pipeline
+        """
+        self.vad = vad
+        self._stt: dict[str, Any] = {}
+        self._llm: dict[str, Any] = {}
+        self._summary_llm: dict[str, Any] = {}
+        self._tts: dict[tuple, Any] = {}
+        # aiohttp session the cached STT/TTS clients are bound to
+        self._http_session: Any = None
+        self._lock = threading.Lock()
+
+    def prewarm(self, config: PipelineConfig) -> None:
+        """Build the provider clients for a config ahead of the first job."""
+        with self._lock:
+            self._clients(config)
+        logger.info(f"Prewarmed voice pipeline: {config}")
+
+    def get(self, config: PipelineConfig, exclusive_tts: bool = False) -> Pipeline:
+        """Return the components for a pipeline, building only what's missing.
+
+        Args:
+            config: Provider settings
+            exclusive_tts: Give the caller its own TTS instance that no other
+                job will receive
+        """
+        http_session = _job_http_session()
+        with self._lock:
+            self._bind(http_session)
+            stt, llm, tts, summary_llm = self._clients(config)
+            if exclusive_tts:
+                del self._tts[_tts_key(config)]
+        if exclusive_tts:
+            # Off the connect path: the next job finds its instance ready
+            threading.Thread(
+                target=self._refill_tts, args=(config,), name="pipeline-tts-refill", daemon=True
+            ).start()
+        return Pipeline(
+            stt=stt,
+            llm=llm,
+            tts=tts,
+            turn_detection=self._build_turn_detection(),
+            vad=self.vad,
+            summary_llm=summary_llm,
+        )
+
+    def tts(self, config: PipelineConfig) -> Any:
+        """Return the shared TTS client for a config, e.g. an agent's second voice."""
+        http_session = _job_http_session()
+        with self._lock:
+            self._bind(http_session)
+            return self._cached(self._tts, _tts_key(config), lambda: self._build_tts(config))
+
+    def _bind(self, http_session: Any) -> None:
+        if http_session is None:
+            return
+        if self._http_session is not None:
+            if not self._http_session.closed:
+                return
+            # The job these clients were bound to has ended
+            self._stt.clear()
+            self._tts.clear()
+        self._http_session = http_session
+
+    def _refill_tts(self, config: PipelineConfig) -> None:
+        tts = self._build_tts(config)
+        with self._lock:
+            self._tts.setdefault(_tts_key(config), tts)
+
+    def _clients(self, config: PipelineConfig) -> tuple[Any, Any, Any, Any]:
+        return (
+            self._cached(self._stt, config.stt_model, lambda: self._build_stt(config)),
+            self._cached(self._llm, config.llm_model, lambda: self._build_llm(config.llm_model)),
+            self._cached(self._tts, _tts_key(config), lambda: self._build_tts(config)),
+            self._cached(
+                self._summary_llm,
+                config.summary_model,
+                lambda: self._build_llm(config.summary_model),
+            ),
+        )
+
+    @staticmethod
+    def _cached(cache: dict, key: Any, build) -> Any:
+        client = cache.get(key)
+        if client is None:
+            client = cache[key] = build()
+        return client
+
+    @staticmethod
+    def _build_turn_detection() -> Any:
+        # Needs the job context, so it can't be built in prewarm
+        from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+        return MultilingualModel()
+
+    @staticmethod
+    def _build_stt(config: PipelineConfig) -> Any:
+        from livekit.plugins import deepgram
+
+        return deepgram.STT(model=config.stt_model)
+
+    @staticmethod
+    def _build_llm(model: str) -> Any:
+        from livekit.plugins import google
+
+        return google.LLM(model=model)
+
+    @staticmethod
+    def _build_tts(config: PipelineConfig) -> Any:
+        from livekit.plugins import murf
+
+        return murf.TTS(
+            voice=config.tts_voice,
+            style=config.tts_style,
+            tokenizer=tokenize.basic.WordTokenizer(),
+            text_pacing=config.tts_text_pacing,
+        )
+
+
+def load_vad(proc: JobProcess, silero_module: Any) -> None:
+    """Load the Silero VAD once per process.
+
+    The VAD is shared when one worker hosts several day agents, and the
+    pipeline factory hands it to every session.
+
+    Args:
+        proc: Job process being prewarmed
+        silero_module: Silero plugin, imported on the main thread by agent.py
+    """
+    if "vad" not in proc.userdata:
+        proc.userdata["vad"] = silero_module.VAD.load()
+
+
+def prewarm_pipeline(proc: JobProcess, config: PipelineConfig) -> PipelineFactory:
+    """Create the process's pipeline factory (once) and prebuild a config.
+
+    Call from a day agent's prewarm after the VAD has been loaded.
+    """
+    factory = _factory(proc)
+    factory.prewarm(config)
+    return factory
+
+
+def get_pipeline(
+    proc: JobProcess, config: PipelineConfig, exclusive_tts: bool = False
+) -> Pipeline:
+    """Fetch a pipeline for a job from the process's factory."""
+    return _factory(proc).get(config, exclusive_tts=exclusive_tts)
+
+
+def get_tts(proc: JobProcess, config: PipelineConfig) -> Any:
+    """Fetch the shared TTS client for a config from the process's factory."""
+    return _factory(proc).tts(config)
+
+
+def _factory(proc: JobProcess) -> PipelineFactory:
+    factory = proc.userdata.get("pipeline_factory")
+    if factory is None:
+        factory = proc.userdata["pipeline_factory"] = PipelineFactory(proc.userdata["vad"])
+    return factory
+
+
+async def instrument_session(
+    ctx: JobContext, session: AgentSession, agent: Agent, name: str
+) -> None:
+    """Attach the per-job instrumentation; call before ``session.start``.
+
+    - turn tracing: per-turn latency breakdown, summarized when the job ends
+    - worker metrics for the Prometheus endpoint
+    - the event loop watchdog
+    - function tool profiling, reported when the job ends
+
+    Args:
+        ctx: Job context (reports are logged from its shutdown callbacks)
+        session: The job's session
+        agent: The agent about to be started, whose tools are profiled
+        name: Agent name for logs and metric labels
+    """
+    tracer = trace_turns(ctx, session, name)
+    observe_session(ctx, session, name, tracer)
+    watch_loop(ctx, name)
+    await profile_tools(ctx, agent, name)
@@ -0,0 +1,443 @@
+"""Response cache in front of the LLM for turns that repeat across callers.
+
+Many turns are near-identical from one caller to the next: the barista
+asking for a size, the wellness greeting for a first-time user, the tutor
+introducing a concept. ``CachingLLM`` wraps the session's LLM and answers
+such turns from a cache keyed on the whole normalized chat context it is
+sent (instructions, summary and every verbatim turn), the agent's tools and
+its tool state (e.g. the order so far), so they skip the LLM round trip. A
+reply is therefore only replayed to a caller whose conversation so far is
+the same, which in practice means the first turns of a session.
+
+Job processes are single-use, so to help across callers the cache is loaded
+from a shared JSON-lines file at prewarm and new responses are appended to
+it in the background. Keys are hashed, but a reply can echo the caller
+("Thanks, Sam!") and tool calls carry what the caller said as arguments,
+so only replies that are safe to replay to anyone are written to the file:
+those to the first user turn, without tool calls, that don't repeat a
+capitalized word (a name) from the caller. Everything else is cached in
+memory for the job only.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm, utils
+from livekit.agents.llm import ChatChunk, ChoiceDelta, FunctionToolCall
+
+try:
+    from .append_log import AppendOnlyLog
+    from .worker_metrics import get_metrics
+except ImportError:
+    from append_log import AppendOnlyLog
+    from worker_metrics import get_metrics
+
+logger = logging.getLogger("agent")
+
+CACHE_FILE_ENV = "LLM_RESPONSE_CACHE_FILE"
+CACHE_DISABLED_ENV = "LLM_RESPONSE_CACHE_DISABLED"
+DEFAULT_CACHE_FILE = "cache/llm_responses.jsonl"
+
+_WORD = re.compile(r"[^\w\s']+")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Which of an agent's turns may be answered from the cache."""
+
+    enabled: bool = False
+    # Seconds a cached response stays valid
+    ttl: float = 24 * 3600.0
+    # Longer utterances are unlikely to repeat, so they aren't cached
+    max_user_chars: int = 200
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_WORD.sub(" ", text.lower()).split())
+
+
+def _capitalized(text: str) -> set[str]:
+    # Lowercased, for comparing with normalized text
+    return {word.lower() for word in re.findall(r"\b[A-Z][\w']*", text)}
+
+
+def _item_key(item: Any) -> Optional[list]:
+    if item.type == "message":
+        return [item.role, normalize(item.text_content or "")]
+    if item.type == "function_call":
+        return ["call", item.name, item.arguments]
+    if item.type == "function_call_output":
+        return ["output", item.name, item.output, item.is_error]
+    return None
+
+
+@dataclass
+class CachedResponse:
+    """A recorded LLM response: text and/or tool calls."""
+
+    text: str
+    tool_calls: list[tuple[str, str]]
+    created_at: float
+
+    def chunks(self) -> list[ChatChunk]:
+        request_id = utils.shortuuid()
+        delta = ChoiceDelta(
+            role="assistant",
+            content=self.text or None,
+            tool_calls=[
+                FunctionToolCall(name=name, arguments=arguments, call_id=utils.shortuuid())
+                for name, arguments in self.tool_calls
+            ],
+        )
+        return [ChatChunk(id=request_id, delta=delta)]
+
+
+class ResponseCache:
+    """LRU + TTL store of LLM responses, optionally backed by a shared file."""
+
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        path: Optional[Path] = None,
+        max_age: float = 24 * 3600.0,
+    ):
+        """Initialize the cache, loading recent entries from ``path``.
+
+        Args:
+            maxsize: Maximum number of responses kept in memory
+            path: JSON-lines file shared with other worker processes
+            max_age: Entries in the file older than this are not loaded
+                (and dropped when the file is compacted)
+        """
+        self.maxsize = max(1, maxsize)
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._log = AppendOnlyLog(path) if path else None
+        self._pending: set[asyncio.Task] = set()
+        if self._log is not None:
+            self._load()
+
+    def _load(self) -> None:
+        now = time.time()
+        records = self._log.read_all()
+        kept = []
+        for record in records:
+            if record.get("created_at", 0) + self.max_age <= now:
+                continue
+            kept.append(record)
+            self._store(
+                record["key"],
+                CachedResponse(
+                    text=record["text"],
+                    tool_calls=[tuple(call) for call in record["tool_calls"]],
+                    created_at=record["created_at"],
+                ),
+            )
+        if len(records) > 2 * self.maxsize:
+            self._compact(kept[-self.maxsize :])
+
+    def _compact(self, records: list[dict]) -> None:
+        # Rewrite the file with only the live entries; appends from other
+        # processes racing with the rename are lost, which a cache can afford
+        # (a unique temp file: other processes may be compacting at prewarm too)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self._log.path.parent, suffix=".compact", delete=False
+        ) as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(f.name, self._log.path)
+
+    def get(self, key: str, policy: CachePolicy) -> Optional[CachedResponse]:
+        """Look up a fresh response by key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.created_at + policy.ttl > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: CachedResponse, shared: bool = False) -> None:
+        """Store a response, and append it to the shared file in the background.
+
+        Args:
+            key: Request key (see CachingLLM.cache_key)
+            response: What the LLM answered
+            shared: Also write it to the file other processes load; only for
+                responses that carry nothing the caller said
+        """
+        with self._lock:
+            self._store(key, response)
+        if shared and self._log is not None:
+            record = {
+                "key": key,
+                "text": response.text,
+                "tool_calls": response.tool_calls,
+                "created_at": response.created_at,
+            }
+            task = asyncio.create_task(asyncio.to_thread(self._log.append, record))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _store(self, key: str, response: CachedResponse) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def aclose(self) -> None:
+        """Finish background appends and release the shared file."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._log is not None:
+            await asyncio.to_thread(self._log.close)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class CachingLLM(llm.LLM):
+    """Wraps a session's LLM and answers repeated turns from a ResponseCache."""
+
+    def __init__(
+        self,
+        inner: llm.LLM,
+        cache: ResponseCache,
+        policy: CachePolicy,
+        agent: str,
+        state: Optional[Callable[[], Any]] = None,
+    ):
+        """Initialize the wrapper.
+
+        Args:
+            inner: LLM that answers cache misses
+            cache: Process-wide response store
+            policy: Which turns may be cached, and for how long
+            agent: Agent name for metrics
+            state: Returns the session's tool state (JSON-serializable), which
+                is part of the key so a cached reply never contradicts it
+        """
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+        self.policy = policy
+        self.agent = agent
+        self.state = state
+        inner.on("metrics_collected", self._forward_metrics)
+        inner.on("error", self._forward_error)
+
+    @property
+    def model(self) -> str:
+        return self.inner.model
+
+    @property
+    def provider(self) -> str:
+        return self.inner.provider
+
+    def _forward_metrics(self, *args: Any, **kwargs: Any) -> None:
+        self.emit("metrics_collected", *args, **kwargs)
+
+    def _forward_error(self, *args: Any, **kwargs: Any) -> None:
+        self.emit("error", *args, **kwargs)
+
+    def cache_key(
+        self, chat_ctx: llm.ChatContext, tools: list
+    ) -> Optional[tuple[str, Optional[set[str]]]]:
+        """Key for a request and the caller's own words, or None if it isn't cacheable.
+
+        The key covers every item of the context being sent, normalized. The
+        caller's words are those of their messages that the instructions
+        don't contain; they are None when the request is past the first
+        user turn, whose replies are never shared with other processes.
+        """
+        instructions, history = [], []
+        for item in chat_ctx.items:
+            if item.type == "message" and item.role in ("system", "developer"):
+                instructions.append(item.text_content or "")
+            elif (key := _item_key(item)) is not None:
+                history.append(key)
+        if not history:
+            return None
+        if history[-1][0] == "user" and len(history[-1][1]) > self.policy.max_user_chars:
+            return None
+
+        payload = json.dumps(
+            [
+                self.agent,
+                instructions,
+                sorted(llm.ToolContext(tools).function_tools),
+                self.state() if self.state is not None else None,
+                history,
+            ],
+            default=str,
+            sort_keys=True,
+        )
+        key = hashlib.sha256(payload.encode()).hexdigest()
+
+        caller_words = None
+        said = [text for role, text, *_ in history if role == "user"]
+        if len(said) <= 1 and all(entry[0] in ("user", "assistant") for entry in history):
+            known = set(normalize(" ".join(instructions)).split())
+            caller_words = {w for text in said for w in text.split()} - known
+        return key, caller_words
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs: Any,
+    ) -> llm.LLMStream:
+        tools = tools or []
+        lookup = self.cache_key(chat_ctx, tools) if self.policy.enabled else None
+        if lookup is not None:
+            cached = self.cache.get(lookup[0], self.policy)
+            get_metrics().llm_cache.labels(self.agent, "hit" if cached else "miss").inc()
+            if cached is not None:
+                return _ReplayStream(
+                    self, cached, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options
+                )
+
+        def store(response: CachedResponse) -> None:
+            if lookup is not None:
+                key, caller_words = lookup
+                shared = (
+                    caller_words is not None
+                    and not response.tool_calls
+                    and not (_capitalized(response.text) & caller_words)
+                )
+                self.cache.put(key, response, shared)
+
+        stream = self.inner.chat(
+            chat_ctx=chat_ctx, tools=tools, conn_options=conn_options, **kwargs
+        )
+        return _RecordingStream(
+            self,
+            stream,
+            store,
+            chat_ctx=chat_ctx,
+            tools=tools,
+            # The inner stream does its own retries
+            conn_options=dataclasses.replace(conn_options, max_retry=0),
+        )
+
+    async def aclose(self) -> None:
+        self.inner.off("metrics_collected", self._forward_metrics)
+        self.inner.off("error", self._forward_error)
+
+
+class _ReplayStream(llm.LLMStream):
+    def __init__(self, caching_llm: CachingLLM, cached: CachedResponse, **kwargs: Any):
+        super().__init__(caching_llm, **kwargs)
+        self._cached = cached
+
+    async def _run(self) -> None:
+        for chunk in self._cached.chunks():
+            self._event_ch.send_nowait(chunk)
+
+
+class _RecordingStream(llm.LLMStream):
+    def __init__(
+        self,
+        caching_llm: CachingLLM,
+        inner: llm.LLMStream,
+        store: Callable[[CachedResponse], None],
+        **kwargs: Any,
+    ):
+        super().__init__(caching_llm, **kwargs)
+        self._inner = inner
+        self._store = store
+
+    async def _run(self) -> None:
+        text, tool_calls = [], []
+        async with self._inner as stream:
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+                if chunk.delta is not None:
+                    if chunk.delta.content:
+                        text.append(chunk.delta.content)
+                    tool_calls.extend((c.name, c.arguments) for c in chunk.delta.tool_calls)
+        if text or tool_calls:
+            self._store(CachedResponse("".join(text), tool_calls, created_at=time.time()))
+
+    async def _metrics_monitor_task(self, event_aiter: Any) -> None:
+        # The inner LLM reports its own metrics
+        return
+
+    def _emit_error(self, api_error: Exception, recoverable: bool) -> None:
+        # ...and its own errors
+        return
+
+
+def load_response_cache(proc: Any) -> Optional[ResponseCache]:
+    """Create the process's response cache (call from prewarm).
+
+    Unless LLM_RESPONSE_CACHE_DISABLED is set, responses are shared through
+    LLM_RESPONSE_CACHE_FILE (default cache/llm_responses.jsonl).
+    """
+    if os.getenv(CACHE_DISABLED_ENV):
+        return None
+    cache = proc.userdata.get("response_cache")
+    if cache is None:
+        path = Path(os.getenv(CACHE_FILE_ENV, DEFAULT_CACHE_FILE))
+        cache = proc.userdata["response_cache"] = ResponseCache(
+            maxsize=int(os.getenv("LLM_RESPONSE_CACHE_SIZE", "2048")), path=path
+        )
+        logger.info(f"Loaded {cache.stats()['size']} cached LLM responses from {path}")
+    return cache
+
+
+def cached_llm(
+    ctx: Any,
+    inner: llm.LLM,
+    policy: CachePolicy,
+    agent: str,
+    state: Optional[Callable[[], Any]] = None,
+) -> llm.LLM:
+    """Put the process's response cache in front of a job's LLM, if the policy opts in.
+
+    Args:
+        ctx: Job context (for the process cache and the shutdown callback)
+        inner: The pipeline's LLM
+        policy: The agent's cache policy
+        agent: Agent name for metrics and keys
+        state: Returns the session's tool state, see CachingLLM
+    """
+    cache = ctx.proc.userdata.get("response_cache")
+    if not policy.enabled or cache is None:
+        return inner
+    wrapper = CachingLLM(inner, cache, policy, agent, state)
+
+    async def close_cache():
+        await wrapper.aclose()
+        await cache.aclose()
+        logger.info(f"LLM response cache ({agent}): {cache.stats()}")
+
+    ctx.add_shutdown_callback(close_cache)
+    return wrapper
@@ -0,0 +1,233 @@
+"""Asynchronous, batched structured logging for job processes.
+
+Every log call on the audio event loop used to format the record, copy it
+and pickle it to the worker (LiveKit's IPC log handler) before returning.
+Here the loop only creates the record and puts it on a bounded queue; a
+writer thread formats it, forwards it to the original handlers and, if
+AGENT_LOG_FILE is set, appends it to a JSON-lines file in batches.
+
+Records can carry an event type (``extra={"event": "user_input_transcribed"}``)
+so high-frequency events are sampled. By default only interim transcripts
+are (the day agents log them several times per second); LOG_SAMPLE_RATES
+overrides or adds rates, e.g. "user_input_transcribed=0,llm_response=0.5".
+Warnings and errors are never sampled out.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+logger = logging.getLogger("agent")
+
+LOG_FILE_ENV = "AGENT_LOG_FILE"
+SAMPLE_RATES_ENV = "LOG_SAMPLE_RATES"
+# Events the agents log many times per turn: interim transcripts, from the
+# session's user_input_transcribed event
+DEFAULT_SAMPLE_RATES = {"user_input_transcribed": 0.1}
+QUEUE_SIZE = 10000
+BATCH_SIZE = 256
+
+# Attributes every LogRecord has; anything else came from `extra` or
+# ctx.log_context_fields and goes into the JSON output
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+_writer: Optional["LogWriter"] = None
+_install_lock = threading.Lock()
+
+
+def parse_sample_rates(spec: Optional[str]) -> dict[str, float]:
+    """Parse "event=rate,event=rate" on top of the default rates."""
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fixed share of each sampled event type: every Nth record."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._seen: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event) if event else None
+        if rate is None or rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        if rate <= 0.0:
+            return False
+        seen = self._seen.get(event, 0)
+        self._seen[event] = seen + 1
+        return seen % round(1 / rate) == 0
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with context fields and extras at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueingHandler(logging.Handler):
+    """Hands records to the writer thread; drops them rather than block the loop."""
+
+    def __init__(self, records: "queue.Queue[Optional[logging.LogRecord]]"):
+        super().__init__()
+        self.records = records
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter:
+    """Background thread that formats and writes queued records in batches."""
+
+    def __init__(
+        self,
+        handlers: list[logging.Handler],
+        path: Optional[str] = None,
+        sample_rates: Optional[dict[str, float]] = None,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        """Initialize the writer.
+
+        Args:
+            handlers: Handlers to forward every record to (e.g. the worker's)
+            path: JSON-lines file to append records to, if any
+            sample_rates: Share of records to keep per event type
+            queue_size: Records buffered before new ones are dropped
+        """
+        self.records: queue.Queue[Optional[logging.LogRecord]] = queue.Queue(queue_size)
+        self.handler = QueueingHandler(self.records)
+        self.handler.addFilter(SamplingFilter(sample_rates or DEFAULT_SAMPLE_RATES))
+        self.handlers = handlers
+        self.path = path
+        self.formatter = JsonLinesFormatter()
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Held open across batches and closed by stop(), so not a `with` block
+            self._file = open(self.path, "a", encoding="utf-8")  # noqa: SIM115
+        self._thread.start()
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self.records.join()
+
+    def stop(self) -> None:
+        # A writer thread that died on an error can't drain the queue
+        if self._thread.is_alive():
+            self.records.put(None)
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            self._write([r for r in batch if r is not None])
+            for _ in batch:
+                self.records.task_done()
+            if stopping:
+                return
+
+    def _write(self, batch: list[logging.LogRecord]) -> None:
+        lines = []
+        for record in batch:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            if self._file is not None:
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.handler.handleError(record)
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+
+
+def install() -> LogWriter:
+    """Route this process's logging through a LogWriter (once per process).
+
+    The root logger's current handlers, e.g. the one forwarding records to
+    the worker, are moved behind the writer thread.
+    """
+    global _writer
+    with _install_lock:
+        if _writer is None:
+            root = logging.getLogger()
+            handlers = list(root.handlers)
+            writer = LogWriter(
+                handlers,
+                path=os.getenv(LOG_FILE_ENV),
+                sample_rates=parse_sample_rates(os.getenv(SAMPLE_RATES_ENV)),
+            )
+            writer.start()
+            for handler in handlers:
+                root.removeHandler(handler)
+            root.addHandler(writer.handler)
+            _writer = writer
+        return _writer
+
+
+def setup_job_logging(ctx: Any, agent: str) -> LogWriter:
+    """Log a job asynchronously, tagging every record with the job's room and agent.
+
+    Args:
+        ctx: Job context; its log_context_fields are added to every record
+        agent: Agent name for the ``agent`` field
+    """
+    writer = install()
+    ctx.log_context_fields = {
+        **ctx.log_context_fields,
+        "agent": agent,
+        "room": ctx.job.room.name,
+        "job_id": ctx.job.id,
+    }
+
+    async def flush_logs():
+        if writer.handler.dropped:
+            logger.warning(f"Dropped {writer.handler.dropped} log records (log queue full)")
+        await asyncio.to_thread(writer.flush)
+
+    ctx.add_shutdown_callback(flush_logs)
+    return writer
@@ -0,0 +1,270 @@
+"""Local stand-ins for the STT, LLM and TTS providers, for offline benchmarks."""
+
+import asyncio
+import json
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from livekit import rtc
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectionError,
+    APIConnectOptions,
+    llm,
+    stt,
+    tts,
+    utils,
+)
+from livekit.agents.types import NOT_GIVEN, NotGivenOr
+
+SAMPLE_RATE = 24000
+
+
+@dataclass
+class StubReply:
+    """What the stub LLM answers: tool calls to make, or text to say."""
+
+    text: str = ""
+    tool_calls: list[tuple[str, dict]] = field(default_factory=list)
+
+
+def echo_reply(chat_ctx: llm.ChatContext) -> StubReply:
+    """Default script: acknowledge the latest user message."""
+    for item in reversed(chat_ctx.items):
+        if item.type == "message" and item.role == "user":
+            return StubReply(text=f"You said: {item.text_content}")
+    return StubReply(text="Hello! How can I help you today?")
+
+
+class _Flaky:
+    """Seeded failure injection shared by the stubs."""
+
+    def __init__(self, failure_rate: float, seed: Optional[int]):
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def maybe_fail(self, provider: str) -> None:
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise APIConnectionError(f"stub {provider} failure (injected)")
+
+
+class StubLLM(llm.LLM):
+    """LLM that streams scripted replies with configurable timing.
+
+    ``script`` is called with the chat context of every request and decides
+    the reply, so a benchmark can walk an agent through its function tools.
+    """
+
+    def __init__(
+        self,
+        script: Callable[[llm.ChatContext], StubReply] = echo_reply,
+        ttft: float = 0.3,
+        chunk_chars: int = 24,
+        chunk_interval: float = 0.02,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        """Initialize the stub.
+
+        Args:
+            script: Produces the reply for a chat context
+            ttft: Seconds before the first chunk
+            chunk_chars: Characters of text per streamed chunk
+            chunk_interval: Seconds between chunks
+            failure_rate: Probability a request fails with a retryable error
+            seed: Seed for failure injection (None for nondeterministic)
+        """
+        super().__init__()
+        self.script = script
+        self.ttft = ttft
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_interval = chunk_interval
+        self.flaky = _Flaky(failure_rate, seed)
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "stub"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[list] = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> "StubLLMStream":
+        return StubLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        stub: StubLLM = self._llm
+        await asyncio.sleep(stub.ttft)
+        stub.flaky.maybe_fail("LLM")
+        reply = stub.script(self._chat_ctx)
+        request_id = utils.shortuuid()
+
+        for name, arguments in reply.tool_calls:
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(
+                        role="assistant",
+                        tool_calls=[
+                            llm.FunctionToolCall(
+                                name=name,
+                                arguments=json.dumps(arguments),
+                                call_id=utils.shortuuid(),
+                            )
+                        ],
+                    ),
+                )
+            )
+
+        text = reply.text
+        for i in range(0, len(text), stub.chunk_chars):
+            if i:
+                await asyncio.sleep(stub.chunk_interval)
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(role="assistant", content=text[i : i + stub.chunk_chars]),
+                )
+            )
+
+        # Rough token counts (~4 characters per token) so usage metrics aren't empty
+        prompt_chars = sum(
+            len(item.text_content or "") for item in self._chat_ctx.items if item.type == "message"
+        )
+        prompt_tokens = prompt_chars // 4
+        completion_tokens = len(text) // 4
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=request_id,
+                usage=llm.CompletionUsage(
+                    completion_tokens=completion_tokens,
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + completion_tokens,
+                ),
+            )
+        )
+
+
+class StubSTT(stt.STT):
+    """Batch STT that returns queued transcripts after a fixed delay."""
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, seed: Optional[int] = 0):
+        """Initialize the stub.
+
+        Args:
+            latency: Seconds from request to final transcript
+            failure_rate: Probability a request fails with a retryable error
+            seed: Seed for failure injection
+        """
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.latency = latency
+        self.flaky = _Flaky(failure_rate, seed)
+        self._transcripts: deque[str] = deque()
+
+    def queue_transcript(self, text: str) -> None:
+        """Set what the next ``recognize`` call will hear."""
+        self._transcripts.append(text)
+
+    async def _recognize_impl(
+        self,
+        buffer,
+        *,
+        language: NotGivenOr[str] = NOT_GIVEN,
+        conn_options: APIConnectOptions,
+    ) -> stt.SpeechEvent:
+        await asyncio.sleep(self.latency)
+        self.flaky.maybe_fail("STT")
+        text = self._transcripts.popleft() if self._transcripts else ""
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language="en", text=text, confidence=1.0)],
+        )
+
+
+class StubTTS(tts.TTS):
+    """Chunked TTS that streams silence sized like real speech."""
+
+    def __init__(
+        self,
+        ttfb: float = 0.25,
+        chunk_ms: int = 100,
+        chunk_interval: float = 0.02,
+        seconds_per_char: float = 0.06,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        """Initialize the stub.
+
+        Args:
+            ttfb: Seconds before the first audio chunk
+            chunk_ms: Audio per streamed chunk, in milliseconds
+            chunk_interval: Seconds between chunks
+            seconds_per_char: Audio length per input character
+            failure_rate: Probability a request fails with a retryable error
+            seed: Seed for failure injection
+        """
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+        self.chunk_ms = chunk_ms
+        self.chunk_interval = chunk_interval
+        self.seconds_per_char = seconds_per_char
+        self.flaky = _Flaky(failure_rate, seed)
+        self.voice: Optional[str] = None
+        self.style: Optional[str] = None
+
+    def update_options(self, *, voice: Optional[str] = None, style: Optional[str] = None) -> None:
+        """Accept voice switches like murf.TTS (the audio stays silent)."""
+        self.voice = voice or self.voice
+        self.style = style or self.style
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "StubChunkedStream":
+        return StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        stub: StubTTS = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await asyncio.sleep(stub.ttfb)
+        stub.flaky.maybe_fail("TTS")
+
+        total_samples = int(len(self._input_text) * stub.seconds_per_char * SAMPLE_RATE)
+        chunk_samples = SAMPLE_RATE * stub.chunk_ms // 1000
+        sent = 0
+        while sent < total_samples:
+            samples = min(chunk_samples, total_samples - sent)
+            output_emitter.push(bytes(samples * 2))
+            sent += samples
+            if sent < total_samples:
+                await asyncio.sleep(stub.chunk_interval)
+        output_emitter.flush()
+
+
+def silence(seconds: float) -> rtc.AudioFrame:
+    """A frame of silent 16 kHz audio, e.g. to feed StubSTT."""
+    samples = int(16000 * seconds)
+    return rtc.AudioFrame(
+        data=bytes(samples * 2), sample_rate=16000, num_channels=1, samples_per_channel=samples
+    )
@@ -0,0 +1,199 @@
+"""Profiling hook for the day agents' function tools."""
+
+import functools
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from livekit.agents import Agent, JobContext, RunContext
+
+try:
+    from .turn_tracer import percentile
+    from .worker_metrics import get_metrics
+except ImportError:
+    from turn_tracer import percentile
+    from worker_metrics import get_metrics
+
+logger = logging.getLogger("agent")
+
+BLOCKING_THRESHOLD_ENV = "TOOL_BLOCKING_THRESHOLD_MS"
+DEFAULT_BLOCKING_THRESHOLD_MS = 20.0
+
+
+class _TimedCoroutine:
+    """Awaits a coroutine while timing each step it runs on the event loop.
+
+    A coroutine only holds the loop between two awaits, so the time each
+    ``send``/``throw`` takes is exactly how long the tool blocked audio
+    streaming and every other task.
+    """
+
+    def __init__(self, coro: Any):
+        self._coro = coro
+        self.blocking = 0.0
+        self.longest_step = 0.0
+
+    def _timed(self, step: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return step()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.blocking += elapsed
+            self.longest_step = max(self.longest_step, elapsed)
+
+    def __await__(self):
+        coro = self._coro
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                if error is not None:
+                    yielded = self._timed(functools.partial(coro.throw, error))
+                else:
+                    yielded = self._timed(functools.partial(coro.send, value))
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+@dataclass
+class ToolStats:
+    """Timings for one function tool."""
+
+    calls: int = 0
+    errors: int = 0
+    slow_calls: int = 0
+    wall: deque = field(default_factory=lambda: deque(maxlen=1000))
+    blocking_total: float = 0.0
+    longest_step: float = 0.0
+    arg_bytes_total: int = 0
+
+
+class ToolProfiler:
+    """Times every function tool of an agent.
+
+    For each call it records wall time, how long the tool held the event
+    loop (its synchronous work between awaits) and the size of its
+    arguments. A call whose longest uninterrupted step exceeds the blocking
+    threshold is logged as a warning, since that is time no audio frames
+    were sent. ``report()`` summarizes everything per tool.
+    """
+
+    def __init__(self, agent_name: str, blocking_threshold_ms: Optional[float] = None):
+        """Initialize the profiler.
+
+        Args:
+            agent_name: Agent name used in logs and metrics (e.g. "barista")
+            blocking_threshold_ms: Longest acceptable loop-blocking step, in
+                milliseconds (default: TOOL_BLOCKING_THRESHOLD_MS or 20)
+        """
+        if blocking_threshold_ms is None:
+            blocking_threshold_ms = float(
+                os.getenv(BLOCKING_THRESHOLD_ENV, DEFAULT_BLOCKING_THRESHOLD_MS)
+            )
+        self.agent_name = agent_name
+        self.blocking_threshold = blocking_threshold_ms / 1000
+        self.stats: dict[str, ToolStats] = {}
+
+    async def instrument(self, agent: Agent) -> None:
+        """Replace the agent's tools with profiled wrappers (call before session.start)."""
+        await agent.update_tools([self.wrap(tool) for tool in agent.tools])
+
+    def wrap(self, tool: Callable) -> Callable:
+        """Profiled version of a function tool, keeping its name, schema and docstring."""
+        name = getattr(tool, "__name__", repr(tool))
+
+        @functools.wraps(tool)
+        async def profiled(*args, **kwargs):
+            timed = _TimedCoroutine(tool(*args, **kwargs))
+            start = time.perf_counter()
+            failed = False
+            try:
+                return await timed
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self.record(
+                    name,
+                    wall=time.perf_counter() - start,
+                    blocking=timed.blocking,
+                    longest_step=timed.longest_step,
+                    arg_bytes=_argument_size(args, kwargs),
+                    failed=failed,
+                )
+
+        return profiled
+
+    def record(
+        self,
+        name: str,
+        wall: float,
+        blocking: float,
+        longest_step: float,
+        arg_bytes: int = 0,
+        failed: bool = False,
+    ) -> None:
+        """Add one call's timings to a tool's stats."""
+        stats = self.stats.setdefault(name, ToolStats())
+        stats.calls += 1
+        stats.errors += failed
+        stats.wall.append(wall)
+        stats.blocking_total += blocking
+        stats.longest_step = max(stats.longest_step, longest_step)
+        stats.arg_bytes_total += arg_bytes
+        get_metrics().tool_blocking.labels(self.agent_name, name).observe(blocking)
+        if longest_step > self.blocking_threshold:
+            stats.slow_calls += 1
+            logger.warning(
+                f"⚠️ Tool {name} blocked the event loop for {longest_step * 1000:.1f} ms "
+                f"(budget {self.blocking_threshold * 1000:.0f} ms, wall {wall * 1000:.1f} ms)"
+            )
+
+    def report(self) -> dict:
+        """Per-tool latency report, slowest p95 first (times in milliseconds)."""
+        rows = {}
+        for name, stats in self.stats.items():
+            wall = sorted(stats.wall)
+            rows[name] = {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "wall_p50_ms": round(percentile(wall, 50) * 1000, 2),
+                "wall_p95_ms": round(percentile(wall, 95) * 1000, 2),
+                "blocking_avg_ms": round(stats.blocking_total / stats.calls * 1000, 2),
+                "longest_block_ms": round(stats.longest_step * 1000, 2),
+                "slow_calls": stats.slow_calls,
+                "avg_arg_bytes": stats.arg_bytes_total // stats.calls,
+            }
+        return dict(sorted(rows.items(), key=lambda item: -item[1]["wall_p95_ms"]))
+
+
+def _argument_size(args: tuple, kwargs: dict) -> int:
+    # The bound agent and the RunContext aren't arguments the LLM supplied
+    values = [a for a in args if not isinstance(a, (Agent, RunContext))]
+    values += [v for v in kwargs.values() if not isinstance(v, RunContext)]
+    try:
+        return len(json.dumps(values, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+async def profile_tools(ctx: JobContext, agent: Agent, agent_name: str) -> ToolProfiler:
+    """Profile an agent's tools for one job and log the report when the job ends."""
+    profiler = ToolProfiler(agent_name)
+    await profiler.instrument(agent)
+
+    async def report_tools():
+        if profiler.stats:
+            logger.info(f"Tool latency ({agent_name}): {profiler.report()}")
+
+    ctx.add_shutdown_callback(report_tools)
+    return profiler
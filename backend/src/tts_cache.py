@@ -0,0 +1,693 @@
+"""Audio cache for agent utterances that repeat across sessions.
+
+Greetings, the barista's fixed questions and replies answered from the
+response cache are spoken word for word again and again, and each time
+Murf synthesizes them from scratch. Each agent lists these known phrases.
+``CachingTTS`` plays a sentence of the agent's speech that is a known
+phrase straight from cached PCM, and streams everything else to the
+wrapped TTS word by word as it arrives, as if the cache weren't there. Text
+is only held back at the start of a sentence, and only while it could
+still turn out to be a known phrase.
+
+Entries are content-addressed by (voice, style, text) and kept in memory
+(LRU, bounded in bytes) and on disk as WAV files, where the next worker
+processes find them. Known phrases are loaded into memory at prewarm and
+synthesized in the background on first use if they aren't on disk yet.
+Nothing else is cached, so one-off lines, such as a wellness reply that
+mentions what the caller said, never reach the disk.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import wave
+from collections import OrderedDict
+from collections.abc import AsyncIterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectOptions,
+    tokenize,
+    tts,
+    utils,
+)
+from livekit.agents.tts.stream_adapter import DEFAULT_STREAM_ADAPTER_API_CONNECT_OPTIONS
+
+try:
+    from .worker_metrics import get_metrics
+except ImportError:
+    from worker_metrics import get_metrics
+
+logger = logging.getLogger("agent")
+
+CACHE_DIR_ENV = "TTS_CACHE_DIR"
+CACHE_DISABLED_ENV = "TTS_CACHE_DISABLED"
+DEFAULT_CACHE_DIR = "cache/tts"
+MEMORY_MB_ENV = "TTS_CACHE_MEMORY_MB"
+DISK_MB_ENV = "TTS_CACHE_DISK_MB"
+# Longer sentences are unlikely to be spoken again word for word
+MAX_SENTENCE_CHARS = 300
+# Where a sentence ends: punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])(?=\s)")
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def audio_key(voice: str, style: Optional[str], text: str) -> str:
+    """Content address of a sentence spoken in a voice and style."""
+    payload = json.dumps([voice, style, normalize(text)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def sentence_tokenizer() -> tokenize.SentenceTokenizer:
+    # Shared by preloading and the phrase warm-up so both cut phrases the same way
+    return tokenize.blingfire.SentenceTokenizer(retain_format=True)
+
+
+@dataclass
+class CachedAudio:
+    """16-bit PCM of one synthesized sentence."""
+
+    pcm: bytes
+    sample_rate: int
+    num_channels: int = 1
+
+
+class AudioCache:
+    """Sentence audio in memory (LRU) and on disk (least recently used evicted first).
+
+    Sentences of known phrases are pinned: they are written to disk and
+    never evicted from it.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        """Initialize the cache and index the files already on disk.
+
+        Args:
+            directory: Where WAV files are shared with other processes (None = memory only)
+            memory_bytes: PCM kept in memory
+            disk_bytes: Total size of the WAV files
+        """
+        self.directory = Path(directory) if directory else None
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: OrderedDict[str, CachedAudio] = OrderedDict()
+        self._memory_size = 0
+        self._disk: dict[str, tuple[float, int]] = {}
+        self._pinned: set[str] = set()
+        self._phrases: dict[tuple[str, Optional[str]], set[str]] = {}
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".wav"):
+                    stat = entry.stat()
+                    self._disk[entry.name[:-4]] = (stat.st_mtime, stat.st_size)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.wav"
+
+    def peek(self, key: str) -> bool:
+        return key in self._memory
+
+    def pin(self, voice: str, style: Optional[str], sentence: str) -> str:
+        """Mark a sentence as (part of) a known phrase and return its key.
+
+        Pinned sentences are played from the cache, kept on disk and never
+        evicted from it.
+        """
+        key = audio_key(voice, style, sentence)
+        with self._lock:
+            self._pinned.add(key)
+            self._phrases.setdefault((voice, style), set()).add(normalize(sentence))
+        return key
+
+    def phrases(self, voice: str, style: Optional[str]) -> set[str]:
+        """Pinned sentences of a voice and style, normalized."""
+        return self._phrases.get((voice, style), set())
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Look up a sentence in memory only (doesn't count misses)."""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+            return audio
+
+    def load(self, key: str) -> Optional[CachedAudio]:
+        """Look up a sentence in memory, then on disk (blocking: call off the loop)."""
+        with self._lock:
+            audio = self._memory.get(key)
+        if audio is None and key in self._disk:
+            path = self._path(key)
+            try:
+                with wave.open(str(path), "rb") as f:
+                    audio = CachedAudio(
+                        pcm=f.readframes(f.getnframes()),
+                        sample_rate=f.getframerate(),
+                        num_channels=f.getnchannels(),
+                    )
+                # Reads count as use, for this and the other processes' eviction
+                os.utime(path)
+            except (FileNotFoundError, EOFError, wave.Error):
+                # Evicted or half-written by another process
+                audio = None
+            if audio is not None:
+                self._remember(key, audio)
+                with self._lock:
+                    if key in self._disk:
+                        self._disk[key] = (time.time(), self._disk[key][1])
+        with self._lock:
+            if audio is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return audio
+
+    def store(self, key: str, audio: CachedAudio) -> None:
+        """Keep a sentence in memory, and on disk if pinned (blocking: call off the loop)."""
+        self._remember(key, audio)
+        with self._lock:
+            persist = key in self._pinned and key not in self._disk
+        if persist:
+            self.write(key, audio)
+
+    def write(self, key: str, audio: CachedAudio) -> None:
+        """Write a sentence to disk, evicting old files over the limit (blocking)."""
+        if self.directory is None:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with wave.open(str(tmp), "wb") as f:
+            f.setnchannels(audio.num_channels)
+            f.setsampwidth(2)
+            f.setframerate(audio.sample_rate)
+            f.writeframes(audio.pcm)
+        os.replace(tmp, path)
+        stat = path.stat()
+        with self._lock:
+            self._disk[key] = (stat.st_mtime, stat.st_size)
+            evict = self._disk_overflow()
+        for old_key in evict:
+            with contextlib.suppress(FileNotFoundError):
+                self._path(old_key).unlink()
+
+    def _disk_overflow(self) -> list[str]:
+        total = sum(size for _, size in self._disk.values())
+        evict = []
+        for old_key, (_, size) in sorted(self._disk.items(), key=lambda item: item[1][0]):
+            if total <= self.disk_bytes:
+                break
+            if old_key in self._pinned:
+                continue
+            del self._disk[old_key]
+            total -= size
+            evict.append(old_key)
+        return evict
+
+    def _remember(self, key: str, audio: CachedAudio) -> None:
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old.pcm)
+            self._memory[key] = audio
+            self._memory_size += len(audio.pcm)
+            while self._memory_size > self.memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted.pcm)
+                self.evictions += 1
+
+    def preload(self, voice: str, style: Optional[str], phrases: list[str]) -> int:
+        """Pin the sentences of known phrases and load them from disk into memory.
+
+        Returns:
+            Number of sentences found
+        """
+        found = 0
+        for phrase in phrases:
+            for sentence in sentence_tokenizer().tokenize(phrase):
+                if self.load(self.pin(voice, style, sentence)) is not None:
+                    found += 1
+        with self._lock:
+            # Preloading isn't traffic
+            self.hits = self.misses = 0
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_size / 1e6, 1),
+                "disk_entries": len(self._disk),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@dataclass
+class Voice:
+    """A TTS instance and the voice and style it speaks in."""
+
+    tts: tts.TTS
+    voice: str
+    style: Optional[str] = None
+
+
+class CachingTTS(tts.TTS):
+    """Plays known phrases from the cache and streams the rest to the wrapped TTS.
+
+    Text between known phrases goes to one stream of the wrapped TTS as it
+    arrives, so time to first audio is the wrapped TTS's own. Its metrics
+    are forwarded, so TTS usage only counts what was actually synthesized.
+    An agent with several voices can keep one warm TTS instance per voice
+    and ``switch`` between them.
+    """
+
+    def __init__(
+        self,
+        inner: tts.TTS,
+        cache: AudioCache,
+        agent: str,
+        voice: str,
+        style: Optional[str] = None,
+    ):
+        """Initialize the wrapper.
+
+        Args:
+            inner: TTS that synthesizes cache misses
+            cache: Process-wide audio cache
+            agent: Agent name for metrics
+            voice: Voice the inner TTS is configured with
+            style: Voice style the inner TTS is configured with
+        """
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=True, aligned_transcript=True),
+            sample_rate=inner.sample_rate,
+            num_channels=inner.num_channels,
+        )
+        self.current = Voice(inner, voice, style)
+        self.cache = cache
+        self.agent = agent
+        self._tokenizer = sentence_tokenizer()
+        inner.on("metrics_collected", self._forward_metrics)
+
+    @property
+    def inner(self) -> tts.TTS:
+        return self.current.tts
+
+    @property
+    def model(self) -> str:
+        return self.inner.model
+
+    @property
+    def provider(self) -> str:
+        return self.inner.provider
+
+    def _forward_metrics(self, *args: Any, **kwargs: Any) -> None:
+        self.emit("metrics_collected", *args, **kwargs)
+
+    def switch(self, voice: Voice) -> None:
+        """Speak through another TTS instance from the next sentence on."""
+        if voice.tts is not self.inner:
+            self.inner.off("metrics_collected", self._forward_metrics)
+            voice.tts.on("metrics_collected", self._forward_metrics)
+        self.current = voice
+
+    def update_options(self, **kwargs: Any) -> None:
+        """Switch the voice or style of the wrapped TTS (e.g. murf.TTS)."""
+        self.inner.update_options(**kwargs)
+        self.current = Voice(
+            self.inner,
+            kwargs.get("voice") or self.current.voice,
+            kwargs.get("style") or self.current.style,
+        )
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> tts.ChunkedStream:
+        return self.inner.synthesize(text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "_CachingStream":
+        return _CachingStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self.inner.prewarm()
+
+    async def sentence_audio(
+        self,
+        text: str,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        voice: Optional[Voice] = None,
+    ) -> AsyncIterable[bytes]:
+        """PCM of one sentence: from the cache, else synthesized and cached.
+
+        Args:
+            text: The sentence
+            conn_options: Connection options for the wrapped TTS
+            voice: Voice to speak it in (default: the current one)
+        """
+        voice = voice or self.current
+        if len(text) > MAX_SENTENCE_CHARS:
+            async for data in _synthesize(voice.tts, text, conn_options):
+                yield data
+            return
+
+        key = audio_key(voice.voice, voice.style, text)
+        cached = self.cache.get(key) or await asyncio.to_thread(self.cache.load, key)
+        if cached is not None and cached.sample_rate == self.sample_rate:
+            get_metrics().tts_cache.labels(self.agent, "hit").inc()
+            yield cached.pcm
+            return
+
+        get_metrics().tts_cache.labels(self.agent, "miss").inc()
+        chunks = []
+        async for data in _synthesize(voice.tts, text, conn_options):
+            chunks.append(data)
+            yield data
+        audio = CachedAudio(b"".join(chunks), self.sample_rate, self.num_channels)
+        if audio.pcm:
+            await asyncio.to_thread(self.cache.store, key, audio)
+
+    async def warm(self, phrases: list[str], voice: Optional[Voice] = None) -> None:
+        """Pin known phrases and synthesize the ones that aren't cached yet.
+
+        Meant to run in the background.
+
+        Args:
+            phrases: Text to synthesize
+            voice: Voice to synthesize it in (default: the current one)
+        """
+        voice = voice or self.current
+        for phrase in phrases:
+            for sentence in self._tokenizer.tokenize(phrase):
+                text = sentence.strip()
+                if not text:
+                    continue
+                key = self.cache.pin(voice.voice, voice.style, text)
+                if self.cache.peek(key):
+                    continue
+                try:
+                    async for _ in self.sentence_audio(text, voice=voice):
+                        pass
+                except Exception as e:
+                    logger.warning(f"Couldn't pre-synthesize {text!r} in {voice.voice}: {e}")
+                    return
+
+    async def aclose(self) -> None:
+        self.inner.off("metrics_collected", self._forward_metrics)
+
+
+def _live_stream(engine: tts.TTS, conn_options: APIConnectOptions) -> Optional[tts.SynthesizeStream]:
+    # Prefer the TTS's streaming API: for murf.TTS that's its pooled
+    # websocket, which the agent keeps warm
+    if engine.capabilities.streaming:
+        return engine.stream(conn_options=conn_options)
+    return None
+
+
+async def _synthesize(
+    engine: tts.TTS, text: str, conn_options: APIConnectOptions
+) -> AsyncIterable[bytes]:
+    stream = _live_stream(engine, conn_options)
+    if stream is not None:
+        stream.push_text(text)
+        stream.end_input()
+    else:
+        stream = engine.synthesize(text, conn_options=conn_options)
+    async with stream:
+        async for audio in stream:
+            yield audio.frame.data.tobytes()
+
+
+@dataclass
+class _Segment:
+    """Part of a reply: a known sentence played from the cache, or text spoken live."""
+
+    voice: Voice
+    text: str = ""
+    cached: bool = False
+    # Live text is pushed to this stream as it arrives (None: the TTS can't
+    # stream, and the text is synthesized once the segment is closed)
+    stream: Optional[tts.SynthesizeStream] = None
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class _CachingStream(tts.SynthesizeStream):
+    def __init__(self, *, tts: CachingTTS, conn_options: APIConnectOptions) -> None:
+        # The wrapped TTS retries its own requests, so this stream doesn't
+        super().__init__(tts=tts, conn_options=DEFAULT_STREAM_ADAPTER_API_CONNECT_OPTIONS)
+        self._tts: CachingTTS = tts
+        self._inner_conn_options = conn_options
+        self._segments: utils.aio.Chan[_Segment] = utils.aio.Chan()
+        self._live: Optional[_Segment] = None
+        self._opened: list[tts.SynthesizeStream] = []
+        # Text held at the start of a sentence while it may be a known
+        # phrase; None once the rest of the sentence goes live
+        self._held: Optional[str] = ""
+        self._after_punctuation = False
+
+    async def _metrics_monitor_task(self, event_aiter: AsyncIterable[tts.SynthesizedAudio]) -> None:
+        # The wrapped TTS reports what it synthesized
+        return
+
+    def _split(self, text: str) -> None:
+        if self._after_punctuation and text[:1].isspace():
+            self._end_sentence()
+        for n, piece in enumerate(_SENTENCE_END.split(text)):
+            if n:
+                self._end_sentence()
+            self._add(piece)
+        self._after_punctuation = text.endswith((".", "!", "?"))
+
+    def _add(self, text: str) -> None:
+        if self._held is None:
+            self._speak_live(text)
+            return
+        self._held += text
+        sentence = normalize(self._held)
+        voice = self._tts.current
+        if not any(p.startswith(sentence) for p in self._tts.cache.phrases(voice.voice, voice.style)):
+            held, self._held = self._held, None
+            self._speak_live(held)
+
+    def _end_sentence(self, final: bool = False) -> None:
+        held = self._held
+        if held is None or not held.strip():
+            self._held = ""
+            return
+        voice = self._tts.current
+        phrases = self._tts.cache.phrases(voice.voice, voice.style)
+        sentence = normalize(held)
+        if sentence in phrases:
+            self._close_live()
+            self._segments.send_nowait(_Segment(voice, held, cached=True))
+        elif not final and any(p.startswith(sentence) for p in phrases):
+            # A known phrase can span what looks like a sentence end ("Hi! Welcome ...")
+            return
+        else:
+            self._speak_live(held)
+        self._held = ""
+
+    def _speak_live(self, text: str) -> None:
+        if self._live is None:
+            # Voice is read per segment so a mid-reply switch applies from
+            # the next sentence spoken, as with the wrapped TTS
+            voice = self._tts.current
+            stream = _live_stream(voice.tts, self._inner_conn_options)
+            if stream is not None:
+                self._opened.append(stream)
+            self._live = _Segment(voice, stream=stream)
+            self._segments.send_nowait(self._live)
+        self._live.text += text
+        if self._live.stream is not None:
+            self._live.stream.push_text(text)
+
+    def _close_live(self) -> None:
+        if self._live is not None:
+            if self._live.stream is not None:
+                self._live.stream.end_input()
+            self._live.closed.set()
+            self._live = None
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        from livekit.agents.voice.io import TimedString
+
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._tts.sample_rate,
+            num_channels=self._tts.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+
+        async def forward_input() -> None:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    self._end_sentence(final=True)
+                    if self._live is not None and self._live.stream is not None:
+                        self._live.stream.flush()
+                    continue
+                self._split(data)
+            self._end_sentence(final=True)
+            self._close_live()
+            self._segments.close()
+
+        async def play() -> None:
+            duration = 0.0
+            bytes_per_second = self._tts.sample_rate * self._tts.num_channels * 2
+            async for segment in self._segments:
+                if segment.cached:
+                    audio = self._tts.sentence_audio(
+                        segment.text.strip(), self._inner_conn_options, segment.voice
+                    )
+                elif segment.stream is not None:
+                    audio = _frames(segment.stream)
+                else:
+                    await segment.closed.wait()
+                    audio = _synthesize(
+                        segment.voice.tts, segment.text, self._inner_conn_options
+                    )
+                # Live text keeps arriving while its audio plays
+                shown = 0
+                async for data in audio:
+                    if len(segment.text) > shown:
+                        output_emitter.push_timed_transcript(
+                            TimedString(text=segment.text[shown:], start_time=duration)
+                        )
+                        shown = len(segment.text)
+                    output_emitter.push(data)
+                    duration += len(data) / bytes_per_second
+                if len(segment.text) > shown:
+                    output_emitter.push_timed_transcript(
+                        TimedString(text=segment.text[shown:], start_time=duration)
+                    )
+                output_emitter.flush()
+
+        tasks = [
+            asyncio.create_task(forward_input()),
+            asyncio.create_task(play()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.cancel_and_wait(*tasks)
+            for stream in self._opened:
+                await stream.aclose()
+
+
+async def _frames(stream: tts.SynthesizeStream) -> AsyncIterable[bytes]:
+    async with stream:
+        async for audio in stream:
+            yield audio.frame.data.tobytes()
+
+
+def load_tts_cache(
+    proc: Any, voice: str, style: Optional[str] = None, phrases: Optional[list[str]] = None
+) -> Optional[AudioCache]:
+    """Create the process's audio cache and preload known phrases (call from prewarm).
+
+    Unless TTS_CACHE_DISABLED is set, audio is shared through TTS_CACHE_DIR
+    (default cache/tts), bounded by TTS_CACHE_DISK_MB (default 256); up to
+    TTS_CACHE_MEMORY_MB (default 32) is kept in memory.
+
+    Args:
+        proc: Job process
+        voice: Voice the phrases are spoken in
+        style: Voice style
+        phrases: Text the agent is known to say word for word
+    """
+    if os.getenv(CACHE_DISABLED_ENV):
+        return None
+    cache = proc.userdata.get("tts_cache")
+    if cache is None:
+        cache = proc.userdata["tts_cache"] = AudioCache(
+            directory=Path(os.getenv(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)),
+            memory_bytes=int(float(os.getenv(MEMORY_MB_ENV, "32")) * 1024 * 1024),
+            disk_bytes=int(float(os.getenv(DISK_MB_ENV, "256")) * 1024 * 1024),
+        )
+    if phrases:
+        found = cache.preload(voice, style, phrases)
+        logger.info(f"Preloaded {found} cached TTS sentences for {voice}")
+    return cache
+
+
+def cached_tts(
+    ctx: Any,
+    inner: tts.TTS,
+    agent: str,
+    voice: str,
+    style: Optional[str] = None,
+    phrases: Optional[list[str]] = None,
+) -> tts.TTS:
+    """Put the process's audio cache in front of a job's TTS.
+
+    Known phrases missing from the cache are synthesized in the background.
+
+    Args:
+        ctx: Job context (for the process cache and the shutdown callback)
+        inner: The pipeline's TTS
+        agent: Agent name for metrics
+        voice: Voice the inner TTS is configured with
+        style: Voice style the inner TTS is configured with
+        phrases: Text the agent is known to say word for word
+    """
+    cache = ctx.proc.userdata.get("tts_cache")
+    if cache is None:
+        return inner
+    wrapper = CachingTTS(inner, cache, agent, voice, style)
+    warm_in_background(ctx, wrapper, phrases or [])
+
+    async def close_cache():
+        await wrapper.aclose()
+        logger.info(f"TTS audio cache ({agent}): {cache.stats()}")
+
+    ctx.add_shutdown_callback(close_cache)
+    return wrapper
+
+
+def warm_in_background(
+    ctx: Any, session_tts: tts.TTS, phrases: list[str], voice: Optional[Voice] = None
+) -> Optional[asyncio.Task]:
+    """Pre-synthesize phrases into the cache until done or the job ends.
+
+    Does nothing if the session's TTS isn't cached.
+
+    Args:
+        ctx: Job context (used to register the shutdown callback)
+        session_tts: The session's TTS
+        phrases: Text to synthesize
+        voice: Voice to synthesize it in (default: the current one)
+    """
+    if not isinstance(session_tts, CachingTTS) or not phrases:
+        return None
+    task = asyncio.create_task(session_tts.warm(phrases, voice))
+
+    async def stop_warming():
+        await utils.aio.cancel_and_wait(task)
+
+    ctx.add_shutdown_callback(stop_warming)
+    return task
@@ -0,0 +1,278 @@
+"""Per-turn latency tracing for voice sessions."""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from livekit.agents import AgentSession, JobContext, metrics
+
+try:
+    from .append_log import AppendOnlyLog
+except ImportError:
+    from append_log import AppendOnlyLog
+
+logger = logging.getLogger("agent")
+
+TRACE_FILE_ENV = "TURN_TRACE_FILE"
+PERCENTILES = (50, 95, 99)
+LATENCY_FIELDS = (
+    "first_audio_delay",
+    "end_of_utterance_delay",
+    "stt_final_delay",
+    "llm_ttft",
+    "tool_seconds",
+    "tts_ttfb",
+)
+
+
+@dataclass
+class TurnRecord:
+    """Latency breakdown of one user turn, from end of speech to first agent audio.
+
+    Delays are in seconds. ``speech_end_at`` is the wall-clock time the VAD
+    detected the end of the user's speech, and every ``*_delay`` is measured
+    from that moment, so the stages can be compared directly. Stages that
+    didn't happen in a turn (e.g. no tool call) stay ``None``.
+    """
+
+    agent: str
+    room: str
+    turn: int
+    speech_end_at: float
+    speech_ids: list[str] = field(default_factory=list)
+    # Turn detection: VAD end of speech -> end-of-turn decision
+    end_of_utterance_delay: Optional[float] = None
+    # VAD end of speech -> final transcript available
+    transcription_delay: Optional[float] = None
+    # Time spent in Agent.on_user_turn_completed
+    on_user_turn_completed_delay: Optional[float] = None
+    # VAD end of speech -> STT final transcript event
+    stt_final_delay: Optional[float] = None
+    llm_ttft: Optional[float] = None
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tools: list[str] = field(default_factory=list)
+    # End of the LLM call that requested tools -> all tools finished
+    tool_seconds: Optional[float] = None
+    tts_ttfb: Optional[float] = None
+    # VAD end of speech -> agent starts speaking (first audio frame out)
+    first_audio_delay: Optional[float] = None
+    interrupted: bool = False
+
+
+class TurnTracer:
+    """Correlates session events into one ``TurnRecord`` per user turn.
+
+    A turn opens when the user stops speaking and closes when the agent
+    finishes its reply (or the user starts the next turn). In between, the
+    end-of-utterance, STT, LLM, tool and TTS events the session emits are
+    folded into the open record. Finished records go into a bounded ring
+    buffer, so tracing costs a few attribute writes per event and a fixed
+    amount of memory however long the session runs.
+    """
+
+    def __init__(self, agent: str, room: str = "", maxlen: int = 500):
+        """Initialize the tracer.
+
+        Args:
+            agent: Agent name recorded on every turn (e.g. "barista")
+            room: Room name recorded on every turn
+            maxlen: Number of finished turns kept in memory
+        """
+        self.agent = agent
+        self.room = room
+        self.records: deque[TurnRecord] = deque(maxlen=maxlen)
+        self._current: Optional[TurnRecord] = None
+        self._listeners: list[Callable[[TurnRecord], None]] = []
+        self._turns = 0
+        self._last_llm_end: Optional[float] = None
+
+    def attach(self, session: AgentSession) -> None:
+        """Subscribe to the session events the tracer needs."""
+        session.on("user_state_changed", self.on_user_state_changed)
+        session.on("agent_state_changed", self.on_agent_state_changed)
+        session.on("user_input_transcribed", self.on_user_input_transcribed)
+        session.on("function_tools_executed", self.on_function_tools_executed)
+        session.on("metrics_collected", self.on_metrics_collected)
+
+    def add_listener(self, callback: Callable[[TurnRecord], None]) -> None:
+        """Call ``callback`` with every turn as it finishes."""
+        self._listeners.append(callback)
+
+    def on_user_state_changed(self, ev) -> None:
+        if ev.new_state == "speaking":
+            # Barge-in: the agent's reply to the previous turn was cut short
+            if self._current is not None and self._current.first_audio_delay is not None:
+                self._current.interrupted = True
+                self._finish()
+        elif ev.old_state == "speaking":
+            self._finish()
+            self._turns += 1
+            self._current = TurnRecord(
+                agent=self.agent,
+                room=self.room,
+                turn=self._turns,
+                speech_end_at=ev.created_at,
+            )
+            self._last_llm_end = None
+
+    def on_agent_state_changed(self, ev) -> None:
+        turn = self._current
+        if turn is None:
+            return
+        if ev.new_state == "speaking" and turn.first_audio_delay is None:
+            turn.first_audio_delay = ev.created_at - turn.speech_end_at
+        elif ev.old_state == "speaking" and turn.first_audio_delay is not None:
+            self._finish()
+
+    def on_user_input_transcribed(self, ev) -> None:
+        turn = self._current
+        if turn is not None and ev.is_final and turn.stt_final_delay is None:
+            turn.stt_final_delay = max(0.0, ev.created_at - turn.speech_end_at)
+
+    def on_function_tools_executed(self, ev) -> None:
+        turn = self._current
+        if turn is None:
+            return
+        turn.tools.extend(call.name for call in ev.function_calls)
+        if self._last_llm_end is not None:
+            turn.tool_seconds = (turn.tool_seconds or 0.0) + max(
+                0.0, ev.created_at - self._last_llm_end
+            )
+
+    def on_metrics_collected(self, ev) -> None:
+        turn = self._current
+        if turn is None:
+            return
+        m = ev.metrics
+        speech_id = getattr(m, "speech_id", None)
+        if speech_id and speech_id not in turn.speech_ids:
+            turn.speech_ids.append(speech_id)
+
+        if isinstance(m, metrics.EOUMetrics):
+            turn.end_of_utterance_delay = m.end_of_utterance_delay
+            turn.transcription_delay = m.transcription_delay
+            turn.on_user_turn_completed_delay = m.on_user_turn_completed_delay
+        elif isinstance(m, metrics.LLMMetrics):
+            if turn.llm_ttft is None:
+                turn.llm_ttft = m.ttft
+            turn.llm_calls += 1
+            turn.llm_seconds += m.duration
+            turn.prompt_tokens += m.prompt_tokens
+            turn.completion_tokens += m.completion_tokens
+            self._last_llm_end = m.timestamp + m.duration
+        elif isinstance(m, metrics.TTSMetrics):
+            if turn.tts_ttfb is None and m.ttfb >= 0:
+                turn.tts_ttfb = m.ttfb
+
+    def close(self) -> None:
+        """Finish the open turn, if any."""
+        self._finish()
+
+    def summary(self) -> dict:
+        """Latency percentiles over the turns traced so far."""
+        return latency_summary(asdict(r) for r in self.records).get(self.agent, {})
+
+    def export_jsonl(self, path: Path) -> int:
+        """Append every finished turn to a JSON-lines file.
+
+        Returns:
+            Number of records written
+        """
+        log = AppendOnlyLog(Path(path))
+        try:
+            for record in self.records:
+                log.append(asdict(record))
+        finally:
+            log.close()
+        return len(self.records)
+
+    def _finish(self) -> None:
+        if self._current is None:
+            return
+        record, self._current = self._current, None
+        self.records.append(record)
+        for callback in self._listeners:
+            try:
+                callback(record)
+            except Exception:
+                logger.exception("Turn listener failed")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already-sorted values."""
+    index = math.ceil(pct / 100 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, index))]
+
+
+def latency_summary(
+    records: Iterable[dict],
+    fields: tuple[str, ...] = LATENCY_FIELDS,
+) -> dict:
+    """p50/p95/p99 of each latency field, grouped by agent.
+
+    Args:
+        records: Turn records as dictionaries (e.g. read back from a JSONL export)
+        fields: Latency fields to summarize
+
+    Returns:
+        ``{agent: {"turns": n, field: {"p50": ..., "p95": ..., "p99": ...}}}``
+    """
+    grouped: dict[str, dict[str, list[float]]] = {}
+    counts: dict[str, int] = {}
+    for record in records:
+        agent = record.get("agent") or "unknown"
+        counts[agent] = counts.get(agent, 0) + 1
+        values = grouped.setdefault(agent, {f: [] for f in fields})
+        for f in fields:
+            if record.get(f) is not None:
+                values[f].append(record[f])
+
+    summary = {}
+    for agent, values in grouped.items():
+        summary[agent] = {"turns": counts[agent]}
+        for f, samples in values.items():
+            if samples:
+                samples.sort()
+                summary[agent][f] = {
+                    f"p{p}": round(percentile(samples, p), 3) for p in PERCENTILES
+                }
+    return summary
+
+
+def trace_turns(ctx: JobContext, session: AgentSession, agent: str) -> TurnTracer:
+    """Trace a job's session and report when the job ends.
+
+    The job's latency percentiles are logged at shutdown. If ``TURN_TRACE_FILE``
+    is set, the turn records are also appended there as JSON lines.
+    """
+    tracer = TurnTracer(agent=agent, room=ctx.room.name)
+    tracer.attach(session)
+
+    async def report_turns():
+        tracer.close()
+        if not tracer.records:
+            return
+        logger.info(f"Turn latency ({agent}, {len(tracer.records)} turns): {tracer.summary()}")
+        path = os.getenv(TRACE_FILE_ENV)
+        if path:
+            await asyncio.to_thread(tracer.export_jsonl, path)
+
+    ctx.add_shutdown_callback(report_turns)
+    return tracer
+
+
+if __name__ == "__main__":
+    # Summarize an exported trace: python src/turn_tracer.py turns.jsonl
+    trace_path = Path(sys.argv[1] if len(sys.argv) > 1 else os.getenv(TRACE_FILE_ENV, ""))
+    print(json.dumps(latency_summary(AppendOnlyLog(trace_path).read_all()), indent=2))
@@ -1,11 +1,24 @@
 """Wellness state management for health & wellness companion agent."""
 
-import json
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 from typing import Optional
 
+try:
+    from .wellness_storage import ShardedWellnessStore, migrate_legacy_log
+except ImportError:
+    from wellness_storage import ShardedWellnessStore, migrate_legacy_log
+
+# Single-file logs written before check-ins were partitioned per user
+LEGACY_LOG_FILES = ("wellness_log.json", "wellness_log.jsonl")
+
+# Look-back window kept in the context cache (matches get_previous_check_ins)
+CACHED_RECENT_DAYS = 7
+
 
 @dataclass
 class WellnessCheckIn:
@@ -16,6 +29,7 @@ class WellnessCheckIn:
     objectives: list[str] = field(default_factory=list)
     summary: Optional[str] = None
     session_id: Optional[str] = None
+    user_id: Optional[str] = None
 
     def is_complete(self) -> bool:
         """Check if all required fields are filled."""
@@ -41,121 +55,205 @@ class WellnessCheckIn:
         return asdict(self)
 
 
+@dataclass
+class CachedWellnessContext:
+    """Precomputed greeting context and recent history for one user."""
+    context: str
+    recent_entries: list[tuple[float, dict]]
+    computed_on: date
+    expires_at: float
+
+
+class WellnessContextCache:
+    """Bounded in-process LRU cache of per-user wellness context.
+    
+    Entries expire at midnight (the greeting says "earlier today" vs "last
+    time") and after ``ttl`` seconds, which bounds staleness from check-ins
+    saved by other worker processes.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of users to keep cached
+            ttl: Seconds before a cached entry is recomputed
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Optional[str], CachedWellnessContext] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Optional[str]) -> Optional[CachedWellnessContext]:
+        """Return a fresh cached entry for the user, counting the hit or miss."""
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if (
+                cached is None
+                or cached.computed_on != date.today()
+                or cached.expires_at < time.monotonic()
+            ):
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return cached
+
+    def put(
+        self,
+        user_id: Optional[str],
+        context: str,
+        recent_entries: list[tuple[float, dict]],
+    ) -> CachedWellnessContext:
+        """Store (or replace) the cached entry for a user and return it."""
+        cached = CachedWellnessContext(
+            context=context,
+            recent_entries=recent_entries,
+            computed_on=date.today(),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            self._entries[user_id] = cached
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return cached
+
+    def invalidate(self, user_id: Optional[str]) -> None:
+        """Drop the cached entry for a user."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
 class WellnessLog:
-    """Manages wellness log persistence to JSON file."""
+    """Manages wellness log persistence, partitioned per user."""
     
-    def __init__(self, log_file: str = "wellness_log.json"):
-        """Initialize wellness log with file path.
+    def __init__(
+        self,
+        log_dir: str = "wellness_logs",
+        store: Optional[ShardedWellnessStore] = None,
+        context_cache: Optional[WellnessContextCache] = None,
+    ):
+        """Initialize wellness log with its storage directory.
         
         Args:
-            log_file: Path to JSON file (relative to backend directory)
+            log_dir: Directory for per-user log shards (relative to backend directory)
+            store: Storage backend to use instead of the default sharded JSON-lines store
+            context_cache: Cache for per-user agent context (None disables caching)
         """
-        # Store log file path relative to backend directory
+        # Store log directory relative to backend directory
         backend_dir = Path(__file__).parent.parent
-        self.log_path = backend_dir / log_file
+        self.log_dir = backend_dir / log_dir
+        if store is None:
+            # Carry over entries from the old single-file formats
+            migrate_legacy_log(
+                [backend_dir / name for name in LEGACY_LOG_FILES], self.log_dir
+            )
+            store = ShardedWellnessStore(self.log_dir)
+        self.store = store
+        self.context_cache = context_cache
         
-    def load_log(self) -> list[dict]:
-        """Load all entries from the wellness log JSON file.
+    def load_log(self, user_id: Optional[str] = None) -> list[dict]:
+        """Load all of one user's entries from the wellness log.
+        
+        Args:
+            user_id: Participant identity (None for the anonymous partition)
         
         Returns:
-            List of check-in dictionaries, or empty list if file doesn't exist
+            List of check-in dictionaries, or empty list if there are none
         """
-        if not self.log_path.exists():
-            return []
-        
         try:
-            with open(self.log_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Ensure it's a list
-                if isinstance(data, list):
-                    return data
-                else:
-                    # If it's a single object, wrap it in a list
-                    return [data]
-        except (json.JSONDecodeError, IOError) as e:
-            # If file is corrupted, return empty list
+            return self.store.partition(user_id).load()
+        except OSError as e:
             print(f"Warning: Could not load wellness log: {e}")
             return []
     
     def save_check_in(self, check_in: WellnessCheckIn) -> None:
-        """Save a check-in to the wellness log JSON file.
+        """Append a check-in to its user's wellness log.
         
         Args:
             check_in: WellnessCheckIn object to save
         """
-        # Load existing entries
-        entries = self.load_log()
-        
-        # Add new entry
-        entries.append(check_in.to_dict())
-        
-        # Ensure directory exists
-        self.log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save to file
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            json.dump(entries, f, indent=2, ensure_ascii=False)
+        self.store.partition(check_in.user_id).append(check_in.to_dict())
+        if self.context_cache is not None:
+            # Write-through so the next greeting for this user is still a hit
+            self._refresh_cached_context(check_in.user_id)
     
-    def get_recent_entries(self, days: int = 7) -> list[dict]:
-        """Get recent entries from the last N days.
+    def get_recent_entries(self, days: int = 7, user_id: Optional[str] = None) -> list[dict]:
+        """Get one user's recent entries from the last N days.
         
         Args:
             days: Number of days to look back
+            user_id: Participant identity (None for the anonymous partition)
             
         Returns:
-            List of check-in dictionaries from the last N days
+            List of check-in dictionaries from the last N days, most recent first
         """
-        entries = self.load_log()
-        if not entries:
-            return []
-        
-        # Filter entries from the last N days
         cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-        recent = []
-        
-        for entry in entries:
-            try:
-                entry_date = datetime.fromisoformat(entry.get("date_time", ""))
-                if entry_date.timestamp() >= cutoff_date:
-                    recent.append(entry)
-            except (ValueError, TypeError):
-                # Skip entries with invalid dates
-                continue
-        
-        # Sort by date (most recent first)
-        recent.sort(key=lambda x: x.get("date_time", ""), reverse=True)
-        return recent
+        if self.context_cache is not None and days <= CACHED_RECENT_DAYS:
+            cached = self._cached_context(user_id)
+            return [entry for ts, entry in cached.recent_entries if ts >= cutoff_date]
+        return self.store.partition(user_id).entries_since(cutoff_date)
     
-    def get_last_entry(self) -> Optional[dict]:
-        """Get the most recent check-in entry.
+    def get_last_entry(self, user_id: Optional[str] = None) -> Optional[dict]:
+        """Get one user's most recent check-in entry.
+        
+        Args:
+            user_id: Participant identity (None for the anonymous partition)
         
         Returns:
             Most recent check-in dictionary, or None if no entries exist
         """
-        entries = self.load_log()
-        if not entries:
-            return None
-        
-        # Sort by date (most recent first) and return the first one
-        try:
-            sorted_entries = sorted(
-                entries,
-                key=lambda x: x.get("date_time", ""),
-                reverse=True
-            )
-            return sorted_entries[0] if sorted_entries else None
-        except (KeyError, TypeError):
-            # If sorting fails, just return the last entry in the list
-            return entries[-1] if entries else None
+        return self.store.partition(user_id).latest()
     
-    def format_context_for_agent(self) -> str:
-        """Format the last check-in as context for the agent.
+    def format_context_for_agent(self, user_id: Optional[str] = None) -> str:
+        """Format the user's last check-in as context for the agent.
         Returns a natural reference to previous check-ins that can be used in conversation.
         
+        Args:
+            user_id: Participant identity (None for the anonymous partition)
+        
         Returns:
             Formatted string describing the last check-in in a conversational way, or empty string if none
         """
-        last_entry = self.get_last_entry()
+        if self.context_cache is not None:
+            return self._cached_context(user_id).context
+        return self._format_context(self.get_last_entry(user_id))
+    
+    def _cached_context(self, user_id: Optional[str]) -> CachedWellnessContext:
+        cached = self.context_cache.get(user_id)
+        if cached is None:
+            cached = self._refresh_cached_context(user_id)
+        return cached
+    
+    def _refresh_cached_context(self, user_id: Optional[str]) -> CachedWellnessContext:
+        partition = self.store.partition(user_id)
+        cutoff_date = datetime.now().timestamp() - (CACHED_RECENT_DAYS * 24 * 60 * 60)
+        # The store's index already holds each entry's parsed timestamp
+        recent = partition.timed_entries_since(cutoff_date)
+        return self.context_cache.put(
+            user_id, self._format_context(partition.latest()), recent
+        )
+    
+    @staticmethod
+    def _format_context(last_entry: Optional[dict]) -> str:
         if not last_entry:
             return ""
         
@@ -0,0 +1,334 @@
+"""Storage backends for the wellness log."""
+
+import abc
+import bisect
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    from .append_log import AppendOnlyLog
+except ImportError:
+    from append_log import AppendOnlyLog
+
+logger = logging.getLogger("agent")
+
+# Partition for check-ins that don't carry a user identity (e.g. legacy entries)
+DEFAULT_USER = "anonymous"
+
+
+def entry_timestamp(entry: dict) -> Optional[float]:
+    """Parse a check-in's ``date_time`` into an epoch timestamp.
+
+    Args:
+        entry: Check-in dictionary
+
+    Returns:
+        Seconds since the epoch, or None if the date is missing or invalid
+    """
+    try:
+        return datetime.fromisoformat(entry.get("date_time", "")).timestamp()
+    except (ValueError, TypeError):
+        return None
+
+
+def _encode_record(entry: dict) -> dict:
+    # The epoch is parsed once at write time and persisted next to the entry
+    return {"ts": entry_timestamp(entry), "entry": entry}
+
+
+def _decode_record(record: dict) -> tuple[Optional[float], dict]:
+    if "entry" in record and "ts" in record:
+        return record["ts"], record["entry"]
+    # Bare entries written before timestamps were persisted
+    return entry_timestamp(record), record
+
+
+class TimeIndex:
+    """Check-ins kept sorted by timestamp for bisect-based lookups.
+
+    Entries usually arrive in time order, so inserts land at the end of the
+    list. Range and latest-entry queries never sort.
+    """
+
+    def __init__(self):
+        self._keys: list[float] = []
+        self._entries: list[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, timestamp: Optional[float], entry: dict) -> None:
+        """Insert an entry; entries without a valid timestamp aren't indexed."""
+        if timestamp is None:
+            return
+        pos = bisect.bisect_right(self._keys, timestamp)
+        self._keys.insert(pos, timestamp)
+        self._entries.insert(pos, entry)
+
+    def since(self, cutoff: float) -> list[dict]:
+        """Entries at or after ``cutoff``, most recent first."""
+        start = bisect.bisect_left(self._keys, cutoff)
+        return self._entries[start:][::-1]
+
+    def timed_since(self, cutoff: float) -> list[tuple[float, dict]]:
+        """``(timestamp, entry)`` pairs at or after ``cutoff``, most recent first."""
+        start = bisect.bisect_left(self._keys, cutoff)
+        return list(zip(self._keys[start:], self._entries[start:]))[::-1]
+
+    def latest(self) -> Optional[dict]:
+        """The most recent entry, or None if the index is empty."""
+        return self._entries[-1] if self._entries else None
+
+
+class WellnessStore(abc.ABC):
+    """Interface every wellness log backend implements."""
+
+    @abc.abstractmethod
+    def append(self, entry: dict) -> None:
+        """Persist one check-in dictionary."""
+
+    @abc.abstractmethod
+    def load(self) -> list[dict]:
+        """Return every stored check-in dictionary in write order."""
+
+    def entries_since(self, cutoff: float) -> list[dict]:
+        """Return check-ins dated at or after an epoch cutoff, most recent first."""
+        return [entry for _, entry in self.timed_entries_since(cutoff)]
+
+    def timed_entries_since(self, cutoff: float) -> list[tuple[float, dict]]:
+        """Like ``entries_since``, with each entry's epoch timestamp alongside it.
+
+        Backends should override this with an indexed lookup; the default
+        scans and sorts everything returned by ``load()``.
+        """
+        index = TimeIndex()
+        for entry in self.load():
+            index.add(entry_timestamp(entry), entry)
+        return index.timed_since(cutoff)
+
+    def latest(self) -> Optional[dict]:
+        """Return the most recent check-in, or None if there are none."""
+        recent = self.entries_since(float("-inf"))
+        return recent[0] if recent else None
+
+    def flush(self) -> None:  # noqa: B027 - optional hook, stores that write synchronously have nothing to do
+        """Make all appended entries durable."""
+
+    def close(self) -> None:
+        """Flush and release any open resources."""
+        self.flush()
+
+
+class JsonLinesWellnessStore(WellnessStore):
+    """Wellness store backed by an append-only JSON-lines file.
+
+    Saving a check-in appends one line instead of rewriting the whole history,
+    and concurrent jobs appending to the same file can't lose each other's
+    entries. Each line carries the entry's epoch timestamp, so the in-memory
+    ``TimeIndex`` is built without re-parsing dates. The index is loaded once
+    and then only catches up on lines other writers appended since.
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 1):
+        """Initialize the store.
+
+        Args:
+            path: Location of the JSON-lines file
+            fsync_every: Number of appends between fsyncs
+        """
+        self.path = Path(path)
+        self._log = AppendOnlyLog(self.path, fsync_every=fsync_every)
+        self._entries: list[dict] = []
+        self._index = TimeIndex()
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, entry: dict) -> None:
+        with self._lock:
+            # Catch up first so our own line is read back exactly once
+            self._refresh_locked()
+            self._log.append(_encode_record(entry))
+            self._refresh_locked()
+
+    def load(self) -> list[dict]:
+        with self._lock:
+            self._refresh_locked()
+            return list(self._entries)
+
+    def entries_since(self, cutoff: float) -> list[dict]:
+        with self._lock:
+            self._refresh_locked()
+            return self._index.since(cutoff)
+
+    def timed_entries_since(self, cutoff: float) -> list[tuple[float, dict]]:
+        with self._lock:
+            self._refresh_locked()
+            return self._index.timed_since(cutoff)
+
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            self._refresh_locked()
+            return self._index.latest()
+
+    def flush(self) -> None:
+        self._log.flush()
+
+    def close(self) -> None:
+        self._log.close()
+
+    def _refresh_locked(self) -> None:
+        if self._log.size() == self._offset:
+            return
+        records, self._offset = self._log.read_from(self._offset)
+        for record in records:
+            timestamp, entry = _decode_record(record)
+            self._entries.append(entry)
+            self._index.add(timestamp, entry)
+
+
+class ShardedWellnessStore:
+    """Wellness log partitioned into one store per user.
+
+    Each user's check-ins live in their own JSON-lines file, so looking up a
+    returning caller only reads that caller's history. Files are spread over
+    256 shard directories keyed by a hash of the user id to keep directories
+    small with many thousands of users. Only the most recently used
+    partitions stay open (with their in-memory indexes); the rest are closed
+    and reloaded on demand.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        store_factory: Callable[[Path], WellnessStore] = JsonLinesWellnessStore,
+        max_open_partitions: int = 256,
+    ):
+        """Initialize the sharded store.
+
+        Args:
+            root: Directory holding the shard directories
+            store_factory: Builds the backend for one partition from its file path
+            max_open_partitions: Number of partitions to keep open at once
+        """
+        self.root = Path(root)
+        self.store_factory = store_factory
+        self.max_open_partitions = max(1, max_open_partitions)
+        self._open: OrderedDict[str, WellnessStore] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def partition_path(self, user_id: Optional[str]) -> Path:
+        """Path of the file holding one user's check-ins."""
+        key = hashlib.sha1((user_id or DEFAULT_USER).encode("utf-8")).hexdigest()
+        return self.root / key[:2] / f"{key}.jsonl"
+
+    def partition(self, user_id: Optional[str]) -> WellnessStore:
+        """Return the store for one user's check-ins.
+
+        Args:
+            user_id: Participant identity (None maps to the default partition)
+        """
+        key = user_id or DEFAULT_USER
+        with self._lock:
+            store = self._open.get(key)
+            if store is not None:
+                self._open.move_to_end(key)
+                return store
+            store = self.store_factory(self.partition_path(key))
+            self._open[key] = store
+            while len(self._open) > self.max_open_partitions:
+                _, evicted = self._open.popitem(last=False)
+                evicted.close()
+            return store
+
+    def flush(self) -> None:
+        """Flush every open partition."""
+        with self._lock:
+            for store in self._open.values():
+                store.flush()
+
+    def close(self) -> None:
+        """Close every open partition."""
+        with self._lock:
+            for store in self._open.values():
+                store.close()
+            self._open.clear()
+
+
+def _read_legacy_entries(path: Path) -> list[dict]:
+    if path.suffix == ".jsonl":
+        return [_decode_record(r)[1] for r in AppendOnlyLog(path).read_all()]
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def migrate_legacy_log(legacy_paths: list[Path], root: Path) -> int:
+    """One-time migration of single-file wellness logs into per-user shards.
+
+    Accepts both the original JSON array file and the single JSON-lines file.
+    Entries are routed by their ``user_id``. Legacy entries have none and go
+    to the default partition, which no caller identity reads; their count is
+    logged. The legacy files are left untouched as backups. Shards are built
+    in a staging directory of this process that is atomically renamed into
+    place, and migration is skipped once ``root`` exists, so it's safe to
+    call on every startup, from several processes at once.
+
+    Args:
+        legacy_paths: Old log files to import, in order
+        root: Directory of the sharded store to create
+
+    Returns:
+        Number of entries migrated (0 if nothing was done)
+    """
+    root = Path(root)
+    if root.exists():
+        return 0
+
+    entries = []
+    for path in map(Path, legacy_paths):
+        if not path.exists():
+            continue
+        try:
+            entries.extend(_read_legacy_entries(path))
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Could not migrate legacy wellness log {path}: {e}")
+    if not entries:
+        return 0
+
+    root.parent.mkdir(parents=True, exist_ok=True)
+    staging_root = Path(tempfile.mkdtemp(prefix=f"{root.name}.", suffix=".tmp", dir=root.parent))
+    try:
+        staging = ShardedWellnessStore(
+            staging_root,
+            store_factory=lambda p: JsonLinesWellnessStore(p, fsync_every=1024),
+        )
+        for entry in entries:
+            staging.partition(entry.get("user_id")).append(entry)
+        staging.close()
+        try:
+            os.replace(staging_root, root)
+        except OSError:
+            if not root.exists():
+                raise
+            # Another process migrated first
+            return 0
+    finally:
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    anonymous = sum(1 for entry in entries if not entry.get("user_id"))
+    if anonymous:
+        logger.warning(
+            f"{anonymous} legacy wellness entries have no user_id; they are kept in "
+            f"the '{DEFAULT_USER}' partition of {root}, which callers' sessions don't read"
+        )
+    logger.info(f"Migrated {len(entries)} wellness entries into {root}")
+    return len(entries)
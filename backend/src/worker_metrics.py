@@ -0,0 +1,231 @@
+"""Prometheus metrics for the agent worker, served on the worker's /metrics endpoint."""
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+
+# No livekit or prometheus_client imports at module level: agent.py imports this
+# module before configure_multiprocess() has run
+
+logger = logging.getLogger("agent")
+
+METRICS_PORT_ENV = "AGENT_METRICS_PORT"
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+TOOL_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+# TurnRecord fields exported as turn_latency_seconds{stage=...}
+LATENCY_STAGES = {
+    "first_audio": "first_audio_delay",
+    "end_of_utterance": "end_of_utterance_delay",
+    "stt_final": "stt_final_delay",
+    "llm_ttft": "llm_ttft",
+    "tools": "tool_seconds",
+    "tts_ttfb": "tts_ttfb",
+}
+
+_metrics: Optional["_AgentMetrics"] = None
+
+
+def metrics_port() -> Optional[int]:
+    """Port for the worker's /metrics endpoint, from AGENT_METRICS_PORT (unset = disabled)."""
+    port = os.getenv(METRICS_PORT_ENV)
+    return int(port) if port else None
+
+
+def configure_multiprocess() -> None:
+    """Let the worker's /metrics endpoint report what job processes record.
+
+    Each job runs in its own process, so metrics are kept in prometheus_client's
+    multiprocess files and the worker aggregates them on every scrape. This
+    has to run before prometheus_client is first imported (livekit.agents
+    imports it), so agent.py's main() calls it before importing livekit. The
+    worker starts from an empty directory; job processes inherit it.
+    """
+    if metrics_port() is None:
+        return
+    path = os.getenv(MULTIPROC_DIR_ENV)
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+    else:
+        path = tempfile.mkdtemp(prefix="agent-metrics-")
+        os.environ[MULTIPROC_DIR_ENV] = path
+    logger.info(f"Serving agent metrics on :{metrics_port()}/metrics")
+
+
+class _AgentMetrics:
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+
+        self.sessions_active = Gauge(
+            "voice_agent_sessions_active",
+            "Voice sessions currently running",
+            ["agent"],
+            multiprocess_mode="livesum",
+        )
+        self.sessions = Counter("voice_agent_sessions_total", "Voice sessions started", ["agent"])
+        self.turns = Counter("voice_agent_turns_total", "User turns answered", ["agent"])
+        self.tool_calls = Counter(
+            "voice_agent_tool_calls_total",
+            "Function tool calls",
+            ["agent", "tool", "status"],
+        )
+        self.tool_duration = Histogram(
+            "voice_agent_tool_duration_seconds",
+            "Function tool execution time",
+            ["agent", "tool"],
+            buckets=TOOL_BUCKETS,
+        )
+        self.tool_blocking = Histogram(
+            "voice_agent_tool_blocking_seconds",
+            "Time a function tool held the event loop",
+            ["agent", "tool"],
+            buckets=TOOL_BUCKETS,
+        )
+        self.llm_tokens = Counter(
+            "voice_agent_llm_tokens_total", "LLM tokens", ["agent", "kind"]
+        )
+        self.tts_characters = Counter(
+            "voice_agent_tts_characters_total", "Characters sent to TTS", ["agent"]
+        )
+        self.stt_audio = Counter(
+            "voice_agent_stt_audio_seconds_total", "Audio seconds sent to STT", ["agent"]
+        )
+        self.errors = Counter(
+            "voice_agent_errors_total", "Session errors by provider", ["agent", "provider"]
+        )
+        self.llm_cache = Counter(
+            "voice_agent_llm_cache_total", "LLM response cache lookups", ["agent", "result"]
+        )
+        self.tts_cache = Counter(
+            "voice_agent_tts_cache_total", "TTS audio cache lookups, per known sentence", ["agent", "result"]
+        )
+        self.loop_lag = Histogram(
+            "voice_agent_loop_lag_seconds",
+            "How late the event loop ran a periodic heartbeat",
+            ["agent"],
+            buckets=LOOP_LAG_BUCKETS,
+        )
+        self.loop_stalls = Counter(
+            "voice_agent_loop_stalls_total",
+            "Event loop stalls over the lag budget, by the handler or tool holding the loop",
+            ["agent", "culprit"],
+        )
+        self.loop_stall_duration = Histogram(
+            "voice_agent_loop_stall_seconds",
+            "Duration of event loop stalls over the lag budget",
+            ["agent", "culprit"],
+            buckets=LOOP_LAG_BUCKETS,
+        )
+        self.turn_latency = Histogram(
+            "voice_agent_turn_latency_seconds",
+            "Turn latency from end of user speech, by stage",
+            ["agent", "stage"],
+            buckets=LATENCY_BUCKETS,
+        )
+
+
+def get_metrics() -> _AgentMetrics:
+    """Metric families, created on first use in the current process."""
+    global _metrics
+    if _metrics is None:
+        _metrics = _AgentMetrics()
+    return _metrics
+
+
+def error_provider(ev: Any) -> str:
+    """Which provider a session error came from: "stt", "llm", "tts" or "other".
+
+    Uses the same signals as the agents' error logging: the error's type and
+    the source that raised it (e.g. a Murf TTS).
+    """
+    error_type = str(getattr(getattr(ev, "error", None), "type", "")).lower()
+    source = str(getattr(ev, "source", "")).lower()
+    if "tts" in error_type or "murf" in source:
+        return "tts"
+    if "stt" in error_type or "deepgram" in source:
+        return "stt"
+    if "llm" in error_type or "google" in source:
+        return "llm"
+    return "other"
+
+
+class SessionMetrics:
+    """Feeds one session's events into the process's metric families."""
+
+    def __init__(self, agent: str):
+        """Initialize the recorder.
+
+        Args:
+            agent: Agent name used as the ``agent`` label (e.g. "barista")
+        """
+        self.agent = agent
+        self.metrics = get_metrics()
+
+    def attach(self, session: Any, tracer: Any = None) -> None:
+        """Subscribe to the session, and to the turn tracer's finished turns if given."""
+        session.on("metrics_collected", self.on_metrics_collected)
+        session.on("function_tools_executed", self.on_function_tools_executed)
+        session.on("error", self.on_error)
+        if tracer is not None:
+            tracer.add_listener(self.on_turn)
+
+    def session_started(self) -> None:
+        self.metrics.sessions.labels(self.agent).inc()
+        self.metrics.sessions_active.labels(self.agent).inc()
+
+    async def session_ended(self) -> None:
+        # Async: it's registered as a job shutdown callback, which is awaited
+        self.metrics.sessions_active.labels(self.agent).dec()
+
+    def on_metrics_collected(self, ev: Any) -> None:
+        m = ev.metrics
+        if m.type == "llm_metrics":
+            self.metrics.llm_tokens.labels(self.agent, "prompt").inc(m.prompt_tokens)
+            self.metrics.llm_tokens.labels(self.agent, "completion").inc(m.completion_tokens)
+            self.metrics.llm_tokens.labels(self.agent, "cached").inc(m.prompt_cached_tokens)
+        elif m.type == "tts_metrics":
+            self.metrics.tts_characters.labels(self.agent).inc(m.characters_count)
+        elif m.type == "stt_metrics":
+            self.metrics.stt_audio.labels(self.agent).inc(m.audio_duration)
+
+    def on_function_tools_executed(self, ev: Any) -> None:
+        for call, output in zip(ev.function_calls, ev.function_call_outputs):
+            status = "error" if output is None or output.is_error else "ok"
+            self.metrics.tool_calls.labels(self.agent, call.name, status).inc()
+            if output is not None:
+                self.metrics.tool_duration.labels(self.agent, call.name).observe(
+                    max(0.0, output.created_at - call.created_at)
+                )
+
+    def on_error(self, ev: Any) -> None:
+        self.metrics.errors.labels(self.agent, error_provider(ev)).inc()
+
+    def on_turn(self, record: Any) -> None:
+        if record.first_audio_delay is None:
+            return
+        self.metrics.turns.labels(self.agent).inc()
+        for stage, field_name in LATENCY_STAGES.items():
+            value = getattr(record, field_name)
+            if value is not None:
+                self.metrics.turn_latency.labels(self.agent, stage).observe(value)
+
+
+def observe_session(ctx: Any, session: Any, agent: str, tracer: Any = None) -> SessionMetrics:
+    """Record a job's session in the worker metrics until the job ends.
+
+    Args:
+        ctx: Job context (used to register the shutdown callback)
+        session: AgentSession to observe
+        agent: Agent name for the ``agent`` label
+        tracer: TurnTracer whose finished turns feed the latency histograms
+    """
+    recorder = SessionMetrics(agent)
+    recorder.attach(session, tracer)
+    recorder.session_started()
+    ctx.add_shutdown_callback(recorder.session_ended)
+    return recorder
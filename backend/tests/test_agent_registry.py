@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import pytest
+
+import agent_registry
+
+
+def _ctx(job_metadata: str = "", room_metadata: str = "") -> SimpleNamespace:
+    job = SimpleNamespace(metadata=job_metadata, room=SimpleNamespace(metadata=room_metadata))
+    return SimpleNamespace(job=job)
+
+
+def test_resolves_names_and_day_aliases() -> None:
+    assert agent_registry.resolve_app("2").name == "barista"
+    assert agent_registry.resolve_app(" Day3 ").name == "wellness"
+    assert agent_registry.resolve_app("tutor").module == "agent_day4"
+    with pytest.raises(KeyError):
+        agent_registry.resolve_app("sommelier")
+
+
+def test_selected_apps_prefers_agent_apps_over_agent_day(monkeypatch) -> None:
+    monkeypatch.setenv("AGENT_DAY", "3")
+    monkeypatch.delenv("AGENT_APPS", raising=False)
+    assert [a.name for a in agent_registry.selected_apps()] == ["wellness"]
+
+    monkeypatch.setenv("AGENT_APPS", "tutor, 2, bogus, barista")
+    assert [a.name for a in agent_registry.selected_apps()] == ["tutor", "barista"]
+
+
+def test_requested_app_reads_job_then_room_metadata() -> None:
+    assert agent_registry.requested_app_name(_ctx('{"agent": "wellness"}')) == "wellness"
+    assert agent_registry.requested_app_name(_ctx("", "tutor")) == "tutor"
+    assert agent_registry.requested_app_name(_ctx("", "4")) == "4"
+    assert agent_registry.requested_app_name(_ctx()) is None
@@ -0,0 +1,25 @@
+from benchmark import SCENARIOS, ProviderConfig, compare, run_benchmarks
+
+FAST = ProviderConfig(
+    stt_latency=0.0,
+    llm_ttft=0.0,
+    llm_chunk_interval=0.0,
+    tts_ttfb=0.0,
+)
+
+
+async def test_barista_scenario_runs_offline_and_reports():
+    report = await run_benchmarks(["barista"], FAST, sessions=1, seconds_per_turn=5.0)
+
+    barista = report["agents"]["barista"]
+    assert barista["errors"] == 0
+    assert barista["turns"] == len(SCENARIOS["barista"].turns)
+    assert barista["tools"]["complete_order"]["calls"] == 1
+    assert set(barista["turn_latency_ms"]) == {"total", "stt", "agent", "tts_first_audio"}
+    assert barista["cpu_ms_per_session"] > 0
+
+    slower = {"agents": {"barista": {**barista, "cpu_ms_per_session": barista["cpu_ms_per_session"] * 2}}}
+    assert compare(slower, report, max_regression=0.2) == [
+        f"barista: cpu per session {barista['cpu_ms_per_session']} -> "
+        f"{barista['cpu_ms_per_session'] * 2} ms"
+    ]
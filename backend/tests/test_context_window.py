@@ -0,0 +1,62 @@
+import asyncio
+
+from livekit.agents import llm
+
+from context_window import ContextWindow
+from stub_providers import StubLLM, StubReply
+
+
+def _conversation(turns: int) -> llm.ChatContext:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="You are a barista.")
+    for i in range(turns):
+        chat_ctx.add_message(role="user", content=f"question {i}")
+        if i == 0:
+            chat_ctx.insert(
+                [
+                    llm.FunctionCall(call_id="c0", name="update_size", arguments='{"size":"large"}'),
+                    llm.FunctionCallOutput(call_id="c0", name="update_size", output="ok", is_error=False),
+                ]
+            )
+        chat_ctx.add_message(role="assistant", content=f"answer {i}")
+    return chat_ctx
+
+
+def _texts(chat_ctx: llm.ChatContext) -> list[str]:
+    return [item.text_content for item in chat_ctx.items if item.type == "message"]
+
+
+async def test_old_turns_are_summarized_in_the_background():
+    prompts = []
+
+    def summarize(chat_ctx):
+        prompts.append(chat_ctx.items[-1].text_content)
+        return StubReply(text="The customer wants a large drink.")
+
+    order = {"size": "large"}
+    window = ContextWindow(
+        "test", StubLLM(summarize, ttft=0.0), keep_turns=2, state=lambda: order
+    )
+    chat_ctx = _conversation(5)
+
+    # The summary isn't ready yet: nothing is dropped, the state is sent
+    first = window.apply(chat_ctx)
+    assert len(first.items) == len(chat_ctx.items) + 1
+    assert _texts(first)[1] == 'CURRENT STATE (from your tools; trust it over the conversation):\n{"size":"large"}'
+
+    for _ in range(50):
+        if window.summaries:
+            break
+        await asyncio.sleep(0.01)
+    assert window.summaries == 1
+    assert "(agent called update_size" in prompts[0]
+    assert "question 2" in prompts[0] and "question 3" not in prompts[0]
+
+    # Now the first three turns are replaced by the summary
+    second = window.apply(chat_ctx)
+    texts = _texts(second)
+    assert texts[0] == "You are a barista."
+    assert texts[1].endswith("The customer wants a large drink.")
+    assert texts[3:] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert not any(item.type == "function_call" for item in second.items)
+    await window.aclose()
@@ -0,0 +1,39 @@
+import logging
+
+from instructions import IMPLICIT_CACHE_MIN_TOKENS, InstructionBuilder, compact
+
+STATIC = """You are a barista.
+        Greet the caller, using the CALLER CONTEXT below.
+        """
+
+
+def test_per_caller_context_follows_a_shared_static_prefix():
+    first = InstructionBuilder("test", STATIC).add("Caller context", "First visit.")
+    returning = InstructionBuilder("test", STATIC).add("Caller context", "Had a latte yesterday.")
+
+    prefix = "You are a barista.\nGreet the caller, using the CALLER CONTEXT below."
+    assert first.build() == f"{prefix}\n\nCALLER CONTEXT:\nFirst visit."
+    assert returning.build().startswith(prefix + "\n\n")
+    assert InstructionBuilder("test", STATIC).add("Caller context", "").build() == prefix
+
+    counts = returning.token_counts()
+    assert counts["static"] == round(len(prefix) / 4)
+    assert counts["total"] == counts["static"] + counts["caller context"]
+
+
+def test_compact_strips_source_indentation():
+    assert compact("Rules:\n        1. Be brief.   \n\n        2. Be kind.\n") == (
+        "Rules:\n1. Be brief.\n\n2. Be kind."
+    )
+
+
+def test_prefixes_too_short_for_implicit_caching_are_reported(caplog):
+    with caplog.at_level(logging.INFO, logger="agent"):
+        InstructionBuilder("short", STATIC).build()
+        InstructionBuilder("long", "Be brief. " * IMPLICIT_CACHE_MIN_TOKENS).build()
+
+    below = [r.getMessage() for r in caplog.records if "minimum" in r.getMessage()]
+    assert below == [
+        f"Instructions (short): static prefix is below the {IMPLICIT_CACHE_MIN_TOKENS}-token "
+        "minimum for implicit prompt caching"
+    ]
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import agent_day2
+import agent_day4
+from persistence import AsyncPersistence
+
+
+def _proc(**userdata) -> SimpleNamespace:
+    return SimpleNamespace(userdata=dict(userdata))
+
+
+def test_barista_jobs_get_their_own_order(tmp_path) -> None:
+    ledger = agent_day2.OrderLedger(ledger_dir=str(tmp_path))
+    proc = _proc(order_ledger=ledger, order_queue=agent_day2.build_default_order_queue())
+
+    first = agent_day2.new_userdata(proc, AsyncPersistence())
+    second = agent_day2.new_userdata(proc, AsyncPersistence())
+    first.order.drinkType = "latte"
+    first.order.extras.append("caramel")
+
+    assert second.order.drinkType is None
+    assert second.order.extras == []
+    assert first.ledger is second.ledger
+    assert first.order_queue is second.order_queue
+
+
+def test_tutor_jobs_share_content_but_not_mastery() -> None:
+    proc = _proc(tutor_content=agent_day4.TutorContentLibrary.from_env())
+
+    first = agent_day4.new_userdata(proc)
+    second = agent_day4.new_userdata(proc)
+    first.state.ensure_mastery("loops").times_quizzed += 1
+
+    assert second.state.mastery == {}
+    assert first.content is second.content
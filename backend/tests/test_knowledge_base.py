@@ -0,0 +1,39 @@
+import json
+
+from knowledge_base import KnowledgeBase, documents_from_json, search_tool
+
+FAQ = [
+    {"id": "pricing", "question": "How much does the starter plan cost?",
+     "answer": "The starter plan costs 999 rupees per month for up to five users."},
+    {"id": "trial", "question": "Is there a free trial?",
+     "answer": "Every plan comes with a 14 day free trial, no card required."},
+    {"id": "support", "question": "What support do you offer?",
+     "answer": "Email support on all plans, phone support on the business plan."},
+]
+
+
+async def test_faq_search_ranks_by_keywords_and_falls_back_to_vectors(tmp_path):
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps(FAQ))
+    kb = KnowledgeBase.from_files([path])
+
+    assert kb.search("how much is the starter plan")[0][0].id == "pricing"
+    assert kb.lookup("free trial")[0].title == "Is there a free trial?"
+    # No keyword matches a misheard word, the vectors still do
+    assert kb.search("suport") == []
+    assert kb.lookup("suport")[0].id == "support"
+
+    search = search_tool(kb, "search_faq")
+    assert "14 day free trial" in await search(query="trial")
+    assert (await search(query="xylophone")).startswith("Nothing in the content")
+
+
+def test_object_files_index_each_list_entry(tmp_path):
+    path = tmp_path / "menu.json"
+    path.write_text(
+        json.dumps(
+            {"currency": "rupees", "milks": [{"name": "oat milk", "price": 40, "aliases": ["oat"]}]}
+        )
+    )
+    documents = documents_from_json(path)
+    assert [(d.id, d.text, d.source) for d in documents] == [("oat milk", "price 40 oat", "menu")]
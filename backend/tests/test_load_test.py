@@ -0,0 +1,45 @@
+from benchmark import ProviderConfig
+from load_test import find_knee, run_ramp
+
+FAST = ProviderConfig(
+    stt_latency=0.0,
+    llm_ttft=0.01,
+    llm_chunk_interval=0.0,
+    tts_ttfb=0.01,
+)
+
+
+def _stage(rooms: int, p95: float, lag_p99: float) -> dict:
+    return {
+        "rooms": rooms,
+        "turn_latency_ms": {"total": {"p95": p95}},
+        "loop_lag_ms": {"p99": lag_p99},
+    }
+
+
+def test_knee_is_last_stage_before_degradation():
+    stages = [_stage(1, 100, 1), _stage(4, 120, 5), _stage(16, 300, 8), _stage(32, 900, 40)]
+    assert find_knee(stages, latency_factor=1.5, lag_budget_ms=20) == {
+        "rooms": 4,
+        "limited_by": "turn latency",
+    }
+    assert find_knee(stages[:2], latency_factor=1.5, lag_budget_ms=2) == {
+        "rooms": 1,
+        "limited_by": "loop lag",
+    }
+    assert find_knee(stages[:2], latency_factor=1.5, lag_budget_ms=20)["limited_by"] is None
+
+
+async def test_ramp_runs_rooms_concurrently():
+    report = await run_ramp(
+        ["starter"], FAST, ramp=[1, 3], stage_seconds=1.0, think_time=0.05, warmup=0.2
+    )
+
+    assert [stage["rooms"] for stage in report["stages"]] == [1, 3]
+    for stage in report["stages"]:
+        assert stage["errors"] == 0
+        assert stage["turns"] > 0
+        assert stage["loop_lag_ms"]["p99"] >= 0
+        assert stage["rss_mb"] > 0
+    assert report["stages"][1]["turns"] > report["stages"][0]["turns"]
+    assert report["knee"]["rooms"] in (1, 3)
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+from loop_watchdog import LoopWatchdog
+from worker_metrics import get_metrics
+
+
+def _chatty_handler() -> None:
+    time.sleep(0.08)  # e.g. synchronous logging or file I/O in an event handler
+
+
+async def test_stall_is_attributed_to_blocking_handler():
+    watchdog = LoopWatchdog("test", budget_ms=20)
+    stalls = []
+    watchdog.add_listener(stalls.append)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        asyncio.get_running_loop().call_soon(_chatty_handler)
+        await asyncio.sleep(0.1)
+        await asyncio.sleep(0.05)  # fine: no stall
+    finally:
+        await watchdog.aclose()
+
+    assert len(stalls) == 1
+    stall = stalls[0]
+    assert stall.culprit == "test_loop_watchdog._chatty_handler"
+    assert stall.duration >= 0.06
+    assert stall.samples >= 2
+    assert "_chatty_handler" in stall.stack[-1]
+    stall_count = get_metrics().loop_stalls.labels("test", stall.culprit)._value.get()
+    assert stall_count == 1
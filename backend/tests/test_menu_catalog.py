@@ -0,0 +1,39 @@
+import pytest
+
+from menu_catalog import MenuCatalog, MenuItem
+from order_state import CoffeeOrder
+
+
+def test_aliases_and_close_spellings_resolve_to_menu_items():
+    menu = MenuCatalog.from_env()
+
+    assert menu.lookup("sizes", "Tall").name == "small"
+    assert menu.lookup("sizes", "venti").name == "large"
+    assert menu.lookup("milks", "oaty").name == "oat milk"
+    assert menu.lookup("drinks", "Cappucino!").name == "cappuccino"
+    assert menu.lookup("drinks", "pumpkin spice") is None
+
+    # Longest phrase wins in the trie
+    words = ["a", "hot", "chocolate", "with", "whip"]
+    assert menu.match(words, 1) == (2, menu.lookup("drinks", "hot chocolate"))
+    assert menu.match(words, 0) == (0, None)
+    # Generic words are tool values only, not transcript phrases
+    assert menu.match(words, 4) == (0, None)
+    assert menu.lookup("extras", "whip").name == "whipped cream"
+
+
+def test_order_total_is_priced_locally():
+    menu = MenuCatalog(
+        [
+            MenuItem("drinks", "latte", 180),
+            MenuItem("sizes", "large", 60),
+            MenuItem("milks", "oat milk", 40, ("oat",)),
+            MenuItem("extras", "caramel", 30),
+        ]
+    )
+    order = CoffeeOrder(drinkType="latte", size="large", milk="oat", extras=["caramel"], name="Sam")
+    assert menu.total(order) == 310
+    assert menu.price_text(310) == "310 rupees"
+
+    with pytest.raises(ValueError):
+        MenuCatalog([MenuItem("sizes", "small", 0, ("tall",)), MenuItem("sizes", "medium", 30, ("tall",))])
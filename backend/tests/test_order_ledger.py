@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from order_ledger import OrderLedger
+from order_state import CoffeeOrder
+
+
+def _order(name: str, drink: str = "latte") -> dict:
+    return CoffeeOrder(
+        drinkType=drink, size="large", milk="oat milk", name=name
+    ).to_dict()
+
+
+def test_orders_share_one_segment_per_day(tmp_path) -> None:
+    ledger = OrderLedger(ledger_dir=str(tmp_path))
+    placed_at = datetime(2025, 11, 24, 12, 0, 0)
+    for name in ("Sam", "Sam", "Priya"):
+        ledger.append(ledger.new_record(_order(name), placed_at=placed_at))
+    ledger.close()
+
+    assert [p.name for p in tmp_path.iterdir()] == ["ledger-20251124.jsonl"]
+    assert len(ledger.query()) == 3
+
+
+def test_same_name_same_second_gets_unique_ids(tmp_path) -> None:
+    ledger = OrderLedger(ledger_dir=str(tmp_path))
+    placed_at = datetime(2025, 11, 24, 12, 0, 0)
+    first = ledger.new_record(_order("Sam"), placed_at=placed_at)
+    second = ledger.new_record(_order("Sam"), placed_at=placed_at)
+    ledger.append(first)
+    ledger.append(second)
+
+    assert first["order_id"] != second["order_id"]
+    assert ledger.get(second["order_id"])["name"] == "Sam"
+    assert ledger.get("not-an-id") is None
+
+
+def test_query_filters_by_customer_drink_and_time(tmp_path) -> None:
+    ledger = OrderLedger(ledger_dir=str(tmp_path))
+    day = datetime(2025, 11, 24, 9, 0, 0)
+    ledger.append(ledger.new_record(_order("Sam", "latte"), placed_at=day))
+    ledger.append(ledger.new_record(_order("sam", "mocha"), placed_at=day + timedelta(hours=3)))
+    ledger.append(ledger.new_record(_order("Priya", "latte"), placed_at=day + timedelta(days=1)))
+
+    assert len(ledger.query(customer="SAM")) == 2
+    assert [r["name"] for r in ledger.query(drink_type="latte")] == ["Sam", "Priya"]
+    afternoon = ledger.query(since=day + timedelta(hours=1), until=day + timedelta(days=2))
+    assert [r["drinkType"] for r in afternoon] == ["mocha", "latte"]
+    assert ledger.query(customer="Sam", since=day + timedelta(days=1)) == []
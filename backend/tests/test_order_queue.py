@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from order_queue import OrderAnalytics, OrderConsumer, OrderQueue, TicketPrinter
+
+
+def _record(order_id: str, drink: str = "latte") -> dict:
+    return {
+        "order_id": order_id,
+        "drinkType": drink,
+        "size": "large",
+        "milk": "oat milk",
+        "extras": ["Caramel"],
+        "name": "Sam",
+    }
+
+
+class FlakyConsumer(OrderConsumer):
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def handle(self, record: dict) -> None:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("printer jammed")
+
+
+class SlowConsumer(OrderConsumer):
+    name = "slow"
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.handled = []
+
+    async def handle(self, record: dict) -> None:
+        await self.release.wait()
+        self.handled.append(record["order_id"])
+
+
+@pytest.mark.asyncio
+async def test_every_subscriber_gets_every_order() -> None:
+    queue = OrderQueue()
+    analytics = OrderAnalytics()
+    queue.subscribe(analytics)
+    queue.subscribe(TicketPrinter())
+
+    for i in range(5):
+        await queue.publish(_record(f"o{i}", "mocha" if i % 2 else "latte"))
+    await queue.aclose()
+
+    assert analytics.orders == 5
+    assert analytics.summary()["top_drinks"][0] == ("latte", 3)
+    assert queue.stats()["consumers"]["ticket_printer"]["delivered"] == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_then_dead_lettered() -> None:
+    queue = OrderQueue(max_attempts=3, retry_delay=0)
+    recovers = FlakyConsumer(failures=2)
+    queue.subscribe(recovers)
+    await queue.publish(_record("o1"))
+    await queue.aclose()
+    assert queue.stats()["consumers"]["flaky"] == {
+        "delivered": 1,
+        "retries": 2,
+        "dead_letters": 0,
+        "backlog": 0,
+    }
+
+    queue = OrderQueue(max_attempts=2, retry_delay=0)
+    queue.subscribe(FlakyConsumer(failures=5))
+    await queue.publish(_record("o2"))
+    await queue.aclose()
+    assert queue.stats()["consumers"]["flaky"]["dead_letters"] == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_slow_consumers() -> None:
+    queue = OrderQueue(maxsize=50)
+    slow = SlowConsumer()
+    queue.subscribe(slow, maxsize=2)
+
+    for i in range(20):
+        await asyncio.wait_for(queue.publish(_record(f"o{i}")), timeout=0.1)
+    assert slow.handled == []
+
+    slow.release.set()
+    await queue.aclose()
+    assert slow.handled == [f"o{i}" for i in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_analytics_ignores_redelivered_orders() -> None:
+    analytics = OrderAnalytics()
+    await analytics.handle(_record("o1"))
+    await analytics.handle(_record("o1"))
+    assert analytics.orders == 1
+
+
+def test_queue_restarts_on_a_new_event_loop() -> None:
+    queue = OrderQueue()
+    analytics = OrderAnalytics()
+    queue.subscribe(analytics)
+
+    async def publish_and_close(order_id: str) -> None:
+        await queue.publish(_record(order_id))
+        await queue.aclose()
+
+    asyncio.run(queue.publish(_record("lost")))
+    asyncio.run(publish_and_close("o1"))
+    assert analytics.orders == 1
+    assert queue.stats()["pending"] == 0
@@ -0,0 +1,60 @@
+from menu_catalog import MenuCatalog
+from order_slots import extract_slots
+from order_state import CoffeeOrder
+
+MENU = MenuCatalog.from_env()
+
+
+def test_plain_order_fills_every_stated_field():
+    order = CoffeeOrder()
+    slots = extract_slots("Can I get a large oat latte for Sam?", MENU)
+    slots.apply(order)
+
+    assert order.to_dict() == {
+        "drinkType": "latte", "size": "large", "milk": "oat milk", "extras": [], "name": "Sam"
+    }
+    assert slots.note(order).endswith("Still needed: nothing.")
+
+    # Later turns change fields and add extras
+    extract_slots("Actually make it small, with caramel and no whipped cream", MENU).apply(order)
+    assert order.size == "small" and order.extras == ["caramel"]
+
+
+def test_unclear_utterances_are_left_to_the_llm():
+    assert extract_slots("Do you have oat milk?", MENU).filled() == {}
+    assert extract_slots("What sizes are there?", MENU).filled() == {}
+    assert extract_slots("I'll have a hot chocolate for here", MENU).filled() == {
+        "drinkType": "hot chocolate"
+    }
+
+    slots = extract_slots("small or medium latte please", MENU)
+    assert slots.filled() == {"drinkType": "latte"}
+    assert slots.ambiguous == ["size"]
+    assert "more than one size" in slots.note(CoffeeOrder())
+
+
+def test_negations_questions_and_non_names_fill_nothing():
+    assert extract_slots("I don't want whipped cream", MENU).filled() == {}
+    assert extract_slots("Skip the whipped cream", MENU).filled() == {}
+    assert extract_slots("Would a chai be nice?", MENU).filled() == {}
+    # A negation covers its own item only
+    assert extract_slots("No whipped cream, large latte", MENU).filled() == {
+        "drinkType": "latte", "size": "large"
+    }
+
+    assert extract_slots("I want a coffee for breakfast", MENU).name is None
+    assert extract_slots("I want a coffee for Breakfast", MENU).name is None
+    assert extract_slots("A latte for two", MENU).filled() == {"drinkType": "latte"}
+    assert extract_slots("A latte for Two", MENU).name is None
+    assert extract_slots("my name is priya", MENU).name == "Priya"
+
+
+def test_generic_words_need_their_noun():
+    assert extract_slots("Give me the whole thing", MENU).filled() == {}
+    assert extract_slots("A big thank you", MENU).filled() == {}
+    assert extract_slots("A big cup of latte with whole milk", MENU).filled() == {
+        "drinkType": "latte", "size": "large", "milk": "whole milk"
+    }
+    # The tools still accept the short forms
+    assert MENU.lookup("milks", "whole").name == "whole milk"
+    assert MENU.lookup("sizes", "big").name == "large"
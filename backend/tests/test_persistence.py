@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from persistence import AsyncPersistence
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_before_the_write_runs() -> None:
+    release = threading.Event()
+    written = []
+
+    def slow_write(value: int) -> None:
+        release.wait(timeout=5)
+        written.append(value)
+
+    writer = AsyncPersistence()
+    await writer.submit(slow_write, 1)
+    assert written == []
+
+    release.set()
+    await writer.aclose()
+    assert written == [1]
+
+
+@pytest.mark.asyncio
+async def test_close_drains_queued_writes_in_order() -> None:
+    written = []
+    writer = AsyncPersistence(maxsize=2)
+    for i in range(10):
+        await writer.submit(written.append, i)
+
+    await writer.aclose()
+    assert written == list(range(10))
+    with pytest.raises(RuntimeError):
+        await writer.submit(written.append, 99)
+
+
+@pytest.mark.asyncio
+async def test_failed_write_does_not_stop_the_writer() -> None:
+    written = []
+
+    def broken() -> None:
+        raise OSError("disk full")
+
+    writer = AsyncPersistence()
+    await writer.submit(broken)
+    await writer.submit(written.append, "after")
+    await writer.aclose()
+    assert written == ["after"]
@@ -0,0 +1,71 @@
+import threading
+from types import SimpleNamespace
+
+import pipeline
+from pipeline import PipelineConfig, PipelineFactory
+
+
+def _counting_factory(monkeypatch):
+    built = []
+
+    def builder(kind):
+        def build(config=None):
+            client = SimpleNamespace(kind=kind)
+            built.append(client)
+            return client
+
+        return staticmethod(build)
+
+    for kind in ("stt", "llm", "tts"):
+        monkeypatch.setattr(PipelineFactory, f"_build_{kind}", builder(kind))
+    monkeypatch.setattr(PipelineFactory, "_build_turn_detection", builder("turn"))
+    return PipelineFactory(vad="vad"), built
+
+
+def test_clients_are_built_once_and_shared(monkeypatch):
+    factory, built = _counting_factory(monkeypatch)
+    config = PipelineConfig()
+
+    factory.prewarm(config)
+    first = factory.get(config)
+    second = factory.get(config)
+
+    assert first.stt is second.stt and first.tts is second.tts
+    assert first.vad == "vad"
+    # Background summaries get their own LLM client
+    assert first.summary_llm is second.summary_llm and first.summary_llm is not first.llm
+    # 4 clients at prewarm, then one turn detector handle per job
+    assert [c.kind for c in built] == ["stt", "llm", "tts", "llm", "turn", "turn"]
+
+
+def test_exclusive_tts_is_replaced_in_the_background(monkeypatch):
+    factory, built = _counting_factory(monkeypatch)
+    config = PipelineConfig(tts_voice="en-US-alicia")
+
+    factory.prewarm(config)
+    owned = factory.get(config, exclusive_tts=True)
+    for thread in threading.enumerate():
+        if thread.name == "pipeline-tts-refill":
+            thread.join()
+    tts_builds = sum(c.kind == "tts" for c in built)
+
+    assert factory.get(config).tts is not owned.tts
+    assert tts_builds == 2
+    assert sum(c.kind == "tts" for c in built) == 2
+
+
+def test_clients_are_rebuilt_once_their_job_session_closes(monkeypatch):
+    factory, _ = _counting_factory(monkeypatch)
+    config = PipelineConfig()
+    first_job = SimpleNamespace(closed=False)
+    second_job = SimpleNamespace(closed=False)
+
+    monkeypatch.setattr(pipeline, "_job_http_session", lambda: first_job)
+    stt = factory.get(config).stt
+    # A concurrent job while the first is still running shares the clients
+    monkeypatch.setattr(pipeline, "_job_http_session", lambda: second_job)
+    assert factory.get(config).stt is stt
+
+    first_job.closed = True
+    assert factory.get(config).stt is not stt
+    assert factory.get(config).llm is factory.get(config).llm
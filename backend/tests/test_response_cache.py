@@ -0,0 +1,92 @@
+from livekit.agents import llm
+
+from response_cache import CachePolicy, CachingLLM, ResponseCache
+from stub_providers import StubLLM, StubReply
+
+
+async def _ask(model: llm.LLM, text: str) -> str:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="You are a barista.")
+    chat_ctx.add_message(role="user", content=text)
+    chunks = []
+    async with model.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                chunks.append(chunk.delta.content)
+    return "".join(chunks)
+
+
+async def test_repeated_turns_are_served_from_cache(tmp_path):
+    requests = []
+
+    def script(chat_ctx):
+        requests.append(chat_ctx)
+        return StubReply(text="What size would you like?")
+
+    path = tmp_path / "responses.jsonl"
+    policy = CachePolicy(enabled=True)
+    order = {"drinkType": "latte"}
+    cache = ResponseCache(path=path)
+    model = CachingLLM(StubLLM(script, ttft=0.0), cache, policy, "test", state=lambda: order)
+
+    assert await _ask(model, "I'd like a latte.") == "What size would you like?"
+    assert await _ask(model, "i'd like a latte") == "What size would you like?"
+    assert len(requests) == 1
+    # Different tool state: never answered from the cache
+    order["drinkType"] = "mocha"
+    await _ask(model, "I'd like a latte.")
+    assert len(requests) == 2
+    assert cache.stats()["hits"] == 1
+    await model.aclose()
+    await cache.aclose()
+
+    # Another worker process picks the responses up from the shared file
+    reloaded = ResponseCache(path=path)
+    model = CachingLLM(StubLLM(script, ttft=0.0), reloaded, policy, "test", state=lambda: order)
+    assert await _ask(model, "I'd like a latte.") == "What size would you like?"
+    assert len(requests) == 2
+    await reloaded.aclose()
+
+
+async def test_key_covers_the_whole_context_and_caller_data_stays_off_disk(tmp_path):
+    requests = []
+
+    def script(chat_ctx):
+        requests.append(chat_ctx)
+        said = chat_ctx.items[-1].text_content
+        if said.startswith("My name is"):
+            return StubReply(tool_calls=[("update_name", {"name": "Priya"})])
+        if said.startswith("It's Priya"):
+            return StubReply(text="Thanks, Priya! What would you like?")
+        return StubReply(text="Anything else?")
+
+    path = tmp_path / "responses.jsonl"
+    cache = ResponseCache(path=path)
+    model = CachingLLM(StubLLM(script, ttft=0.0), cache, CachePolicy(enabled=True), "test")
+
+    async def ask(*turns: str) -> None:
+        chat_ctx = llm.ChatContext()
+        chat_ctx.add_message(role="system", content="You are a barista.")
+        for n, text in enumerate(turns):
+            chat_ctx.add_message(role="user" if n % 2 == 0 else "assistant", content=text)
+        async with model.chat(chat_ctx=chat_ctx) as stream:
+            async for _ in stream:
+                pass
+
+    await ask("A latte for Priya.", "What size?", "Medium.")
+    await ask("A latte for Priya.", "What size?", "Medium.")
+    assert len(requests) == 1
+    # Same last two turns, different earlier conversation
+    await ask("A mocha for Sam.", "What size?", "Medium.")
+    assert len(requests) == 2
+    # First turns: tool calls and replies that repeat a name stay in memory
+    await ask("My name is Priya")
+    await ask("It's Priya.")
+    await ask("Hello")
+    assert len(requests) == 5
+    await model.aclose()
+    await cache.aclose()
+
+    written = path.read_text().splitlines()
+    assert len(written) == 1
+    assert "Anything else?" in written[0]
@@ -0,0 +1,63 @@
+import json
+import logging
+
+import pytest
+
+from structured_logging import LogWriter, parse_sample_rates
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def test_records_are_sampled_written_as_json_and_forwarded(tmp_path):
+    capture = _Capture()
+    path = tmp_path / "logs" / "agent.jsonl"
+    rates = parse_sample_rates("user_input_transcribed=0.25,llm_response=0")
+    writer = LogWriter([capture], path=str(path), sample_rates=rates)
+    writer.start()
+    log = logging.getLogger("test.structured")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(writer.handler)
+    try:
+        for i in range(8):
+            log.info(f"partial {i}", extra={"event": "user_input_transcribed", "room": "room-1"})
+        log.info("chunk", extra={"event": "llm_response"})
+        log.warning("chunk failed", extra={"event": "llm_response"})
+        log.info("Order %s saved", "A1")
+        writer.flush()
+    finally:
+        log.removeHandler(writer.handler)
+        writer.stop()
+
+    expected = ["partial 0", "partial 4", "chunk failed", "Order A1 saved"]
+    assert capture.messages == expected
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["message"] for e in entries] == expected
+    assert entries[0]["room"] == "room-1"
+    assert entries[0]["event"] == "user_input_transcribed"
+    assert entries[2]["level"] == "WARNING"
+    assert writer.handler.dropped == 0
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_stop_closes_the_file_after_the_writer_thread_died(tmp_path):
+    class _Broken(logging.Handler):
+        def handle(self, record):
+            raise RuntimeError("handler failed")
+
+    writer = LogWriter([_Broken()], path=str(tmp_path / "agent.jsonl"))
+    writer.start()
+    writer.handler.handle(logging.makeLogRecord({"msg": "boom"}))
+    writer._thread.join(timeout=5)
+    assert not writer._thread.is_alive()
+
+    file = writer._file
+    writer.stop()
+    assert file.closed
@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+from livekit.agents import Agent, RunContext, function_tool, llm
+
+from tool_profiler import ToolProfiler
+
+
+class _ToolAgent(Agent):
+    def __init__(self) -> None:
+        super().__init__(instructions="test")
+
+    @function_tool
+    async def slow_save(self, context: RunContext, note: str) -> str:
+        """Save a note.
+
+        Args:
+            note: Note to save
+        """
+        time.sleep(0.03)  # synchronous I/O stand-in: holds the loop
+        await asyncio.sleep(0.05)  # awaited work: doesn't
+        return "saved"
+
+    @function_tool
+    async def broken(self, context: RunContext) -> str:
+        """Always fails."""
+        raise ValueError("nope")
+
+
+async def test_wrapped_tools_keep_schema_and_measure_blocking():
+    agent = _ToolAgent()
+    profiler = ToolProfiler("test", blocking_threshold_ms=20)
+    await profiler.instrument(agent)
+
+    tools = llm.ToolContext(agent.tools).function_tools
+    assert set(tools) == {"slow_save", "broken"}
+    # Tools are called with the session's RunContext, which isn't an LLM argument
+    run_ctx = RunContext.__new__(RunContext)
+
+    assert await tools["slow_save"](run_ctx, note="hello") == "saved"
+    with pytest.raises(ValueError):
+        await tools["broken"](run_ctx)
+
+    report = profiler.report()
+    assert report["slow_save"]["calls"] == 1
+    assert report["slow_save"]["slow_calls"] == 1
+    assert 25 <= report["slow_save"]["longest_block_ms"] < 50
+    assert report["slow_save"]["wall_p50_ms"] >= 75
+    assert report["slow_save"]["avg_arg_bytes"] == len('["hello"]')
+    assert report["broken"]["errors"] == 1
+    assert list(report) == ["slow_save", "broken"]
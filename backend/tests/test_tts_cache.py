@@ -0,0 +1,120 @@
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, tts
+
+from stub_providers import SAMPLE_RATE, StubTTS
+from tts_cache import AudioCache, CachingTTS, Voice
+
+GREETING = "Hi! Welcome to Zepto Cafe! What would you like to have today?"
+
+
+class _CountingTTS(StubTTS):
+    def __init__(self):
+        super().__init__(ttfb=0.0, chunk_interval=0.0)
+        self.requests = []
+
+    def synthesize(self, text, **kwargs):
+        self.requests.append(text)
+        return super().synthesize(text, **kwargs)
+
+
+class _StreamingTTS(StubTTS):
+    """Streaming TTS that records the text pushed to it."""
+
+    def __init__(self):
+        super().__init__(ttfb=0.0, chunk_interval=0.0)
+        self._capabilities = tts.TTSCapabilities(streaming=True)
+        self.pushed = []
+
+    def stream(self, **kwargs):
+        conn_options = kwargs.get("conn_options", DEFAULT_API_CONNECT_OPTIONS)
+        return _RecordingStream(tts=self, conn_options=conn_options)
+
+
+class _RecordingStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter):
+        output_emitter.initialize(
+            request_id="stream",
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id="segment")
+        async for data in self._input_ch:
+            if isinstance(data, str):
+                self._tts.pushed.append(data)
+                output_emitter.push(bytes(320))
+        output_emitter.end_segment()
+
+
+async def _speak(model: tts.TTS, text: str) -> bytes:
+    audio = []
+    async with model.stream() as stream:
+        # Pushed token by token, like LLM output
+        for word in text.split(" "):
+            stream.push_text(word + " ")
+        stream.end_input()
+        async for ev in stream:
+            audio.append(ev.frame.data.tobytes())
+    return b"".join(audio)
+
+
+async def test_sentences_are_played_from_cache_and_shared_on_disk(tmp_path):
+    inner = _CountingTTS()
+    cache = AudioCache(directory=tmp_path)
+    model = CachingTTS(inner, cache, "test", voice="en-US-matthew", style="Conversation")
+
+    # A known phrase: synthesized in the background and written to disk
+    await model.warm([GREETING])
+    assert inner.requests == ["Hi! Welcome to Zepto Cafe!", "What would you like to have today?"]
+    first = await _speak(model, GREETING)
+    assert await _speak(model, GREETING) == first
+    assert len(inner.requests) == 2
+
+    # Other voice: not a known phrase there, so spoken live in one request
+    model.update_options(voice="en-US-ken")
+    assert inner.voice == "en-US-ken"
+    await _speak(model, GREETING)
+    assert len(inner.requests) == 3
+    await model.aclose()
+
+    # The next worker process preloads the phrase from disk
+    reloaded = AudioCache(directory=tmp_path)
+    assert reloaded.preload("en-US-matthew", "Conversation", [GREETING]) == 2
+    model = CachingTTS(inner, reloaded, "test", voice="en-US-matthew", style="Conversation")
+    await model.warm([GREETING])
+    assert await _speak(model, GREETING) == first
+    assert len(inner.requests) == 3
+    assert reloaded.stats()["hits"] == 2
+
+
+async def test_switching_to_a_prewarmed_persona_voice():
+    learn, quiz = _CountingTTS(), _CountingTTS()
+    model = CachingTTS(learn, AudioCache(), "test", voice="en-US-matthew")
+    quiz_voice = Voice(quiz, "en-US-alicia")
+    await model.warm(["What does a closure capture?"], quiz_voice)
+    assert quiz.requests == ["What does a closure capture?"]
+
+    model.switch(quiz_voice)
+    await _speak(model, "What does a closure capture?")
+    await _speak(model, "Take your time.")
+    assert quiz.requests == ["What does a closure capture?", "Take your time."]
+    assert learn.requests == []
+
+
+async def test_other_text_streams_live_and_known_phrases_stay_on_disk(tmp_path):
+    inner = _StreamingTTS()
+    cache = AudioCache(directory=tmp_path)
+    model = CachingTTS(inner, cache, "test", voice="en-US-natalie")
+    await model.warm([GREETING])
+    inner.pushed.clear()
+
+    # Words reach the wrapped TTS as they arrive; the greeting comes from the cache
+    await _speak(model, f"Sure thing. {GREETING} Glad the walk helped, Priya.")
+    assert inner.pushed == ["Sure ", "thing.", " Glad ", "the ", "walk ", "helped, ", "Priya."]
+    assert cache.stats()["hits"] == 2
+    # Only the known phrase was written to disk, and it survives eviction
+    cache.disk_bytes = 0
+    await _speak(model, "See you soon.")
+    assert cache.stats()["disk_entries"] == 2
+    reloaded = AudioCache(directory=tmp_path)
+    assert reloaded.preload("en-US-natalie", None, [GREETING]) == 2
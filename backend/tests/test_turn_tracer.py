@@ -0,0 +1,93 @@
+from livekit.agents import llm, metrics
+from livekit.agents.voice.events import (
+    AgentStateChangedEvent,
+    FunctionToolsExecutedEvent,
+    MetricsCollectedEvent,
+    UserInputTranscribedEvent,
+    UserStateChangedEvent,
+)
+
+from turn_tracer import TurnTracer, latency_summary
+
+
+def _run_turn(tracer: TurnTracer, t0: float) -> None:
+    tracer.on_user_state_changed(
+        UserStateChangedEvent(old_state="speaking", new_state="listening", created_at=t0)
+    )
+    tracer.on_user_input_transcribed(
+        UserInputTranscribedEvent(transcript="a latte", is_final=True, created_at=t0 + 0.2)
+    )
+    tracer.on_metrics_collected(
+        MetricsCollectedEvent(
+            metrics=metrics.EOUMetrics(
+                timestamp=t0,
+                end_of_utterance_delay=0.4,
+                transcription_delay=0.2,
+                on_user_turn_completed_delay=0.0,
+                speech_id="speech_1",
+            )
+        )
+    )
+    tracer.on_metrics_collected(
+        MetricsCollectedEvent(
+            metrics=metrics.LLMMetrics(
+                label="llm", request_id="r1", timestamp=t0 + 0.4, duration=0.6,
+                ttft=0.3, cancelled=False, completion_tokens=10, prompt_tokens=100,
+                prompt_cached_tokens=0, total_tokens=110, tokens_per_second=16.0,
+                speech_id="speech_1",
+            )
+        )
+    )
+    tracer.on_function_tools_executed(
+        FunctionToolsExecutedEvent(
+            function_calls=[llm.FunctionCall(call_id="c1", name="set_drink_type", arguments="{}")],
+            function_call_outputs=[None],
+            created_at=t0 + 1.25,
+        )
+    )
+    tracer.on_agent_state_changed(
+        AgentStateChangedEvent(old_state="thinking", new_state="speaking", created_at=t0 + 1.5)
+    )
+    tracer.on_agent_state_changed(
+        AgentStateChangedEvent(old_state="speaking", new_state="listening", created_at=t0 + 3.0)
+    )
+
+
+def test_events_fold_into_one_record_per_turn():
+    tracer = TurnTracer(agent="barista", room="room-1")
+    _run_turn(tracer, 1000.0)
+
+    assert len(tracer.records) == 1
+    turn = tracer.records[0]
+    assert turn.speech_ids == ["speech_1"]
+    assert turn.end_of_utterance_delay == 0.4
+    assert round(turn.stt_final_delay, 2) == 0.2
+    assert turn.llm_ttft == 0.3 and turn.llm_calls == 1
+    assert turn.tools == ["set_drink_type"]
+    assert round(turn.tool_seconds, 2) == 0.25
+    assert turn.first_audio_delay == 1.5
+
+
+def test_ring_buffer_and_percentiles():
+    tracer = TurnTracer(agent="barista", maxlen=3)
+    for i in range(5):
+        _run_turn(tracer, 1000.0 + 10 * i)
+    assert [r.turn for r in tracer.records] == [3, 4, 5]
+
+    summary = latency_summary(
+        [{"agent": "wellness", "first_audio_delay": v} for v in range(1, 101)]
+    )
+    assert summary["wellness"]["turns"] == 100
+    assert summary["wellness"]["first_audio_delay"] == {"p50": 50, "p95": 95, "p99": 99}
+
+
+def test_export_jsonl_round_trips(tmp_path):
+    from append_log import AppendOnlyLog
+
+    tracer = TurnTracer(agent="tutor")
+    _run_turn(tracer, 1000.0)
+    path = tmp_path / "turns.jsonl"
+
+    assert tracer.export_jsonl(path) == 1
+    records = AppendOnlyLog(path).read_all()
+    assert latency_summary(records)["tutor"]["first_audio_delay"]["p50"] == 1.5
@@ -0,0 +1,231 @@
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import wellness_storage
+from wellness_state import WellnessCheckIn, WellnessContextCache, WellnessLog
+from wellness_storage import (
+    JsonLinesWellnessStore,
+    ShardedWellnessStore,
+    WellnessStore,
+    migrate_legacy_log,
+)
+
+
+def _check_in(mood: str, days_ago: float = 0, user_id=None) -> WellnessCheckIn:
+    when = datetime.now() - timedelta(days=days_ago)
+    return WellnessCheckIn(
+        date_time=when.isoformat(),
+        mood=mood,
+        energy_level="low",
+        objectives=["go for a walk"],
+        user_id=user_id,
+    )
+
+
+def _log(tmp_path) -> WellnessLog:
+    return WellnessLog(store=ShardedWellnessStore(tmp_path / "shards"))
+
+
+def test_save_appends_without_rewriting(tmp_path) -> None:
+    log = _log(tmp_path)
+    path = log.store.partition_path("alice")
+
+    log.save_check_in(_check_in("tired", user_id="alice"))
+    first_line = path.read_text(encoding="utf-8").splitlines()[0]
+    log.save_check_in(_check_in("better", user_id="alice"))
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert lines[0] == first_line
+    assert [e["mood"] for e in log.load_log("alice")] == ["tired", "better"]
+
+
+def test_concurrent_stores_do_not_lose_writes(tmp_path) -> None:
+    path = tmp_path / "log.jsonl"
+    a = JsonLinesWellnessStore(path)
+    b = JsonLinesWellnessStore(path)
+
+    for i in range(5):
+        a.append(_check_in(f"a{i}").to_dict())
+        b.append(_check_in(f"b{i}").to_dict())
+
+    assert len(a.load()) == 10
+
+
+def test_torn_trailing_line_is_ignored(tmp_path) -> None:
+    path = tmp_path / "log.jsonl"
+    store = JsonLinesWellnessStore(path)
+    store.append(_check_in("ok").to_dict())
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"mood": "half-writ')
+
+    assert [e["mood"] for e in store.load()] == ["ok"]
+
+
+def test_migrates_legacy_logs_once(tmp_path) -> None:
+    legacy = tmp_path / "wellness_log.json"
+    legacy_lines = tmp_path / "wellness_log.jsonl"
+    root = tmp_path / "wellness_logs"
+    entries = [_check_in("old", days_ago=2).to_dict(), _check_in("older").to_dict()]
+    legacy.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+    JsonLinesWellnessStore(legacy_lines).append(_check_in("bob", user_id="bob").to_dict())
+
+    assert migrate_legacy_log([legacy, legacy_lines], root) == 3
+    assert migrate_legacy_log([legacy, legacy_lines], root) == 0
+
+    log = WellnessLog(store=ShardedWellnessStore(root))
+    assert log.load_log() == entries
+    assert [e["mood"] for e in log.load_log("bob")] == ["bob"]
+    assert legacy.exists()
+
+
+def test_migration_racing_another_process_keeps_its_result(tmp_path, monkeypatch) -> None:
+    legacy = tmp_path / "wellness_log.json"
+    root = tmp_path / "wellness_logs"
+    legacy.write_text(json.dumps([_check_in("old").to_dict()]), encoding="utf-8")
+    replace = os.replace
+
+    def migrated_meanwhile(src, dst):
+        # Another process renames its staging directory into place first
+        (Path(dst) / "ab").mkdir(parents=True)
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", migrated_meanwhile)
+    assert migrate_legacy_log([legacy], root) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["wellness_log.json", "wellness_logs"]
+
+
+def test_recent_and_last_entry_api_is_preserved(tmp_path) -> None:
+    log = _log(tmp_path)
+    log.save_check_in(_check_in("stale", days_ago=30))
+    log.save_check_in(_check_in("yesterday", days_ago=1))
+    log.save_check_in(_check_in("today"))
+
+    assert [e["mood"] for e in log.get_recent_entries(days=7)] == ["today", "yesterday"]
+    assert log.get_last_entry()["mood"] == "today"
+    assert "How does today compare?" in log.format_context_for_agent()
+
+
+def test_out_of_order_writes_are_indexed_by_time(tmp_path) -> None:
+    store = JsonLinesWellnessStore(tmp_path / "log.jsonl")
+    store.append(_check_in("today").to_dict())
+    store.append(_check_in("backfilled", days_ago=3).to_dict())
+    store.append(_check_in("later today").to_dict())
+    store.append({"date_time": "not a date", "mood": "broken"})
+
+    cutoff = (datetime.now() - timedelta(days=7)).timestamp()
+    assert store.latest()["mood"] == "later today"
+    assert [e["mood"] for e in store.entries_since(cutoff)] == [
+        "later today",
+        "today",
+        "backfilled",
+    ]
+    assert len(store.load()) == 4
+
+
+def test_index_catches_up_with_other_writers(tmp_path) -> None:
+    path = tmp_path / "log.jsonl"
+    reader = JsonLinesWellnessStore(path)
+    writer = JsonLinesWellnessStore(path)
+    writer.append(_check_in("first", days_ago=1).to_dict())
+    assert reader.latest()["mood"] == "first"
+
+    writer.append(_check_in("second").to_dict())
+    assert reader.latest()["mood"] == "second"
+
+
+def test_reads_bare_entries_without_persisted_timestamp(tmp_path) -> None:
+    path = tmp_path / "log.jsonl"
+    path.write_text(json.dumps(_check_in("bare").to_dict()) + "\n", encoding="utf-8")
+
+    assert JsonLinesWellnessStore(path).latest()["mood"] == "bare"
+
+
+def test_backends_implement_append_and_load(tmp_path) -> None:
+    class AppendOnly(WellnessStore):
+        def append(self, entry: dict) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        AppendOnly()
+
+    class InMemory(AppendOnly):
+        def __init__(self):
+            self.entries = []
+
+        def append(self, entry: dict) -> None:
+            self.entries.append(entry)
+
+        def load(self) -> list[dict]:
+            return list(self.entries)
+
+    store = InMemory()
+    for mood, days_ago in (("tired", 2), ("calm", 1)):
+        store.append(_check_in(mood, days_ago).to_dict())
+    assert store.latest()["mood"] == "calm"
+
+
+def test_callers_only_see_their_own_history(tmp_path) -> None:
+    log = _log(tmp_path)
+    log.save_check_in(_check_in("alice's mood", days_ago=1, user_id="alice"))
+    log.save_check_in(_check_in("bob's mood", user_id="bob"))
+
+    assert log.get_last_entry("alice")["mood"] == "alice's mood"
+    assert log.get_last_entry("carol") is None
+    assert log.format_context_for_agent("carol") == ""
+    assert log.store.partition_path("alice") != log.store.partition_path("bob")
+
+
+def test_evicted_partitions_reload_from_disk(tmp_path) -> None:
+    store = ShardedWellnessStore(tmp_path / "shards", max_open_partitions=2)
+    log = WellnessLog(store=store)
+    for user in ("a", "b", "c", "d"):
+        log.save_check_in(_check_in(f"{user} mood", user_id=user))
+
+    assert len(store._open) == 2
+    assert log.get_last_entry("a")["mood"] == "a mood"
+
+
+def test_context_cache_hits_after_first_lookup(tmp_path, monkeypatch) -> None:
+    cache = WellnessContextCache(maxsize=8)
+    log = WellnessLog(store=ShardedWellnessStore(tmp_path / "shards"), context_cache=cache)
+    log.save_check_in(_check_in("tired", days_ago=1, user_id="alice"))
+    cache.invalidate("alice")
+
+    # Refreshing reuses the timestamps the store parsed when indexing
+    def no_parsing(entry):
+        raise AssertionError("timestamp parsed again")
+
+    monkeypatch.setattr(wellness_storage, "entry_timestamp", no_parsing)
+
+    first = log.format_context_for_agent("alice")
+    assert log.format_context_for_agent("alice") == first
+    assert [e["mood"] for e in log.get_recent_entries(user_id="alice")] == ["tired"]
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_save_check_in_writes_through_to_cache(tmp_path) -> None:
+    cache = WellnessContextCache(maxsize=8)
+    log = WellnessLog(store=ShardedWellnessStore(tmp_path / "shards"), context_cache=cache)
+    assert log.format_context_for_agent("alice") == ""
+
+    log.save_check_in(_check_in("tired", user_id="alice"))
+
+    assert log.format_context_for_agent("alice").startswith("Earlier today")
+    assert len(log.get_recent_entries(days=1, user_id="alice")) == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_context_cache_is_bounded(tmp_path) -> None:
+    cache = WellnessContextCache(maxsize=2)
+    log = WellnessLog(store=ShardedWellnessStore(tmp_path / "shards"), context_cache=cache)
+    for user in ("a", "b", "c"):
+        log.format_context_for_agent(user)
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit import rtc
+from livekit.agents import JobContext, JobExecutorType, JobProcess, llm, metrics
+from livekit.agents.voice.events import (
+    FunctionToolsExecutedEvent,
+    MetricsCollectedEvent,
+)
+from prometheus_client import REGISTRY
+
+from turn_tracer import TurnRecord
+from worker_metrics import SessionMetrics, error_provider, observe_session
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def test_session_events_update_counters_and_histograms():
+    recorder = SessionMetrics("metrics-test")
+    recorder.session_started()
+    assert _sample("voice_agent_sessions_active", agent="metrics-test") == 1
+
+    recorder.on_metrics_collected(
+        MetricsCollectedEvent(
+            metrics=metrics.TTSMetrics(
+                label="tts", request_id="r1", timestamp=0.0, ttfb=0.2, duration=1.0,
+                audio_duration=2.0, cancelled=False, characters_count=42, streamed=True,
+            )
+        )
+    )
+    call = llm.FunctionCall(call_id="c1", name="complete_order", arguments="{}", created_at=10.0)
+    output = llm.FunctionCallOutput(call_id="c1", name="complete_order", output="ok", is_error=False, created_at=10.04)
+    recorder.on_function_tools_executed(
+        FunctionToolsExecutedEvent(function_calls=[call], function_call_outputs=[output])
+    )
+    recorder.on_turn(TurnRecord(agent="metrics-test", room="", turn=1, speech_end_at=0.0, first_audio_delay=1.2))
+    await recorder.session_ended()
+
+    assert _sample("voice_agent_tts_characters_total", agent="metrics-test") == 42
+    assert _sample(
+        "voice_agent_tool_calls_total", agent="metrics-test", tool="complete_order", status="ok"
+    ) == 1
+    assert _sample(
+        "voice_agent_tool_duration_seconds_bucket", agent="metrics-test", tool="complete_order", le="0.05"
+    ) == 1
+    assert _sample(
+        "voice_agent_turn_latency_seconds_count", agent="metrics-test", stage="first_audio"
+    ) == 1
+    assert _sample("voice_agent_sessions_active", agent="metrics-test") == 0
+
+
+def test_error_provider_matches_tts_logging():
+    assert error_provider(SimpleNamespace(error=SimpleNamespace(type="tts_error"), source=None)) == "tts"
+    assert error_provider(SimpleNamespace(error=None, source="<livekit.plugins.murf.TTS>")) == "tts"
+    assert error_provider(SimpleNamespace(error=SimpleNamespace(type="llm_error"), source=None)) == "llm"
+    assert error_provider(SimpleNamespace(error="boom", source=None)) == "other"
+
+
+async def test_session_end_runs_as_a_job_shutdown_callback():
+    ctx = JobContext(
+        proc=JobProcess(executor_type=JobExecutorType.PROCESS, user_arguments=None, http_proxy=None),
+        info=None,
+        room=rtc.Room(),
+        on_connect=lambda: None,
+        on_shutdown=lambda reason: None,
+        inference_executor=None,
+    )
+    flushed = []
+
+    async def flush():
+        await asyncio.sleep(0)
+        flushed.append(True)
+
+    session = SimpleNamespace(on=lambda event, callback: None)
+    observe_session(ctx, session, "shutdown-test")
+    ctx.add_shutdown_callback(flush)
+    assert _sample("voice_agent_sessions_active", agent="shutdown-test") == 1
+
+    # As the job process runs them when the job ends
+    await asyncio.gather(*(callback("test") for callback in ctx._shutdown_callbacks))
+    assert _sample("voice_agent_sessions_active", agent="shutdown-test") == 0
+    assert flushed == [True]